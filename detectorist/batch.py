@@ -0,0 +1,389 @@
+import os
+import queue
+import threading
+
+from .detector import Detector
+from .image_cache import load_image
+from .image_object import ImageObject
+from .tiling import Tiling
+from . import image_utils
+
+# Marks the end of the work items in a stage queue
+_END_OF_STAGE = object()
+
+
+def list_image_files(folder_path: str) -> list[str]:
+    """Returns the sorted file names of all supported images in a folder."""
+    return sorted([f for f in os.listdir(folder_path)
+                   if f.lower().endswith(ImageObject.SUPPORTED_IMG_EXTENSIONS)])
+
+
+def create_output_dir(folder_path: str, confidence_percent: int, model_name: str) -> str:
+    """
+    Create the output directory for the images inside the given folder, encoding the confidence and model name.
+    Returns the path to the output directory.
+    """
+    output_dir = os.path.join(folder_path, f"output_conf{confidence_percent}_{model_name}")
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+
+def calculate_crop_rect(detections: list, image_shape: tuple, crop_mode: str, padding_percentage: float, aspect_ratio: tuple[int, int]) -> tuple[int, int, int, int] | None:
+    """
+    Calculates a crop rectangle based on detections and parameters.
+    
+    Args:
+        detections: A list of detections, where each detection is a tuple ((x, y, w, h), score, class_id).
+        image_shape: The shape of the image (height, width, channels).
+        crop_mode: 'top_confidence' or 'largest_area'.
+        padding_percentage: Padding to add around the bounding box, as a float (e.g., 0.1 for 10%).
+        aspect_ratio: A tuple (width, height) for the target aspect ratio.
+
+    Returns:
+        A tuple (x, y, w, h) for the crop rectangle, or None if no rectangle could be calculated.
+    """
+    if not detections:
+        return None
+
+    if crop_mode == 'top_confidence':
+        top_detection = max(detections, key=lambda d: d[1])
+        x, y, w, h = top_detection[0]
+    elif crop_mode == 'largest_area':
+        # The detection boxes are tuples of (x, y, w, h)
+        left = min(d[0][0] for d in detections)
+        top = min(d[0][1] for d in detections)
+        right = max(d[0][0] + d[0][2] for d in detections)
+        bottom = max(d[0][1] + d[0][3] for d in detections)
+        x, y, w, h = left, top, right - left, bottom - top
+    else:
+        return None
+
+    # Add padding
+    padding_x = int(w * padding_percentage)
+    padding_y = int(h * padding_percentage)
+    
+    x -= padding_x
+    y -= padding_y
+    w += 2 * padding_x
+    h += 2 * padding_y
+
+    # Adjust for aspect ratio
+    if h <= 0 or aspect_ratio[1] <= 0:
+        return None # Avoid division by zero
+
+    ratio_w, ratio_h = aspect_ratio
+    rect_w, rect_h = w, h
+    
+    current_ratio = rect_w / rect_h
+    target_ratio = ratio_w / ratio_h
+
+    if current_ratio > target_ratio:
+        # Too wide, adjust height
+        new_h = int(rect_w / target_ratio)
+        diff_h = new_h - rect_h
+        y -= diff_h // 2
+        h = new_h
+    else:
+        # Too tall, adjust width
+        new_w = int(rect_h * target_ratio)
+        diff_w = new_w - rect_w
+        x -= diff_w // 2
+        w = new_w
+
+    # Ensure the crop rectangle is within the image boundaries
+    image_height, image_width, _ = image_shape
+
+    # If the crop rectangle is larger than the image, scale it down
+    scale = 1.0
+    if w > image_width:
+        scale = image_width / w
+    if h > image_height:
+        scale = min(scale, image_height / h)
+
+    if scale < 1.0:
+        w = int(w * scale)
+        h = int(h * scale)
+
+    # If the crop rectangle is outside the image, move it
+    if x < 0:
+        x = 0
+    if y < 0:
+        y = 0
+    if x + w > image_width:
+        x = image_width - w
+    if y + h > image_height:
+        y = image_height - h
+
+    return (x, y, w, h)
+
+
+class CropJob:
+    """
+    Per-image action that saves a cropped copy of every image with detections.
+
+    Images with detections are cropped into the 'cropped' sub directory of the output directory,
+    images without detections (or without a valid crop rectangle) are copied into 'not-cropped'.
+    """
+
+    # The crops are written from the decoded image, so the pipeline decodes it at full resolution (once) instead of
+    # decoding a reduced image for detection and the full image again for the crop
+    full_resolution = True
+
+    def __init__(self, output_dir: str, crop_mode: str, padding_percentage: float, aspect_ratio: tuple[int, int]):
+        """
+        Args:
+            output_dir: The directory the 'cropped' and 'not-cropped' directories are created in.
+            crop_mode: 'top_confidence' or 'largest_area'.
+            padding_percentage: Padding to add around the bounding box, as a float (e.g., 0.1 for 10%).
+            aspect_ratio: A tuple (width, height) for the target aspect ratio.
+        """
+        self.crop_mode = crop_mode
+        self.padding_percentage = padding_percentage
+        self.aspect_ratio = aspect_ratio
+        self.cropped_dir, self.not_cropped_dir = self.create_crop_dirs(output_dir)
+
+    @staticmethod
+    def create_crop_dirs(output_dir: str) -> tuple[str, str]:
+        """
+        Creates the output directories for the cropped and non-cropped images inside the given directory
+        Returns the paths to the cropped and not-cropped directories.
+        """
+        cropped_dir = os.path.join(output_dir, "cropped")
+        not_cropped_dir = os.path.join(output_dir, "not-cropped")
+        os.makedirs(cropped_dir, exist_ok=True)
+        os.makedirs(not_cropped_dir, exist_ok=True)
+        return cropped_dir, not_cropped_dir
+
+    def __call__(self, image: ImageObject, results: list):
+        if not results:
+            image.copy_image_file(self.not_cropped_dir)
+            return
+
+        image_shape = image.shape
+        crop_tuple = calculate_crop_rect(results, image_shape, self.crop_mode, self.padding_percentage, self.aspect_ratio)
+
+        if not crop_tuple or crop_tuple[2] <= 0 or crop_tuple[3] <= 0:
+            print(f"Warning {os.path.basename(image.image_path)}: invalid crop rectangle, crop_tuple: {crop_tuple}")
+            image.copy_image_file(self.not_cropped_dir)
+            return
+
+        image_utils.crop_image_file(image, self.cropped_dir, crop_tuple)
+
+
+class SortJob:
+    """
+    Per-image action that copies every image into a sub directory named after the class of its top detection.
+    Images without detections are copied into the 'no-detection' directory.
+    """
+
+    # Only the files are copied, so a reduced image is enough for detection
+    full_resolution = False
+
+    def __init__(self, output_dir: str):
+        """
+        Args:
+            output_dir: The directory the class directories are created in.
+        """
+        self.output_dir = output_dir
+
+    def __call__(self, image: ImageObject, results: list):
+        if results:
+            top_detection = max(results, key=lambda d: d[1])
+            class_dir = os.path.join(self.output_dir, top_detection[2])
+        else:
+            class_dir = os.path.join(self.output_dir, "no-detection")
+        os.makedirs(class_dir, exist_ok=True)
+        image.copy_image_file(class_dir)
+
+
+class BatchCancelled(Exception):
+    """Raised inside the pipeline stages to unwind them after cancel() was called."""
+
+
+class BatchPipeline:
+    """
+    Runs object detection and a per-image action (e.g. cropping or sorting) over many image files.
+
+    The work is split into three stages that run concurrently on background threads:
+    a pool of decode workers loading the images, a single inference stage running the detector on batches
+    of decoded images, and a pool of writer workers executing the per-image action.
+    The stages are connected by bounded queues, so only a limited number of decoded images is kept in memory.
+    Progress is reported through the on_progress callback, which is called from the writer threads.
+    """
+
+    def __init__(self, detector: Detector, image_paths: list[str], process_callback: callable,
+                 confidence_threshold: float = 0.5, nms_threshold: float = 0.45, batch_size: int = Detector.DEFAULT_BATCH_SIZE,
+                 decode_workers: int = None, write_workers: int = 2, on_progress: callable = None, tiling: Tiling = None):
+        """
+        Args:
+            detector: The detector used for all images (a Detector, or anything else providing detect_batch() and decode_size() like a CascadeDetector).
+            image_paths: The paths of the images to process.
+            process_callback: Called as process_callback(image, results) for every image, on a writer thread.
+                If it has a true full_resolution attribute (like a CropJob), the images are decoded at full resolution.
+            confidence_threshold: The confidence threshold for filtering detections.
+            nms_threshold: The Non-Maximum Suppression threshold.
+            batch_size: The maximum number of images passed to the detector at once.
+            decode_workers: The number of decode threads (defaults to half the CPU cores, at most 4).
+            write_workers: The number of writer threads.
+            on_progress: Optional callback on_progress(done, total, image_path), called after each processed image.
+            tiling: Detect the images in tiles with these settings, defaults to the detector's tiling.
+        """
+        self.detector = detector
+        self.image_paths = list(image_paths)
+        self.process_callback = process_callback
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        self.batch_size = max(1, batch_size)
+        self.decode_workers = decode_workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.write_workers = max(1, write_workers)
+        self.on_progress = on_progress
+        self.tiling = tiling
+
+        self._cancel_event = threading.Event()
+        self._progress_lock = threading.Lock()
+        self._done = 0
+        self._error = None
+
+    @property
+    def cancelled(self) -> bool:
+        """Returns True if the pipeline was cancelled."""
+        return self._cancel_event.is_set()
+
+    @property
+    def processed_count(self) -> int:
+        """Returns the number of images processed so far."""
+        return self._done
+
+    def cancel(self):
+        """Requests the pipeline to stop. Images already being processed are finished, no new ones are started."""
+        self._cancel_event.set()
+
+    @property
+    def _decode_size(self) -> tuple[int, int] | None:
+        """Returns the decode size hint for the images (see ImageObject), None if the per-image action needs full resolution."""
+        if getattr(self.process_callback, "full_resolution", False):
+            return None
+        return self.detector.decode_size(self.tiling)
+
+    def run(self) -> bool:
+        """
+        Processes all images and blocks until done.
+
+        Returns:
+            bool: True if all images were processed, False if the pipeline was cancelled.
+
+        Raises:
+            Exception: The first exception raised by any of the stages (the remaining work is cancelled).
+        """
+        path_queue = queue.Queue()
+        for path in self.image_paths:
+            path_queue.put(path)
+
+        # Bounded queues between the stages limit the number of decoded images held in memory
+        decoded_queue = queue.Queue(maxsize=self.batch_size * 2)
+        write_queue = queue.Queue(maxsize=self.batch_size * 2)
+
+        decoders = [self._start_stage(self._decode_stage, path_queue, decoded_queue) for _ in range(self.decode_workers)]
+        inference = self._start_stage(self._inference_stage, decoded_queue, write_queue)
+        writers = [self._start_stage(self._write_stage, write_queue) for _ in range(self.write_workers)]
+
+        for thread in decoders:
+            thread.join()
+        self._put(decoded_queue, _END_OF_STAGE)
+        inference.join()
+        for _ in writers:
+            self._put(write_queue, _END_OF_STAGE)
+        for thread in writers:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return not self.cancelled
+
+    def _start_stage(self, target: callable, *queues) -> threading.Thread:
+        """Starts a stage function on a daemon thread, turning exceptions into a cancelled pipeline."""
+        def stage():
+            try:
+                target(*queues)
+            except BatchCancelled:
+                pass
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+                self.cancel()
+
+        thread = threading.Thread(target=stage, daemon=True)
+        thread.start()
+        return thread
+
+    def _put(self, target_queue: queue.Queue, item):
+        """Puts an item into a bounded queue without blocking forever after a cancel."""
+        while True:
+            try:
+                target_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self.cancelled:
+                    # The consumers stop by themselves once cancelled, so an end marker is not needed anymore
+                    if item is _END_OF_STAGE:
+                        return
+                    raise BatchCancelled()
+
+    def _get(self, source_queue: queue.Queue):
+        """Gets an item from a queue, returning _END_OF_STAGE once the pipeline is cancelled."""
+        while True:
+            if self.cancelled:
+                return _END_OF_STAGE
+            try:
+                return source_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def _decode_stage(self, path_queue: queue.Queue, decoded_queue: queue.Queue):
+        """Loads images until all paths are taken."""
+        while not self.cancelled:
+            try:
+                image_path = path_queue.get_nowait()
+            except queue.Empty:
+                return
+            # Images the viewer has decoded already are reused, but the batch doesn't fill the cache
+            self._put(decoded_queue, load_image(image_path, self._decode_size, remember=False))
+
+    def _inference_stage(self, decoded_queue: queue.Queue, write_queue: queue.Queue):
+        """Collects the decoded images into batches and runs the detector on them."""
+        finished = False
+        while not finished:
+            # Block for the first image of a batch, then take whatever else is already decoded
+            image = self._get(decoded_queue)
+            if image is _END_OF_STAGE:
+                return
+            images = [image]
+            while len(images) < self.batch_size:
+                try:
+                    image = decoded_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if image is _END_OF_STAGE:
+                    finished = True
+                    break
+                images.append(image)
+
+            batch_results = self.detector.detect_batch(images, confidence_threshold=self.confidence_threshold,
+                                                       nms_threshold=self.nms_threshold, batch_size=self.batch_size, tiling=self.tiling)
+            for image, results in zip(images, batch_results):
+                self._put(write_queue, (image, results))
+
+    def _write_stage(self, write_queue: queue.Queue):
+        """Runs the per-image action on detected images."""
+        while True:
+            item = self._get(write_queue)
+            if item is _END_OF_STAGE:
+                return
+            image, results = item
+            self.process_callback(image, results)
+
+            with self._progress_lock:
+                self._done += 1
+                done = self._done
+            if self.on_progress:
+                self.on_progress(done, len(self.image_paths), image.image_path)
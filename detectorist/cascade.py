@@ -0,0 +1,151 @@
+import time
+import threading
+
+from .detector import Detector
+from .image_object import ImageObject
+from .tiling import Tiling
+
+
+class CascadeStats:
+    """
+    Per-stage counts and timings of a CascadeDetector.
+
+    Attributes:
+        empty (int): Images the first stage found no objects in.
+        confident (int): Images the first stage detected all objects in with a high confidence.
+        uncertain (int): Images that were passed on to the second stage.
+        first_stage_seconds (float): Time spent in the first stage.
+        second_stage_seconds (float): Time spent in the second stage.
+    """
+
+    def __init__(self):
+        self.empty = 0
+        self.confident = 0
+        self.uncertain = 0
+        self.first_stage_seconds = 0.0
+        self.second_stage_seconds = 0.0
+
+    @property
+    def total(self) -> int:
+        return self.empty + self.confident + self.uncertain
+
+    @property
+    def seconds_saved(self) -> float | None:
+        """
+        Estimates the time saved compared to running the second stage on all images, based on the measured second
+        stage time per image. It is 0 if the first stage cost more than it saved (e.g. no image was skipped).
+        Returns None if no image reached the second stage.
+        """
+        if not self.uncertain:
+            return None
+        second_stage_per_image = self.second_stage_seconds / self.uncertain
+        return max(0.0, (self.empty + self.confident) * second_stage_per_image - self.first_stage_seconds)
+
+    def summary(self) -> str:
+        """Returns a one-line report of the stage counts and the time saved."""
+        text = (f"Cascade: {self.empty} empty, {self.confident} confident, {self.uncertain} uncertain of {self.total} images; "
+                f"first stage {self.first_stage_seconds:.1f} s, second stage {self.second_stage_seconds:.1f} s")
+        saved = self.seconds_saved
+        if saved is not None:
+            text += f", about {saved:.1f} s saved"
+        return text
+
+
+class CascadeDetector:
+    """
+    Two-stage detection for folders where most images are empty.
+
+    A cheap first stage (e.g. a smaller model, or the same model without tiling) detects all images. Its result decides
+    if an image is "empty" (no detection above empty_threshold), "confident" (all detections above empty_threshold
+    have at least confident_threshold) or "uncertain". Only the uncertain images are detected again by the expensive
+    second stage (e.g. a larger model, or tiled detection), the others keep the first stage's detections.
+
+    Provides detect_batch() like Detector, so it can be used by the BatchPipeline.
+    """
+
+    EMPTY_THRESHOLD = 0.25
+    CONFIDENT_THRESHOLD = 0.8
+
+    def __init__(self, first_stage: Detector, second_stage: Detector,
+                 empty_threshold: float = EMPTY_THRESHOLD, confident_threshold: float = CONFIDENT_THRESHOLD):
+        """
+        Args:
+            first_stage: The cheap detector run on all images.
+            second_stage: The expensive detector run on the uncertain images.
+            empty_threshold: Images without a first stage detection above this confidence are empty.
+            confident_threshold: Images with all first stage detections above this confidence are confident.
+        """
+        if empty_threshold > confident_threshold:
+            raise ValueError(f"The empty threshold ({empty_threshold}) must not be above the confident threshold ({confident_threshold})")
+        self.first_stage = first_stage
+        self.second_stage = second_stage
+        self.empty_threshold = empty_threshold
+        self.confident_threshold = confident_threshold
+        self.stats = CascadeStats()
+        self._stats_lock = threading.Lock()
+
+    def decode_size(self, tiling: Tiling = None) -> tuple[int, int] | None:
+        """
+        Returns the (width, height) the images need to be decoded at for both stages, or None for full resolution.
+        The tiling is the second stage's (see detect_batch()).
+        """
+        first_size, second_size = self.first_stage.decode_size(), self.second_stage.decode_size(tiling)
+        if first_size is None or second_size is None:
+            return None
+        return max(first_size[0], second_size[0]), max(first_size[1], second_size[1])
+
+    def classify(self, results: list) -> str:
+        """Returns 'empty', 'confident' or 'uncertain' for the first stage results of an image."""
+        scores = [score for _, score, _ in results if score >= self.empty_threshold]
+        if not scores:
+            return "empty"
+        if min(scores) >= self.confident_threshold:
+            return "confident"
+        return "uncertain"
+
+    def detect_batch(self, images: list[ImageObject], confidence_threshold: float = 0.5, nms_threshold: float = 0.45,
+                     batch_size: int = Detector.DEFAULT_BATCH_SIZE, tiling: Tiling = None) -> list[list]:
+        """
+        Detects objects in several images, running the second stage only on the uncertain ones.
+
+        Args:
+            images: The input images (Image objects).
+            confidence_threshold: The confidence threshold for filtering detections.
+            nms_threshold: The Non-Maximum Suppression threshold.
+            batch_size: The maximum number of images per session run.
+            tiling: Detect the uncertain images in tiles with these settings, defaults to the second stage's tiling.
+
+        Returns:
+            A list with one result list per image, in the same format as returned by Detector.detect().
+        """
+        start_time = time.perf_counter()
+        # The first stage is classified with a threshold low enough to tell empty and uncertain images apart
+        first_results = self.first_stage.detect_batch(images, confidence_threshold=min(confidence_threshold, self.empty_threshold),
+                                                      nms_threshold=nms_threshold, batch_size=batch_size)
+        first_stage_seconds = time.perf_counter() - start_time
+
+        results = []
+        uncertain = []
+        counts = {"empty": 0, "confident": 0, "uncertain": 0}
+        for i, first_result in enumerate(first_results):
+            category = self.classify(first_result)
+            counts[category] += 1
+            if category == "uncertain":
+                uncertain.append(i)
+            results.append([detection for detection in first_result if detection[1] > confidence_threshold])
+
+        start_time = time.perf_counter()
+        if uncertain:
+            second_results = self.second_stage.detect_batch([images[i] for i in uncertain], confidence_threshold=confidence_threshold,
+                                                            nms_threshold=nms_threshold, batch_size=batch_size, tiling=tiling)
+            for i, second_result in zip(uncertain, second_results):
+                results[i] = second_result
+        second_stage_seconds = time.perf_counter() - start_time
+
+        with self._stats_lock:
+            self.stats.empty += counts["empty"]
+            self.stats.confident += counts["confident"]
+            self.stats.uncertain += counts["uncertain"]
+            self.stats.first_stage_seconds += first_stage_seconds
+            self.stats.second_stage_seconds += second_stage_seconds
+        return results
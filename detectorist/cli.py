@@ -0,0 +1,196 @@
+"""
+Headless command-line batch mode.
+
+Runs the same crop and sort actions as the GUI over all images of a folder, without importing Qt.
+Example:
+
+    detectorist-batch crop ~/dives/2025-09-06 --model fish.onnx --confidence 0.6 --aspect-ratio 16:9
+"""
+import os
+import sys
+import time
+import argparse
+
+from .batch import BatchPipeline, CropJob, SortJob, create_output_dir, list_image_files
+from .cascade import CascadeDetector
+from .detection_store import DetectionStore
+from .detector import Detector
+from . import image_cache
+from .model_metadata import read_model_metadata
+from .process_pool import ProcessBatchPipeline
+from .tiling import Tiling
+from .utils import get_model_path
+
+
+def _resolve_model_path(model: str) -> str:
+    """Returns the model path as given if it exists, otherwise looks the model up in the models directory."""
+    if os.path.isfile(model):
+        return model
+    return os.path.join(get_model_path(), model)
+
+
+def _parse_aspect_ratio(value: str) -> tuple[int, int]:
+    """Parses an aspect ratio like '3:2' into a (width, height) tuple."""
+    try:
+        ratio_w, ratio_h = map(int, value.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid aspect ratio '{value}', expected a value like 3:2")
+    if ratio_w <= 0 or ratio_h <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid aspect ratio '{value}', both sides must be positive")
+    return ratio_w, ratio_h
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="detectorist-batch", description="Crop or sort all images of a folder based on object detection.")
+    parser.add_argument("action", choices=["crop", "sort"], help="Crop the images to the detected objects, or sort them into folders by detected class")
+    parser.add_argument("folder", help="Folder with the images to process")
+    parser.add_argument("-m", "--model", required=True, help="Path of the ONNX model, or its file name in the models directory")
+    parser.add_argument("-c", "--confidence", type=float, default=0.75, help="Confidence threshold for filtering detections (default: 0.75)")
+    parser.add_argument("-n", "--nms", type=float, default=0.45, help="Non-Maximum Suppression threshold (default: 0.45)")
+    parser.add_argument("--crop-mode", choices=["top_confidence", "largest_area"], default="top_confidence",
+                        help="Crop to the box with the highest confidence or to the area covering all boxes (default: top_confidence)")
+    parser.add_argument("--padding", type=float, default=0.15, help="Padding around the cropped boxes, e.g. 0.15 for 15%% (default: 0.15)")
+    parser.add_argument("--aspect-ratio", type=_parse_aspect_ratio, default=(3, 2), help="Aspect ratio of the crops (default: 3:2)")
+    parser.add_argument("-b", "--batch-size", type=int, default=Detector.DEFAULT_BATCH_SIZE,
+                        help=f"Number of images detected together (default: {Detector.DEFAULT_BATCH_SIZE})")
+    parser.add_argument("-j", "--decode-workers", type=int, default=None, help="Number of image decoding threads (default: half the CPU cores, at most 4)")
+    parser.add_argument("-w", "--write-workers", type=int, default=2, help="Number of threads writing the output files (default: 2)")
+    parser.add_argument("-p", "--processes", type=int, default=0,
+                        help="Run the detection in this many worker processes (each with its own model session), "
+                             "with --decode-workers decode processes. Default: 0, a single process using threads")
+    parser.add_argument("-t", "--threads-per-process", type=int, default=None,
+                        help="onnxruntime threads per worker process (default: an equal share of the CPU cores)")
+    parser.add_argument("--preprocessing", choices=["stretch", "letterbox"], default=None,
+                        help="Stretch the images to the model's input size, or letterbox them to keep the aspect ratio "
+                             "(default: the model's setting, otherwise stretch)")
+    parser.add_argument("--vectorized-nms", action="store_true",
+                        help="Use the class-aware NumPy NMS instead of OpenCV's, boxes of different classes then don't suppress each other")
+    parser.add_argument("--tiles", action="store_true",
+                        help="Detect the images in overlapping tiles, which finds smaller objects in high-resolution images but takes longer")
+    parser.add_argument("--tile-size", type=int, default=None, help="Width of a tile in image pixels (default: the model's input width)")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="Overlap of neighbouring tiles, e.g. 0.2 for 20%% (default: 0.2)")
+    parser.add_argument("--max-tiles", type=int, default=16,
+                        help="Maximum number of tiles per image, larger tiles are used if needed (default: 16)")
+    parser.add_argument("--first-pass", default=None, metavar="MODEL",
+                        help="Run this (faster) model first and the --model (with --tiles, if given) only on the images it is "
+                             "uncertain about. Use the same model as --model to only tile the uncertain images")
+    parser.add_argument("--empty-below", type=float, default=CascadeDetector.EMPTY_THRESHOLD,
+                        help=f"First pass: an image without detections above this confidence is empty (default: {CascadeDetector.EMPTY_THRESHOLD})")
+    parser.add_argument("--confident-above", type=float, default=CascadeDetector.CONFIDENT_THRESHOLD,
+                        help=f"First pass: an image with all detections above this confidence is done (default: {CascadeDetector.CONFIDENT_THRESHOLD})")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Keep only 8-bit copies of the images in memory, 16-bit RAW and HEIF images are decoded again to write the crops")
+    parser.add_argument("--store", default=None, help="Path of the detection store (default: detections.sqlite in the user cache directory)")
+    parser.add_argument("--no-store", action="store_true", help="Don't read or write stored detections, always run the model")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Output directory (default: an output_conf<confidence>_<model> directory inside the folder)")
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    image_files = list_image_files(args.folder)
+    if not image_files:
+        print(f"No supported images found in folder: {args.folder}")
+        return 1
+
+    if args.first_pass and args.processes > 0:
+        print("The --first-pass cascade is not supported with --processes")
+        return 1
+
+    model_path = _resolve_model_path(args.model)
+    store = None if args.no_store else DetectionStore(args.store)
+    try:
+        tiling = Tiling(args.tile_size, args.tile_overlap, args.max_tiles) if args.tiles else None
+        if args.processes > 0:
+            # Each worker process loads the model itself, here it is only checked without creating a session
+            if not read_model_metadata(model_path).input_shape:
+                raise IOError(f"Error reading ONNX model '{model_path}': no image input found")
+            detector = None
+            print(f"Model: {model_path}")
+        else:
+            # A compilation would delay the exit, detectorist-compile-models compiles the models ahead of time
+            detector = Detector(model_path, vectorized_nms=args.vectorized_nms, store=store, compile_in_background=False,
+                                preprocessing=args.preprocessing, tiling=tiling)
+            print(f"Loaded model: {model_path}")
+        if args.first_pass:
+            first_pass_path = _resolve_model_path(args.first_pass)
+            first_pass = Detector(first_pass_path, vectorized_nms=args.vectorized_nms, store=store, compile_in_background=False,
+                                  preprocessing=args.preprocessing)
+            print(f"Loaded first pass model: {first_pass_path}")
+            detector = CascadeDetector(first_pass, detector, args.empty_below, args.confident_above)
+    except (IOError, ValueError) as e:
+        print(e)
+        return 1
+
+    if args.output_dir:
+        output_dir = args.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+    else:
+        model_name = os.path.splitext(os.path.basename(model_path))[0]
+        output_dir = create_output_dir(args.folder, round(args.confidence * 100), model_name)
+
+    if args.action == "crop":
+        job = CropJob(output_dir, args.crop_mode, args.padding, args.aspect_ratio)
+    else:
+        job = SortJob(output_dir)
+
+    def on_progress(done, total, image_path):
+        print(f"[{done}/{total}] {os.path.basename(image_path)}")
+
+    image_paths = [os.path.join(args.folder, file_name) for file_name in image_files]
+    if args.processes > 0:
+        pipeline = ProcessBatchPipeline(
+            model_path,
+            image_paths,
+            job,
+            confidence_threshold=args.confidence,
+            nms_threshold=args.nms,
+            batch_size=args.batch_size,
+            decode_processes=args.decode_workers,
+            inference_processes=args.processes,
+            threads_per_process=args.threads_per_process,
+            store_path=store.db_path if store else None,
+            preprocessing=args.preprocessing,
+            tiling=tiling,
+            vectorized_nms=args.vectorized_nms,
+            low_memory=args.low_memory,
+            on_progress=on_progress
+        )
+    else:
+        image_cache.set_proxy_mode(args.low_memory)
+        pipeline = BatchPipeline(
+            detector,
+            image_paths,
+            job,
+            confidence_threshold=args.confidence,
+            nms_threshold=args.nms,
+            batch_size=args.batch_size,
+            decode_workers=args.decode_workers,
+            write_workers=args.write_workers,
+            on_progress=on_progress
+        )
+
+    start_time = time.perf_counter()
+    try:
+        completed = pipeline.run()
+    except KeyboardInterrupt:
+        pipeline.cancel()
+        completed = False
+    except Exception as e:
+        print(f"Error: {e}")
+        completed = False
+    elapsed = time.perf_counter() - start_time
+
+    processed = pipeline.processed_count
+    print(f"Processed {processed}/{len(image_files)} images in {elapsed:.1f} s "
+          f"({processed / elapsed if elapsed > 0 else 0:.2f} images/s, {elapsed / max(processed, 1) * 1000:.0f} ms/image)")
+    if args.first_pass:
+        print(detector.stats.summary())
+    print(f"Output directory: {output_dir}")
+    return 0 if completed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
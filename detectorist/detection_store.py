@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import numpy as np
+
+from .utils import get_cache_path, hash_file
+
+
+class DetectionStore:
+    """
+    Persistent single-file (SQLite) store of raw detection proposals.
+
+    Records are keyed by the content hash of the image file, the hash of the model file and the parameters the
+    proposals were computed with (the preprocessing and how the image was decoded, see Detector.output_params()), so
+    they survive renames and re-opening a folder, but are never re-used for a changed image or model, or for another
+    decode of the image (e.g. a reduced decode for viewing and the full-resolution decode of a crop run).
+    File hashes are remembered per path together with the file's mtime and size. Only when those change the file
+    is hashed again, and the records of the old content are removed once no known file refers to them anymore.
+
+    To keep the records small, only proposals with a confidence of at least MIN_CONFIDENCE are stored.
+    """
+
+    # Proposals below this confidence are not stored (confidence thresholds below it make no practical sense)
+    MIN_CONFIDENCE = 0.01
+
+    DEFAULT_FILE_NAME = "detections.sqlite"
+
+    def __init__(self, db_path: str = None):
+        """
+        Opens (or creates) the store.
+
+        Args:
+            db_path (str, optional): Path of the SQLite file. Defaults to a file in the user cache directory.
+        """
+        self.db_path = db_path or get_cache_path(self.DEFAULT_FILE_NAME)
+        self._lock = threading.Lock()
+        # The connection is shared by the GUI and the batch worker threads, access is serialized by the lock.
+        # Other processes (e.g. the workers of a ProcessBatchPipeline) use their own connections, hence the generous timeout.
+        self._connection = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL
+                )""")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS detections (
+                    content_hash TEXT NOT NULL,
+                    model_hash TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    num_proposals INTEGER NOT NULL,
+                    num_columns INTEGER NOT NULL,
+                    proposals BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (content_hash, model_hash, params)
+                )""")
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def file_hash(self, path: str) -> str:
+        """
+        Returns the content hash of a file, re-using the remembered hash while the file's mtime and size are unchanged.
+
+        Args:
+            path (str): Path of the file.
+
+        Returns:
+            str: The SHA-256 hex digest of the file content.
+        """
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._connection.execute("SELECT mtime_ns, size, content_hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return row[2]
+
+        content_hash = hash_file(path)
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)",
+                                     (path, stat.st_mtime_ns, stat.st_size, content_hash))
+            if row and row[2] != content_hash:
+                self._remove_orphaned_detections(row[2])
+        return content_hash
+
+    def _remove_orphaned_detections(self, old_hash: str):
+        """Removes the records of an image or model content that no known file has anymore."""
+        in_use = self._connection.execute("SELECT 1 FROM files WHERE content_hash = ? LIMIT 1", (old_hash,)).fetchone()
+        if not in_use:
+            self._connection.execute("DELETE FROM detections WHERE content_hash = ? OR model_hash = ?", (old_hash, old_hash))
+
+    @staticmethod
+    def _params_key(params: dict) -> str:
+        """Serializes the parameters into a stable key."""
+        return json.dumps(params, sort_keys=True)
+
+    def get(self, image_path: str, model_hash: str, params: dict) -> np.ndarray | None:
+        """
+        Looks up the stored proposals of an image.
+
+        Args:
+            image_path (str): Path of the image file.
+            model_hash (str): Content hash of the model file (see file_hash()).
+            params (dict): The parameters the proposals were computed with (see Detector.output_params()).
+
+        Returns:
+            The stored proposals (see Detector.infer()), or None if there is no record.
+        """
+        content_hash = self.file_hash(image_path)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT num_proposals, num_columns, proposals FROM detections WHERE content_hash = ? AND model_hash = ? AND params = ?",
+                (content_hash, model_hash, self._params_key(params))).fetchone()
+        if row is None:
+            return None
+        num_proposals, num_columns, data = row
+        return np.frombuffer(data, dtype=np.float32).reshape(num_proposals, num_columns).copy()
+
+    def put(self, image_path: str, model_hash: str, params: dict, proposals: np.ndarray):
+        """
+        Stores the proposals of an image, dropping the proposals below MIN_CONFIDENCE.
+
+        Args:
+            image_path (str): Path of the image file.
+            model_hash (str): Content hash of the model file (see file_hash()).
+            params (dict): The parameters the proposals were computed with (see Detector.output_params()).
+            proposals: The raw proposals of shape (num_proposals, 4 + num_classes).
+        """
+        content_hash = self.file_hash(image_path)
+        proposals = proposals[proposals[:, 4:].max(axis=1, initial=0) >= self.MIN_CONFIDENCE]
+        proposals = np.ascontiguousarray(proposals, dtype=np.float32)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO detections (content_hash, model_hash, params, num_proposals, num_columns, proposals, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, model_hash, self._params_key(params), proposals.shape[0], proposals.shape[1], proposals.tobytes(), time.time()))
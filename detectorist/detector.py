@@ -1,9 +1,107 @@
+import os
 import re
-import cv2
+import json
+import time
+import threading
+from concurrent.futures import Future
 import numpy as np
-import onnxruntime as ort
 
+from .detection_store import DetectionStore
 from .image_object import ImageObject
+from .model_compiler import compile_model_in_background, find_compiled_model
+from .preprocessing import PREPROCESSING_MODES, InputBuffers, load_model_settings
+from .session_profile import SessionProfile, load_profile
+from .structures import LRUCache
+from .tiling import Tiling
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, class_ids: np.ndarray = None) -> np.ndarray:
+    """
+    Greedy Non-Maximum Suppression implemented with NumPy.
+
+    Each iteration keeps the highest scoring remaining box and drops all remaining boxes overlapping it by more
+    than iou_threshold, computing the overlaps of all remaining boxes at once.
+
+    Args:
+        boxes: An array of shape (N, 4) with boxes in (x, y, w, h) format.
+        scores: An array of shape (N,) with the box scores.
+        iou_threshold: Boxes with an IoU above this threshold are suppressed.
+        class_ids: Optional array of shape (N,) with class ids. If given, boxes only suppress boxes of the same class.
+
+    Returns:
+        np.ndarray: The indices of the kept boxes, sorted by decreasing score.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+
+    boxes = boxes.astype(np.float32)
+    if class_ids is not None:
+        # Shift the boxes of each class into their own (non-overlapping) coordinate range, which must span the
+        # whole extent of the boxes, including negative coordinates of boxes reaching over the image edge
+        span = (boxes[:, :2] + boxes[:, 2:]).max() - boxes[:, :2].min() + 1
+        boxes[:, :2] += class_ids[:, None] * span
+
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        intersection = inter_w * inter_h
+        union = areas[i] + areas[rest] - intersection
+        iou = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.intp)
+
+
+class Detections:
+    """
+    Array-backed detection results.
+
+    Stores boxes, scores and class ids as NumPy arrays, but behaves like the list of
+    (box, score, class_name) tuples returned by Detector.detect(), so it can be used interchangeably.
+    """
+
+    @classmethod
+    def empty(cls, class_names: dict):
+        """Returns an empty Detections object."""
+        return cls(np.empty((0, 4), dtype=int), np.empty(0, dtype=np.float32), np.empty(0, dtype=int), class_names)
+
+    def __init__(self, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray, class_names: dict):
+        """
+        Args:
+            boxes: An array of shape (N, 4) with boxes in (x, y, w, h) format (original image coordinates).
+            scores: An array of shape (N,) with the detection scores.
+            class_ids: An array of shape (N,) with the class ids.
+            class_names: A dictionary mapping class IDs to class names.
+        """
+        self.boxes = boxes
+        self.scores = scores
+        self.class_ids = class_ids
+        self.class_names = class_names
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Detections index out of range")
+        class_id = int(self.class_ids[index])
+        class_name = self.class_names.get(class_id, f"Class {class_id}")
+        return self.boxes[index].tolist(), self.scores[index], class_name
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
 
 
 class Detector:
@@ -11,6 +109,20 @@ class Detector:
     Class to detect objects in an image using machine learning.
     """
 
+    # Raw model outputs of the most recently processed images, shared by all Detector instances
+    RAW_OUTPUT_CACHE_SIZE = 32
+    # Number of images per session run in detect_batch() for models with a dynamic batch dimension
+    DEFAULT_BATCH_SIZE = 8
+    # Proposals below this confidence are dropped from the raw outputs, as the DetectionStore doesn't keep them either,
+    # so the results don't depend on the cache they come from
+    MIN_CONFIDENCE = DetectionStore.MIN_CONFIDENCE
+    # Distance (in model input pixels) from an inner tile edge within which a tile's proposals count as cut off
+    TILE_EDGE_MARGIN = 2
+    _raw_output_cache = LRUCache(RAW_OUTPUT_CACHE_SIZE)
+    # Futures of the raw outputs infer() is computing right now (by cache key), so an image is never inferred twice at once
+    _in_flight = {}
+    _in_flight_lock = threading.Lock()
+
     @staticmethod
     def _label_class_names_to_dict(onnx_names_str):
         """
@@ -38,18 +150,58 @@ class Detector:
             entries[key] = val
         return entries
 
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, vectorized_nms: bool = False, store: DetectionStore = None, num_threads: int = None,
+                 profile: SessionProfile = None, use_compiled_model: bool = True, compile_in_background: bool = True,
+                 io_binding: bool = True, preprocessing: str = None, tiling: Tiling = None):
         """
         Initializes the Detector by loading the ONNX model.
 
         Args:
             model_path (str): Path to the ONNX model file.
+            vectorized_nms (bool): Use the NumPy (class-aware) NMS instead of OpenCV's NMSBoxes.
+                The detection results are then returned as Detections objects.
+            store (DetectionStore, optional): Persistent store for the raw model outputs, read before running the model.
+            num_threads (int, optional): Number of threads onnxruntime uses for an inference, overrides the profile's setting.
+            profile (SessionProfile, optional): The onnxruntime session settings. Defaults to the profile saved by the
+                autotuner for this model and machine, or onnxruntime's defaults if the model hasn't been tuned.
+            use_compiled_model (bool): Load the pre-compiled ORT-format version of the model if there is a valid one.
+            compile_in_background (bool): If use_compiled_model finds no valid compiled model, compile it on a background
+                thread, so the next load is faster (see model_compiler.compile_model_in_background()). Short-lived users
+                like worker processes and the command line turn this off, detectorist-compile-models compiles for them.
+            io_binding (bool): Bind the reused input and output buffers to the session with onnxruntime IOBinding.
+            preprocessing (str, optional): 'stretch' to resize the images to the model's input size, or 'letterbox' to
+                keep their aspect ratio. Defaults to the model's setting in the JSON file next to it, otherwise 'stretch'.
+            tiling (Tiling, optional): Detect high-resolution images in overlapping tiles (see Tiling). This is the
+                default of the tiling parameter of the detection methods, a shared Detector (like the viewer's) is
+                given the tiling per call instead.
 
         Raises:
-            IOError: If the model file cannot be loaded.
+            IOError: If the model file cannot be loaded, or the preprocessing mode is unknown.
         """
+        # onnxruntime (and cv2 in postprocess()) are imported on first use, so the application starts faster
+        import onnxruntime as ort
+
+        start_time = time.perf_counter()
+        self.model_path = model_path
+        self.tiling = tiling
+        self.vectorized_nms = vectorized_nms
+        self.store = store
+        self._model_hash = None
         try:
-            self.session = ort.InferenceSession(model_path)
+            self.preprocessing = preprocessing or load_model_settings(model_path).get("preprocessing", "stretch")
+            if self.preprocessing not in PREPROCESSING_MODES:
+                raise ValueError(f"Unknown preprocessing mode '{self.preprocessing}', expected one of {list(PREPROCESSING_MODES)}")
+            self.profile = profile or load_profile(model_path) or SessionProfile()
+            session_options = self.profile.to_session_options()
+            if num_threads:
+                session_options.intra_op_num_threads = num_threads
+
+            # A profile writing its own optimized model needs the original model
+            use_compiled_model = use_compiled_model and not self.profile.optimized_model_path
+            compiled_model_path = find_compiled_model(model_path) if use_compiled_model else None
+            self.session = ort.InferenceSession(compiled_model_path or model_path, sess_options=session_options)
+            if use_compiled_model and compile_in_background and not compiled_model_path:
+                compile_model_in_background(model_path, self.profile)
             onnx_names_str = self.session.get_modelmeta().custom_metadata_map.get('names')
             self.class_names = self._label_class_names_to_dict(onnx_names_str)
 
@@ -60,57 +212,312 @@ class Detector:
         self.input_name = self.session.get_inputs()[0].name
         input_shape = self.session.get_inputs()[0].shape
         self.input_height, self.input_width = input_shape[2], input_shape[3]
+        # The batch dimension is a string (or None) for models exported with a dynamic batch size
+        self.fixed_batch_size = input_shape[0] if isinstance(input_shape[0], int) else None
+        self.input_buffers = InputBuffers(self.session, self.input_width, self.input_height, self.fixed_batch_size, io_binding,
+                                          letterbox=self.preprocessing == "letterbox")
+        self.load_seconds = time.perf_counter() - start_time
 
-    def detect(self, image: ImageObject, confidence_threshold: float = 0.5, nms_threshold: float = 0.45) -> list:
+    def warm_up(self, runs: int = 1) -> float:
         """
-        Detects objects in an image using the ONNX model.
+        Runs the model on a dummy image, so the first real detection doesn't pay for onnxruntime's lazy initialization.
+
+        Args:
+            runs (int): The number of warm-up runs.
+
+        Returns:
+            float: The time the warm-up took in seconds.
+        """
+        dummy_image = np.zeros((self.input_height, self.input_width, 3), dtype=np.uint8)
+        start_time = time.perf_counter()
+        for _ in range(runs):
+            self.input_buffers.run([dummy_image])
+        return time.perf_counter() - start_time
+
+    def infer(self, image: ImageObject, tiling: Tiling = None) -> np.ndarray:
+        """
+        Runs the ONNX model on an image and returns the raw detection proposals.
+
+        The raw proposals only depend on the image data and the model, so they are cached (keyed by image path, how the
+        image was decoded and the model, see output_params()) and re-used when only the post-processing thresholds
+        change. If the Detector has a DetectionStore, it is consulted before running the model, and new outputs are
+        persisted in it. If another thread is inferring the same image right now (e.g. the ImagePrefetcher), its
+        result is waited for instead of running the model a second time.
 
         Args:
             image: The input image (Image object).
-            confidence_threshold: The confidence threshold for filtering detections.
-            nms_threshold: The Non-Maximum Suppression threshold.
+            tiling: Detect the image in tiles with these settings, defaults to the Detector's tiling (see __init__).
 
         Returns:
-            A list of bounding boxes for the detected objects.
-            Each box is in [x, y, w, h] format.
+            A float32 array of shape (num_proposals, 4 + num_classes). Each row is [x, y, w, h, class1_score, ...],
+            where (x, y) is the top-left corner of the box in original image coordinates. Proposals below
+            MIN_CONFIDENCE are left out.
+        """
+        tiling = tiling or self.tiling
+        proposals = self._lookup(image, tiling)
+        if proposals is not None:
+            return proposals
+
+        key = self._cache_key(image, tiling)
+        with self._in_flight_lock:
+            running_future = self._in_flight.get(key)
+            if running_future is None:
+                # The output could have been remembered since the lookup, right before its future was removed
+                proposals = self._raw_output_cache.get(key)
+                if proposals is not None:
+                    return proposals
+                future = self._in_flight[key] = Future()
+        if running_future is not None:
+            return running_future.result()
+        try:
+            proposals = self._remember(image, self._run_model(image, tiling), tiling)
+            future.set_result(proposals)
+            return proposals
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+
+    def preprocessing_params(self, tiling: Tiling = None) -> dict:
+        """
+        Returns the preprocessing parameters the raw model output depends on (see output_params()), with the tiling
+        defaulting to the Detector's tiling.
         """
-        original_height, original_width, _ = image.image_data.shape
+        tiling = tiling or self.tiling
+        return {"input_width": self.input_width, "input_height": self.input_height, "preprocessing": self.preprocessing,
+                "tiling": tiling.to_dict() if tiling else None}
 
-        # Preprocess the image data so we can use it for the onnx model
-        input_image = image.preprocess_for_onnx(self.input_width, self.input_height)
+    def output_params(self, image: ImageObject, tiling: Tiling = None) -> dict:
+        """
+        Returns the parameters (besides the image file and model) that the raw model output of an image depends on:
+        the preprocessing parameters and how the image was decoded (see ImageObject.decode_info), so e.g. the proposals
+        of a reduced decode are never used for the full-resolution image.
+        """
+        return dict(self.preprocessing_params(tiling), decode=image.decode_info)
 
-        # Run the model
-        outputs = self.session.run(None, {self.input_name: input_image})
+    def decode_size(self, tiling: Tiling = None) -> tuple[int, int] | None:
+        """
+        Returns the (width, height) the images need to be decoded at for this Detector (see ImageObject), or None if it
+        needs the full resolution (tiled detection, with the tiling defaulting to the Detector's tiling).
+        """
+        if tiling or self.tiling:
+            return None
+        return self.input_width, self.input_height
+
+    @property
+    def model_hash(self) -> str | None:
+        """Returns the content hash of the model file as known by the detection store, or None without a store."""
+        if self.store is None:
+            return None
+        if self._model_hash is None:
+            self._model_hash = self.store.file_hash(self.model_path)
+        return self._model_hash
+
+    def _cache_key(self, image: ImageObject, tiling: Tiling) -> tuple:
+        """
+        Returns the key of an image's raw proposals in the in-memory cache shared by all Detectors. The file's mtime and
+        size are part of it, so the proposals of an image file changed since are not used.
+        """
+        try:
+            stat = os.stat(image.image_path)
+            file_version = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            file_version = None
+        return self.model_path, json.dumps(self.output_params(image, tiling), sort_keys=True), image.image_path, file_version
+
+    def _lookup(self, image: ImageObject, tiling: Tiling) -> np.ndarray | None:
+        """Returns the raw proposals of an image from the in-memory cache or the detection store, if available."""
+        proposals = self._raw_output_cache.get(self._cache_key(image, tiling))
+        if proposals is None and self.store is not None:
+            proposals = self.store.get(image.image_path, self.model_hash, self.output_params(image, tiling))
+            if proposals is not None:
+                self._raw_output_cache.put(self._cache_key(image, tiling), proposals)
+        return proposals
+
+    def _remember(self, image: ImageObject, proposals: np.ndarray, tiling: Tiling) -> np.ndarray:
+        """
+        Puts newly computed raw proposals into the in-memory cache and the detection store, and returns them without the
+        proposals below MIN_CONFIDENCE.
+        """
+        proposals = proposals[proposals[:, 4:].max(axis=1, initial=0) >= self.MIN_CONFIDENCE]
+        self._raw_output_cache.put(self._cache_key(image, tiling), proposals)
+        if self.store is not None:
+            self.store.put(image.image_path, self.model_hash, self.output_params(image, tiling), proposals)
+        return proposals
+
+    def has_cached_output(self, image: ImageObject, tiling: Tiling = None) -> bool:
+        """
+        Returns True if the raw model output for the given (decoded) image is already cached for this model, with the
+        tiling defaulting to the Detector's tiling.
+        """
+        return self._cache_key(image, tiling or self.tiling) in self._raw_output_cache
+
+    def _run_model(self, image: ImageObject, tiling: Tiling) -> np.ndarray:
+        """Runs the ONNX session on the image and converts the YOLO output to proposals in image coordinates."""
+        if tiling:
+            return self._run_model_tiled(image, tiling)
+        output, transforms = self.input_buffers.run([image.image_data])
+        return self._to_full_resolution(self._output_to_proposals(output[0], transforms[0]), image)
+
+    @staticmethod
+    def _to_full_resolution(proposals: np.ndarray, image: ImageObject) -> np.ndarray:
+        """Scales proposals of an image decoded at a reduced resolution to full-resolution coordinates, in place."""
+        if image.is_reduced:
+            x_scale, y_scale = image.scale
+            proposals[:, [0, 2]] *= x_scale
+            proposals[:, [1, 3]] *= y_scale
+        return proposals
+
+    def _run_model_tiled(self, image: ImageObject, tiling: Tiling) -> np.ndarray:
+        """
+        Runs the ONNX session on the tiles of an image (and the whole image) as one batch, and merges the proposals
+        of all tiles in image coordinates. Overlapping proposals of different tiles are resolved by the NMS.
+        """
+        image_data = image.image_data
+        image_height, image_width = image_data.shape[:2]
+        rects = tiling.tile_rects(image_width, image_height, self.input_width, self.input_height)
+        if tiling.include_full_image and len(rects) > 1:
+            rects.append((0, 0, image_width, image_height))
+        tiles = [image_data[y:y + height, x:x + width] for x, y, width, height in rects]
+
+        parts = []
+        chunk_size = self.fixed_batch_size or len(tiles)
+        for start in range(0, len(tiles), chunk_size):
+            output, transforms = self.input_buffers.run(tiles[start:start + chunk_size])
+            for j, transform in enumerate(transforms):
+                proposals = self._output_to_proposals(output[j], transform)
+                # The many low-confidence proposals of all tiles would bloat the caches
+                proposals = proposals[proposals[:, 4:].max(axis=1, initial=0) >= self.MIN_CONFIDENCE]
+                x, y, width, height = rects[start + j]
+                if tiling.include_full_image and (width, height) != (image_width, image_height):
+                    proposals = proposals[~self._touches_inner_tile_edge(proposals, rects[start + j], image_width, image_height, transform)]
+                proposals[:, 0] += x
+                proposals[:, 1] += y
+                parts.append(proposals)
+        return self._to_full_resolution(np.concatenate(parts), image)
+
+    @staticmethod
+    def _touches_inner_tile_edge(proposals: np.ndarray, rect: tuple, image_width: int, image_height: int, transform: tuple) -> np.ndarray:
+        """
+        Returns a mask of the proposals (in tile coordinates) that touch an edge of the tile inside the image.
+        These are usually objects cut off by the tile, which a neighbouring tile or the whole image detects completely.
+        """
+        x, y, width, height = rect
+        x_scale, y_scale, _, _ = transform
+        margin_x = Detector.TILE_EDGE_MARGIN * x_scale
+        margin_y = Detector.TILE_EDGE_MARGIN * y_scale
+        return (((x > 0) & (proposals[:, 0] <= margin_x)) |
+                ((y > 0) & (proposals[:, 1] <= margin_y)) |
+                ((x + width < image_width) & (proposals[:, 0] + proposals[:, 2] >= width - margin_x)) |
+                ((y + height < image_height) & (proposals[:, 1] + proposals[:, 3] >= height - margin_y)))
+
+    def _output_to_proposals(self, output: np.ndarray, transform: tuple) -> np.ndarray:
+        """
+        Converts the YOLO output of a single image to proposals in original image coordinates.
+
+        Args:
+            output: The model output for one image with shape (4 + num_classes, num_proposals).
+            transform: The (x_scale, y_scale, pad_x, pad_y) mapping from model input to image coordinates,
+                as returned by the preprocessing (see preprocessing.preprocess_into()).
+
+        Returns:
+            A new float32 array of shape (num_proposals, 4 + num_classes), see infer(). It doesn't share memory with the
+            output, which may be a reused buffer.
+        """
+        x_scale, y_scale, pad_x, pad_y = transform
 
         # Process the output from YOLO
-        # The output shape is (1, 4 + num_classes, num_proposals)
+        # The output shape is (4 + num_classes, num_proposals)
         # After transposing, we get (num_proposals, 4 + num_classes)
-        output = outputs[0][0].transpose()
+        output = output.transpose()
 
-        if not output.any():
-            return []
+        # In YOLO, each proposal is [center_x, center_y, w, h, class1_score, class2_score, ...].
+        # Convert boxes from YOLO format (center_x, center_y, w, h) to OpenCV's NMS format (x, y, w, h),
+        # where (x,y) is the top-left corner, remove the letterbox padding and scale to the original image size.
+        proposals = np.empty(output.shape, dtype=np.float32)
+        proposals[:, 0] = (output[:, 0] - output[:, 2] / 2 - pad_x) * x_scale
+        proposals[:, 1] = (output[:, 1] - output[:, 3] / 2 - pad_y) * y_scale
+        proposals[:, 2] = output[:, 2] * x_scale
+        proposals[:, 3] = output[:, 3] * y_scale
+        proposals[:, 4:] = output[:, 4:]
+        return proposals
+
+    def infer_batch(self, images: list[ImageObject], batch_size: int = DEFAULT_BATCH_SIZE, tiling: Tiling = None) -> list[np.ndarray]:
+        """
+        Runs the ONNX model on several images at once and returns the raw proposals per image.
 
-        # Scale factors
-        x_scale = original_width / self.input_width
-        y_scale = original_height / self.input_height
+        The images are preprocessed straight into a reused N×3×H×W input buffer. Models exported with a dynamic batch dimension are
+        run with up to batch_size images per call, models with a fixed batch dimension are always run with exactly that
+        many images (the last batch is padded). Cached or stored outputs are re-used and new outputs are cached and
+        stored, like in infer().
 
-        # In YOLO, each proposal is [center_x, center_y, w, h, class1_score, class2_score, ...].
+        Args:
+            images: The input images (Image objects).
+            batch_size: The maximum number of images per session run (ignored for fixed-batch models).
+            tiling: Detect the images in tiles with these settings, defaults to the Detector's tiling (see __init__).
+
+        Returns:
+            A list with the raw proposals (see infer()) for each image, in the same order as the input.
+        """
+        tiling = tiling or self.tiling
+        results = [self._lookup(image, tiling) for image in images]
+        pending = [i for i, proposals in enumerate(results) if proposals is None]
+
+        if tiling:
+            # The tiles of every image already form a batch
+            for i in pending:
+                results[i] = self._remember(images[i], self._run_model_tiled(images[i], tiling), tiling)
+            return results
+
+        batch_size = self.fixed_batch_size or max(1, batch_size)
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            output, transforms = self.input_buffers.run([images[i].image_data for i in chunk])
+
+            for j, i in enumerate(chunk):
+                proposals = self._to_full_resolution(self._output_to_proposals(output[j], transforms[j]), images[i])
+                results[i] = self._remember(images[i], proposals, tiling)
+
+        return results
+
+    def postprocess(self, proposals: np.ndarray, confidence_threshold: float = 0.5, nms_threshold: float = 0.45) -> list:
+        """
+        Filters raw proposals (as returned by infer()) by confidence and applies Non-Maximum Suppression.
+
+        The confidence filter is applied on the whole array first, so only the (few) surviving proposals
+        are passed on to the NMS and converted to Python objects.
+
+        Args:
+            proposals: The raw proposals of shape (num_proposals, 4 + num_classes).
+            confidence_threshold: The confidence threshold for filtering detections.
+            nms_threshold: The Non-Maximum Suppression threshold.
+
+        Returns:
+            A list of (box, score, class_name) tuples for the detected objects, or a Detections object
+            if the Detector uses the vectorized NMS. Each box is in [x, y, w, h] format.
+        """
         # The confidence of a detection is the highest class score.
-        boxes_yolo = output[:, :4]
-        class_scores = output[:, 4:]
+        class_scores = proposals[:, 4:]
         scores = np.max(class_scores, axis=1)
-        class_ids = np.argmax(class_scores, axis=1)
+        candidates = scores > confidence_threshold
+        if not candidates.any():
+            return Detections.empty(self.class_names) if self.vectorized_nms else []
 
-        # Convert boxes from YOLO format (center_x, center_y, w, h) to OpenCV's NMS format (x, y, w, h),
-        # where (x,y) is the top-left corner, and scale to the original image size.
-        x1 = (boxes_yolo[:, 0] - boxes_yolo[:, 2] / 2) * x_scale
-        y1 = (boxes_yolo[:, 1] - boxes_yolo[:, 3] / 2) * y_scale
-        w_scaled = boxes_yolo[:, 2] * x_scale
-        h_scaled = boxes_yolo[:, 3] * y_scale
-        boxes_for_nms = np.column_stack((x1, y1, w_scaled, h_scaled)).astype(int).tolist()
+        scores = scores[candidates]
+        class_ids = np.argmax(class_scores[candidates], axis=1)
+        boxes = proposals[candidates, :4].astype(int)
+
+        if self.vectorized_nms:
+            keep = non_max_suppression(boxes, scores, nms_threshold, class_ids)
+            return Detections(boxes[keep], scores[keep], class_ids[keep], self.class_names)
+
+        import cv2
 
         # Apply Non-Maximum Suppression
         # NMSBoxes returns indices of the boxes to keep
+        boxes_for_nms = boxes.tolist()
         indices = cv2.dnn.NMSBoxes(boxes_for_nms, scores.tolist(), score_threshold=confidence_threshold, nms_threshold=nms_threshold)
 
         final_results = []
@@ -122,4 +529,38 @@ class Detector:
                 class_name = self.class_names.get(class_id, f"Class {class_id}")
                 final_results.append((boxes_for_nms[i], scores[i], class_name))
 
-        return final_results
\ No newline at end of file
+        return final_results
+
+    def detect(self, image: ImageObject, confidence_threshold: float = 0.5, nms_threshold: float = 0.45, tiling: Tiling = None) -> list:
+        """
+        Detects objects in an image using the ONNX model.
+
+        Args:
+            image: The input image (Image object).
+            confidence_threshold: The confidence threshold for filtering detections.
+            nms_threshold: The Non-Maximum Suppression threshold.
+            tiling: Detect the image in tiles with these settings, defaults to the Detector's tiling (see __init__).
+
+        Returns:
+            A list of (box, score, class_name) tuples for the detected objects.
+            Each box is in [x, y, w, h] format.
+        """
+        return self.postprocess(self.infer(image, tiling), confidence_threshold, nms_threshold)
+
+    def detect_batch(self, images: list[ImageObject], confidence_threshold: float = 0.5, nms_threshold: float = 0.45, batch_size: int = DEFAULT_BATCH_SIZE,
+                     tiling: Tiling = None) -> list[list]:
+        """
+        Detects objects in several images using batched ONNX model runs.
+
+        Args:
+            images: The input images (Image objects).
+            confidence_threshold: The confidence threshold for filtering detections.
+            nms_threshold: The Non-Maximum Suppression threshold.
+            batch_size: The maximum number of images per session run (ignored for fixed-batch models).
+            tiling: Detect the images in tiles with these settings, defaults to the Detector's tiling (see __init__).
+
+        Returns:
+            A list with one result list per image, in the same format as returned by detect().
+        """
+        return [self.postprocess(proposals, confidence_threshold, nms_threshold)
+                for proposals in self.infer_batch(images, batch_size, tiling)]
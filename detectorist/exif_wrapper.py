@@ -1,4 +1,3 @@
-import exifread
 from PIL import Image as PILImage
 from PIL.ExifTags import TAGS, GPSTAGS, IFD
 from fractions import Fraction
@@ -6,6 +5,7 @@ from typing import Any, Union
 import os
 
 from .structures import CaseInsensitiveDict
+from .image_utils import open_pil_image
 
 
 class ExifWrapper:
@@ -21,7 +21,7 @@ class ExifWrapper:
             else:
                 # For non-ARW files, open with PIL and then load EXIF
                 try:
-                    pil_image = PILImage.open(image_source)
+                    pil_image = open_pil_image(image_source)
                     self._exif_data = self._load_exif_data_pil(pil_image)
                 except Exception as e:
                     print(f"Could not open image {image_source} with PIL: {e}")
@@ -184,6 +184,8 @@ class ExifWrapper:
         """
         Loads EXIF data from the image file using the exifread library into self._exif_data.
         """
+        import exifread
+
         exif_data = CaseInsensitiveDict()
         try:
             with open(image_path, 'rb') as f:
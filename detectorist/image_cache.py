@@ -0,0 +1,114 @@
+"""
+Process-wide cache of decoded images, shared by the viewer, the ImagePrefetcher and the BatchPipeline.
+
+Decoding is the slowest part of showing an image (a RAW file needs a demosaic, a 16-bit image hundreds of MB), so the
+decoded ImageObjects are kept in least-recently-used order within a memory budget. The budget is accounted in bytes of
+image data, so a 16-bit image counts twice as much as an 8-bit image of the same size. There is one entry per file:
+an image decoded in full quality (or for a larger decode size hint) also serves the smaller requests, and a newer
+decode of the same file replaces the older one. Entries of a modified file are not used anymore.
+
+In the low-memory proxy mode (see set_proxy_mode()) only 8-bit proxies of the images are decoded and cached, the
+16-bit data of RAW and HEIF files is decoded again (and not cached) when a crop is written.
+
+The cached images are shared, so their image data must not be modified.
+"""
+import os
+
+from .image_object import ImageObject
+from .structures import LRUCache
+
+DEFAULT_BUDGET_MB = 1024
+
+_cache = LRUCache(max_bytes=DEFAULT_BUDGET_MB * 1024 * 1024, size_of=lambda image: image.nbytes)
+_proxy_mode = False
+
+
+def _key(image_path: str) -> tuple:
+    """Returns the cache key of an image file, which changes when the file is modified."""
+    stat = os.stat(image_path)
+    return os.path.realpath(image_path), stat.st_mtime_ns, stat.st_size
+
+
+def load_image(image_path: str, decode_size: tuple[int, int] = None, remember: bool = True, proxy: bool = None) -> ImageObject:
+    """
+    Returns the decoded image from the cache, or decodes it (see ImageObject).
+
+    Args:
+        image_path: Path to the image file.
+        decode_size: The decode size hint (see ImageObject), None for full quality.
+        remember: Put a newly decoded image into the cache. Passes over many files that are unlikely to be needed
+            again (like a batch action) use False, so they don't evict the images of the viewer.
+        proxy: Decode an 8-bit proxy (see ImageObject), defaults to the proxy mode (see set_proxy_mode()).
+
+    Returns:
+        ImageObject: The decoded image. It may be decoded at a larger size than requested.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        IOError: If the image cannot be decoded.
+    """
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Error: Image file not found at '{image_path}'")
+    if proxy is None:
+        proxy = _proxy_mode
+    key = _key(image_path)
+    image = _cache.get(key)
+    if image is not None and image.covers(decode_size, proxy):
+        return image
+    image = ImageObject(image_path, decode_size, proxy)
+    if remember:
+        _cache.put(key, image)
+    return image
+
+
+def peek_image(image_path: str, decode_size: tuple[int, int] = None) -> ImageObject | None:
+    """Returns the image if load_image() would return a cached one, otherwise None, without counting a cache hit or miss."""
+    try:
+        image = _cache.peek(_key(image_path))
+    except OSError:
+        return None
+    return image if image is not None and image.covers(decode_size, _proxy_mode) else None
+
+
+def set_proxy_mode(enabled: bool):
+    """
+    Switches the low-memory proxy mode on or off: load_image() then decodes only 8-bit proxies of 16-bit images.
+    Switching it on drops the cached images, so their full-quality data is freed.
+    """
+    global _proxy_mode
+    if enabled and not _proxy_mode:
+        _cache.clear()
+    _proxy_mode = enabled
+
+
+def is_proxy_mode() -> bool:
+    """Returns True if the low-memory proxy mode is on."""
+    return _proxy_mode
+
+
+def set_budget_mb(budget_mb: int):
+    """Sets the memory budget of the cache in MB, evicting images if they don't fit anymore."""
+    _cache.resize(max_bytes=budget_mb * 1024 * 1024)
+
+
+def clear():
+    """Removes all images from the cache."""
+    _cache.clear()
+
+
+def stats() -> dict:
+    """
+    Returns the counters of the cache, for sizing its budget.
+
+    Returns:
+        dict: The number of images, their size in MB, the budget in MB, and the hits, misses and evictions.
+    """
+    return {"images": len(_cache), "size_mb": _cache.nbytes / (1024 * 1024), "budget_mb": _cache.max_bytes / (1024 * 1024),
+            "hits": _cache.hits, "misses": _cache.misses, "evictions": _cache.evictions}
+
+
+def summary() -> str:
+    """Returns a one-line report of the cache counters."""
+    s = stats()
+    return (f"Decoded image cache: {s['images']} images, {s['size_mb']:.0f} of {s['budget_mb']:.0f} MB, "
+            f"{s['hits']} hits, {s['misses']} misses, {s['evictions']} evictions")
@@ -1,26 +1,171 @@
 import os
-from PySide6.QtWidgets import QLabel, QRubberBand, QToolTip
-from PySide6.QtGui import QPixmap, QPainter, QImage, QColor, QBrush, QPen
-from PySide6.QtCore import Qt, QRect, QSize, QPoint, QObject, QEvent
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtWidgets import QLabel, QToolTip, QWidget
+from PySide6.QtGui import QPixmap, QPainter, QImage, QColor
+from PySide6.QtCore import Qt, QRect, QSize, QPoint, QObject, QEvent, QTimer, Signal
 import numpy as np
-from .image_object import ImageObject
+from .image_cache import load_image
+from .image_utils import convert_16bit_to_8bit
 
 
-class CustomRubberBand(QRubberBand):
-    def __init__(self, shape, parent=None, border_color=QColor(255, 165, 0, 255), fill_color=QColor(255, 165, 0, 13), score=None, class_name=None):
-        super().__init__(shape, parent)
-        self.border_color = border_color
-        self.fill_color = fill_color
-        self.score = score
-        self.class_name = class_name
+def qimage_from_array(rgb_image: np.ndarray) -> QImage:
+    """
+    Wraps 8-bit RGB image data in a QImage without copying it.
+
+    The QImage uses the memory of the array, so the array must stay alive (and unchanged) as long as the QImage is
+    used. Only for arrays whose rows are not contiguous RGB pixels (e.g. a view with a step) the QImage gets its own
+    copy of the data.
+
+    Args:
+        rgb_image: The image data (uint8) of shape (height, width, 3).
+
+    Returns:
+        QImage: An RGB888 image using the memory of the array (or its own copy).
+
+    Raises:
+        ValueError: If the image data is not 8-bit RGB data.
+    """
+    if rgb_image.dtype != np.uint8 or rgb_image.ndim != 3 or rgb_image.shape[2] != 3:
+        raise ValueError(f"Invalid image format: must be (height, width, 3) uint8, got {rgb_image.shape} {rgb_image.dtype}")
+    height, width, _ = rgb_image.shape
+    if rgb_image.strides[1:] != (3, 1) or rgb_image.strides[0] < 3 * width:
+        # The contiguous array is freed when this function returns, so the QImage must own a copy of its memory
+        contiguous = np.ascontiguousarray(rgb_image)
+        return QImage(contiguous.data, width, height, contiguous.strides[0], QImage.Format.Format_RGB888).copy()
+    return QImage(rgb_image.data, width, height, rgb_image.strides[0], QImage.Format.Format_RGB888)
+
+
+def qimage_from_bgra(bgra_image: np.ndarray) -> QImage:
+    """
+    Wraps 8-bit BGRA image data (the memory layout of QImage.Format_RGB32) in a QImage without copying it. The array
+    must stay alive as long as the QImage is used.
+    """
+    height, width, _ = bgra_image.shape
+    return QImage(bgra_image.data, width, height, bgra_image.strides[0], QImage.Format.Format_RGB32)
+
+
+def build_mip_levels(rgb_image: np.ndarray, min_size: int = 256) -> list[np.ndarray]:
+    """
+    Builds the mip levels of an image: copies halved in size from level to level.
+
+    The levels are area averaged with OpenCV, which (unlike Qt's image scaling) releases the GIL, so building them on
+    a background thread doesn't block the GUI thread. They are returned in the BGRA layout of QImage.Format_RGB32,
+    the format Qt scales the fastest (see qimage_from_bgra()).
+
+    Args:
+        rgb_image: The 8-bit RGB image data, which is not included in the levels.
+        min_size: The levels stop before the shorter side gets smaller than this.
+
+    Returns:
+        list[np.ndarray]: The mip levels, largest first.
+    """
+    import cv2
+
+    levels = []
+    level = rgb_image
+    while min(level.shape[:2]) // 2 >= min_size:
+        level = cv2.resize(level, (level.shape[1] // 2, level.shape[0] // 2), interpolation=cv2.INTER_AREA)
+        levels.append(level)
+    return [cv2.cvtColor(level, cv2.COLOR_RGB2BGRA) for level in levels]
+
+
+def scale_image(rgb_image: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """
+    Scales an image smoothly (area averaged when it gets smaller) with OpenCV, see build_mip_levels().
+
+    Args:
+        rgb_image: The 8-bit RGB image data.
+        size: The (width, height) to scale to.
+
+    Returns:
+        np.ndarray: The scaled image in the BGRA layout of QImage.Format_RGB32.
+    """
+    import cv2
+
+    height, width = rgb_image.shape[:2]
+    interpolation = cv2.INTER_AREA if size[0] < width else cv2.INTER_LINEAR
+    return cv2.cvtColor(cv2.resize(rgb_image, size, interpolation=interpolation), cv2.COLOR_RGB2BGRA)
+
+
+class RescaleSignals(QObject):
+    """Signals of the ImageLabel's background rescaling, delivered to the GUI thread."""
+    finished = Signal(int, object, object)  # Image generation, target (width, height) or None for the mip levels, Future
+
+
+class DetectionOverlay(QWidget):
+    """
+    Paints the detection boxes and the crop box of an ImageLabel, all in one paintEvent.
+
+    The boxes are kept as an array in widget coordinates and grouped by their score-dependent colors, so even
+    thousands of boxes need only one QPainter.drawRects() call per color. The most confident boxes are painted last,
+    on top of the others, and the crop box on top of all. The overlay is transparent for the mouse, the ImageLabel shows the tooltips (see box_at()).
+    """
+
+    CROP_BORDER_COLOR = QColor(255, 165, 0, 255)
+    CROP_FILL_COLOR = QColor(255, 165, 0, 5)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self._rects = np.empty((0, 4), dtype=np.int64)  # The detection boxes in widget coordinates, (x, y, w, h) rows
+        self._groups = []  # (border color, fill color, list of QRect) per color of the boxes
+        self._crop_rect = None
+
+    def set_boxes(self, rects: np.ndarray, scores: np.ndarray):
+        """
+        Sets the detection boxes.
+
+        Args:
+            rects: The boxes in widget coordinates, an (N, 4) integer array of (x, y, w, h) rows.
+            scores: The confidence scores (0.0-1.0) of the boxes, which set their opacity.
+        """
+        self._rects = rects
+        border_alphas = (10 + scores * (255 - 10)).astype(np.int64)  # Scale score (0.0-1.0) to alpha (10-255)
+        fill_alphas = (scores * 20).astype(np.int64)  # Scale score (0.0-1.0) to alpha (0-20)
+        colors = border_alphas * 256 + fill_alphas
+
+        # Boxes scaled to nothing are not painted
+        order = np.argsort(colors, kind="stable")
+        order = order[(rects[order, 2] > 0) & (rects[order, 3] > 0)]
+        self._groups = []
+        if len(order):
+            for indices in np.split(order, np.flatnonzero(np.diff(colors[order])) + 1):
+                color = int(colors[indices[0]])
+                # The outline is drawn inside the box, like a QRubberBand of the box's geometry
+                group_rects = [QRect(x, y, w - 1, h - 1) for x, y, w, h in rects[indices].tolist()]
+                self._groups.append((QColor(0, 255, 0, color // 256), QColor(0, 255, 0, color % 256), group_rects))
+        self.update()
+
+    def set_crop_rect(self, rect: QRect | None):
+        """Sets the crop box in widget coordinates, None hides it."""
+        self._crop_rect = rect
+        self.update()
+
+    def box_at(self, pos: QPoint) -> int | None:
+        """Returns the index of the first box that contains the widget position, or None."""
+        x, y = pos.x(), pos.y()
+        rects = self._rects
+        hits = np.flatnonzero((rects[:, 0] <= x) & (x < rects[:, 0] + rects[:, 2]) &
+                              (rects[:, 1] <= y) & (y < rects[:, 1] + rects[:, 3]))
+        return int(hits[0]) if len(hits) else None
+
+    def box_rect(self, index: int) -> QRect:
+        """Returns the box at the index in widget coordinates."""
+        return QRect(*self._rects[index].tolist())
 
     def paintEvent(self, event):
+        if not self._groups and self._crop_rect is None:
+            return
         painter = QPainter(self)
-        painter.setBrush(QBrush(self.fill_color))
-        pen = QPen(self.border_color)
-        pen.setWidth(1)
-        painter.setPen(pen)
-        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+        for border_color, fill_color, rects in self._groups:
+            painter.setPen(border_color)
+            painter.setBrush(fill_color)
+            painter.drawRects(rects)
+        # The crop box on top of the detections
+        if self._crop_rect is not None:
+            painter.setPen(self.CROP_BORDER_COLOR)
+            painter.setBrush(self.CROP_FILL_COLOR)
+            painter.drawRect(self._crop_rect.adjusted(0, 0, -1, -1))
 
 
 class TooltipEventFilter(QObject):
@@ -30,36 +175,69 @@ class TooltipEventFilter(QObject):
 
     def eventFilter(self, watched, event):
         if event.type() == QEvent.Type.MouseMove:
-            for band in self.parent_label.detection_bands:
-                if band.geometry().contains(event.pos()):
-                    tooltip_text = f"{band.class_name} {band.score:.2f}"
-                    QToolTip.showText(event.globalPos(), tooltip_text, band)
-                    return True
+            overlay = self.parent_label.detection_overlay
+            index = overlay.box_at(event.pos())
+            if index is not None:
+                _, score, class_name = self.parent_label.detections[index]
+                tooltip_text = f"{class_name} {score:.2f}"
+                QToolTip.showText(event.globalPos(), tooltip_text, self.parent_label, overlay.box_rect(index))
+                return True
             QToolTip.hideText()
         return super().eventFilter(watched, event)
 
 
 class ImageLabel(QLabel):
+    """
+    Shows an image scaled to the widget size, with its detection and crop boxes (see DetectionOverlay).
+
+    Repaints draw a cached copy of the image scaled to the widget size. When the size changes (e.g. while the window
+    is resized), the copy is scaled from the nearest larger mip level, which is fast enough for every resize step. Once
+    the size didn't change for RESCALE_DELAY_MS, the final copy is scaled smoothly from the full image on a background
+    thread.
+    """
+
+    RESCALE_DELAY_MS = 150
+    # Scaling more pixels than this smoothly stutters on the GUI thread, such copies are scaled with the fast
+    # transformation until the background rescale replaces them
+    MAX_SMOOTH_PIXELS = 4_000_000
+
     def __init__(self, app_instance, parent=None):
         super().__init__(parent)
         self.app_instance = app_instance
-        self.detection_bands = []
-        self.orig_detection_rects = [] # stores the original detection data—a list of QRect, score and class_id tuples—in the image's original coordinate system
-        self.crop_band = CustomRubberBand(QRubberBand.Shape.Rectangle, self, border_color=QColor(255, 165, 0, 255), fill_color=QColor(255, 165, 0, 5))
-        self.crop_band.hide()
-        self._pixmap = QPixmap()
+        # The shown detections, a list of ((x, y, w, h), score, class_name) tuples clamped to the image, in the image's
+        # full-resolution coordinate system
+        self.detections = []
+        self._detection_boxes = np.empty((0, 4), dtype=np.int64)  # The boxes of the detections as an array
+        self._detection_scores = np.empty(0)
+        self.detection_overlay = DetectionOverlay(self)
+        self._source = QImage()  # The shown image, at the resolution it was decoded with
+        self._source_data = None  # The array whose memory the source image uses (see qimage_from_array())
+        self._mip_levels = []  # Copies of the source data halved in size, largest first (see build_mip_levels())
+        self._scaled_pixmap = QPixmap()  # The source image scaled to the widget size
+        self._scaled_final = False  # The scaled pixmap is scaled smoothly from the source image
+        self._generation = 0  # Counts the source images, so results of the background rescaling for older ones are dropped
+        self._rescale_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-rescale")
+        self._rescale_futures = []  # The background rescaling jobs that may not have started yet
+        self._rescale_signals = RescaleSignals(self)
+        self._rescale_signals.finished.connect(self._on_rescale_finished)
+        self._rescale_timer = QTimer(self)
+        self._rescale_timer.setSingleShot(True)
+        self._rescale_timer.setInterval(self.RESCALE_DELAY_MS)
+        self._rescale_timer.timeout.connect(self._start_final_rescale)
         self.image = None
         self.last_crop_rect = None
         self.setMouseTracking(True)
         self._tooltip_filter = TooltipEventFilter(self)
         self.installEventFilter(self._tooltip_filter)
 
-    def _map_rect_from_image_to_widget(self, image_rect):
-        if self._pixmap.isNull() or self.image is None:
-            return QRect()
+    def _image_to_widget_transform(self):
+        """Returns the (scale_x, scale_y, offset_x, offset_y) mapping image coordinates to the widget, or None without an image."""
+        if self._source.isNull() or self.image is None:
+            return None
 
         widget_size = self.size()
-        pixmap_size = self._pixmap.size()
+        # The image rects are in full-resolution coordinates, the pixmap may be decoded at a reduced resolution
+        pixmap_size = QSize(self.image.shape[1], self.image.shape[0])
 
         scaled_pixmap = pixmap_size.scaled(widget_size, Qt.KeepAspectRatio)
 
@@ -68,6 +246,13 @@ class ImageLabel(QLabel):
 
         offset_x = (widget_size.width() - scaled_pixmap.width()) / 2
         offset_y = (widget_size.height() - scaled_pixmap.height()) / 2
+        return scale_x, scale_y, offset_x, offset_y
+
+    def _map_rect_from_image_to_widget(self, image_rect):
+        transform = self._image_to_widget_transform()
+        if transform is None:
+            return QRect()
+        scale_x, scale_y, offset_x, offset_y = transform
 
         widget_rect_x = int(image_rect.x() * scale_x + offset_x)
         widget_rect_y = int(image_rect.y() * scale_y + offset_y)
@@ -76,63 +261,84 @@ class ImageLabel(QLabel):
 
         return QRect(widget_rect_x, widget_rect_y, widget_rect_w, widget_rect_h)
 
-    def _clear_detection_bands(self):
-        for band in self.detection_bands:
-            band.hide()
-            band.setParent(None)
-            band.deleteLater()
-        self.detection_bands = []
-        self.orig_detection_rects = []
-
     def set_detection_boxes(self, detections):
-        self._clear_detection_bands()
-
-        if self.image is None or self.image.image_data is None:
+        """
+        Shows the detection boxes.
+
+        Args:
+            detections: A list of ((x, y, w, h), score, class_name) tuples in full-resolution image coordinates.
+        """
+        if self.image is None or self.image.image_data is None or not detections:
+            self._set_detections(np.empty((0, 4), dtype=np.int64), np.empty(0), [])
             return
 
-        image_height, image_width, _ = self.image.image_data.shape
-
-        clamped_detections = []
-        for (x, y, w, h), score, class_name in detections:
-            x1, y1 = max(0, x), max(0, y)
-            x2, y2 = min(x + w, image_width), min(y + h, image_height)
-            
-            # Ensure the box has a non-zero area
-            if x2 > x1 and y2 > y1:
-                clamped_w, clamped_h = x2 - x1, y2 - y1
-                clamped_detections.append(((x1, y1, clamped_w, clamped_h), score, class_name))
-
-        # Convert detections to QRects and store them to always have a reference to the original bounding box coordinates
-        self.orig_detection_rects = [(QRect(x, y, w, h), score, class_name) for (x, y, w, h), score, class_name in clamped_detections]
-
-        for rect, score, class_name in self.orig_detection_rects:
-            alpha = int(10 + (score * (255-10))) # Scale score (0.0-1.0) to alpha (10-255)
-            alpha_fill = int(score * 20) # Scale score (0.0-1.0) to alpha (0-20)
-            band = CustomRubberBand(QRubberBand.Shape.Rectangle, self, border_color=QColor(0, 255, 0, alpha), fill_color=QColor(0, 255, 0, alpha_fill), score=score, class_name=class_name)
-            widget_rect = self._map_rect_from_image_to_widget(rect)
-            band.setGeometry(widget_rect)
-            band.show()
-            self.detection_bands.append(band)
+        image_height, image_width = self.image.shape[:2]
+        boxes = np.array([box for box, _, _ in detections], dtype=np.int64).reshape(-1, 4)
+        x1, y1 = np.maximum(boxes[:, 0], 0), np.maximum(boxes[:, 1], 0)
+        x2 = np.minimum(boxes[:, 0] + boxes[:, 2], image_width)
+        y2 = np.minimum(boxes[:, 1] + boxes[:, 3], image_height)
+
+        # Ensure the boxes have a non-zero area
+        keep = (x2 > x1) & (y2 > y1)
+        boxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1)[keep]
+        scores = np.array([score for _, score, _ in detections], dtype=np.float64)[keep]
+        class_names = [class_name for (_, _, class_name), kept in zip(detections, keep) if kept]
+        self._set_detections(boxes, scores, class_names)
+
+    def _set_detections(self, boxes, scores, class_names):
+        self._detection_boxes = boxes
+        self._detection_scores = scores
+        self.detections = [(tuple(box), score, class_name)
+                           for box, score, class_name in zip(boxes.tolist(), scores.tolist(), class_names)]
+        self._update_overlay()
+
+    def _update_overlay(self):
+        """Maps the detection boxes and the crop box to the current widget size and hands them to the overlay."""
+        self.detection_overlay.setGeometry(self.rect())
+        transform = self._image_to_widget_transform()
+        if transform is None:
+            self.detection_overlay.set_boxes(np.empty((0, 4), dtype=np.int64), np.empty(0))
+            self.detection_overlay.set_crop_rect(None)
+            return
 
-    
+        scale_x, scale_y, offset_x, offset_y = transform
+        boxes = self._detection_boxes
+        rects = np.stack([boxes[:, 0] * scale_x + offset_x, boxes[:, 1] * scale_y + offset_y,
+                          boxes[:, 2] * scale_x, boxes[:, 3] * scale_y], axis=1).astype(np.int64)
+        self.detection_overlay.set_boxes(rects, self._detection_scores)
+        crop_rect = self._map_rect_from_image_to_widget(self.last_crop_rect) if self.last_crop_rect else None
+        self.detection_overlay.set_crop_rect(crop_rect)
 
     def set_crop_box(self, image_rect):
         self.last_crop_rect = image_rect
-        widget_rect = self._map_rect_from_image_to_widget(image_rect)
-        self.crop_band.setGeometry(widget_rect)
-        self.crop_band.show()
+        self.detection_overlay.set_crop_rect(self._map_rect_from_image_to_widget(image_rect))
+
+    def hide_crop_box(self):
+        self.last_crop_rect = None
+        self.detection_overlay.set_crop_rect(None)
 
     def hide_bands(self):
-        self._clear_detection_bands()
-        self.crop_band.hide()
         self.last_crop_rect = None
+        self.set_detection_boxes([])
+
+    def replace_image(self, image_path, decode_size=None, image=None):
+        """
+        Shows an image file.
 
-    def replace_image(self, image_path):
+        Args:
+            image_path: Path to the image file.
+            decode_size: The decode size hint for the image (see ImageObject).
+            image: The already decoded image (e.g. by the ImagePrefetcher), otherwise it is loaded from the decoded
+                image cache or decoded.
+
+        Returns:
+            bool: True if the image is shown, False if it couldn't be loaded.
+        """
         self.hide_bands()
         try:
-            self.image = ImageObject(image_path)
-            pixmap = self._create_qpixmap(self.image)
-            self.setPixmap(pixmap)
+            self.image = image if image is not None else load_image(image_path, decode_size)
+            # The 8-bit display data is kept with the (cached) image, so showing the image again doesn't convert it again
+            self._set_source_data(self.image.display_data)
             return True
         except Exception as e:
             self.setText(f"Error loading image: {e}")
@@ -140,41 +346,117 @@ class ImageLabel(QLabel):
             self.image = None
             return False
 
-    def _create_qpixmap(self, image):
-        rgb_image = image.image_data
-        
-        # Convert 16-bit to 8-bit if needed
-        if rgb_image.dtype == np.uint16:
-            rgb_image = (rgb_image / 256).astype(np.uint8)
-        
-        # Ensure correct format
-        if len(rgb_image.shape) != 3 or rgb_image.shape[2] != 3:
-            raise ValueError("Invalid image format: must be (height, width, 3)")
-        
-        height, width, _ = rgb_image.shape
-        # Create QImage from the NumPy array
-        #qimage = QImage(rgb_image.data, width, height, width * 3, QImage.Format_RGB888)
-        qimage = QImage(rgb_image.data, width, height, rgb_image.strides[0], QImage.Format.Format_RGB888)
-        
-        return QPixmap.fromImage(qimage)
+    def _set_source_data(self, rgb_image):
+        """
+        Replaces the shown image with 8-bit RGB image data (using its memory without a copy, see qimage_from_array()),
+        dropping the scaled copies of the previous image. The mip levels of the new image are built in the background.
+        """
+        if rgb_image is None:
+            self._source, self._source_data = QImage(), None
+        else:
+            self._source_data = np.ascontiguousarray(rgb_image)
+            self._source = qimage_from_array(self._source_data)
+        self._mip_levels = []
+        self._scaled_pixmap = QPixmap()
+        self._scaled_final = False
+        self._generation += 1
+        # The jobs for the previous image would only delay the ones for this image
+        for future in self._rescale_futures:
+            future.cancel()
+        self._rescale_futures = []
+        self._rescale_timer.stop()
+        if self._source_data is not None:
+            self._start_rescale(None)
+        self.update()
 
     def setPixmap(self, pixmap):
         super().setText("")
-        self._pixmap = pixmap
-        self.update()
+        image = pixmap.toImage().convertToFormat(QImage.Format.Format_RGB888)
+        rows = np.frombuffer(image.constBits(), dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+        self._set_source_data(rows[:, :image.width() * 3].reshape(image.height(), image.width(), 3).copy())
 
     def pixmap(self):
-        return self._pixmap
+        return QPixmap.fromImage(self._source)
 
     def clear(self):
-        self._pixmap = QPixmap()
+        self._set_source_data(None)
         super().clear()
-        self.update()
 
     def setText(self, text):
-        self._pixmap = QPixmap()
+        self._set_source_data(None)
         super().setText(text)
-        self.update()
+
+    def _target_size(self):
+        """Returns the size of the source image scaled to fit the widget."""
+        return self._source.size().scaled(self.size(), Qt.KeepAspectRatio)
+
+    def _scaled_pixmap_for_widget(self):
+        """Returns the source image scaled to fit the widget, scaling it only if the widget size changed."""
+        target_size = self._target_size()
+        if target_size.isEmpty():
+            return QPixmap()
+        if self._scaled_pixmap.size() == target_size:
+            return self._scaled_pixmap
+
+        # The smallest mip level that is still at least as large as the target
+        level = self._source
+        for mip_level in self._mip_levels:
+            if mip_level.shape[1] < target_size.width() or mip_level.shape[0] < target_size.height():
+                break
+            level = qimage_from_bgra(mip_level)
+        smooth = max(level.width() * level.height(), target_size.width() * target_size.height()) <= self.MAX_SMOOTH_PIXELS
+        transformation = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+        self._scaled_pixmap = QPixmap.fromImage(level.scaled(target_size, Qt.IgnoreAspectRatio, transformation))
+        self._scaled_final = smooth and level is self._source
+        if not self._scaled_final:
+            # Restarted on every resize step, so the final rescale only starts once the resizing settled
+            self._rescale_timer.start()
+        return self._scaled_pixmap
+
+    def _start_final_rescale(self):
+        target_size = self._target_size()
+        if not self._scaled_final and not target_size.isEmpty():
+            self._start_rescale(target_size.toTuple())
+
+    def _start_rescale(self, target_size):
+        """
+        Builds the mip levels (target_size None) or scales the source image to the (width, height) in the background.
+        The job takes the source image when it starts, and skips the work if another image is shown by then, so queued
+        jobs don't keep the data of images already left behind.
+        """
+        generation = self._generation
+
+        def rescale():
+            source_data = self._source_data
+            if generation != self._generation or source_data is None:
+                return None  # Another image is shown already, the result is dropped anyway
+            if target_size is None:
+                return build_mip_levels(source_data)
+            return scale_image(source_data, target_size)
+
+        future = self._rescale_executor.submit(rescale)
+        self._rescale_futures = [pending for pending in self._rescale_futures if not pending.done()] + [future]
+        future.add_done_callback(lambda future: self._rescale_signals.finished.emit(generation, target_size, future))
+
+    def _on_rescale_finished(self, generation, target_size, future):
+        if generation != self._generation:
+            return  # Another image is shown already
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Warning: rescaling the image failed: {e}")
+            return
+        if target_size is None:
+            self._mip_levels = result
+        elif target_size == self._target_size().toTuple() and not self._scaled_final:
+            self._scaled_pixmap = QPixmap.fromImage(qimage_from_bgra(result))
+            self._scaled_final = True
+            self.update()
+
+    def shutdown(self):
+        """Stops the background rescaling, without waiting for a running job."""
+        self._rescale_timer.stop()
+        self._rescale_executor.shutdown(wait=False, cancel_futures=True)
 
     def setImageData(self, image_data):
         """Sets the pixmap from a numpy array, handling both 8-bit and 16-bit data."""
@@ -182,13 +464,9 @@ class ImageLabel(QLabel):
             self.clear()
             return
 
-        # Ensure the data is contiguous in memory for QImage
-        image_data = np.ascontiguousarray(image_data)
-
         # Check if the image data is 16-bit and convert it to 8-bit for display
         if image_data.dtype == np.uint16:
-            # Convert 16-bit to 8-bit using right-shifting
-            image_data = (image_data >> 8).astype(np.uint8)
+            image_data = convert_16bit_to_8bit(image_data)
 
         if image_data.dtype != np.uint8:
             print(f"Warning: setImageData received unsupported dtype: {image_data.dtype}")
@@ -199,36 +477,25 @@ class ImageLabel(QLabel):
             # Handle other cases or return
             return
 
-        height, width, channel = image_data.shape
-        bytes_per_line = 3 * width
-
-        q_image = QImage(image_data.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(q_image)
-
-        if not pixmap.isNull():
-            self.setPixmap(pixmap)
+        if image_data.size:
+            self._set_source_data(image_data)
         else:
             self.setText("Cannot load image from data")
             self.setAlignment(Qt.AlignCenter)
 
     def paintEvent(self, event):
         super().paintEvent(event)
-        if not self._pixmap.isNull():
+        scaled_pixmap = self._scaled_pixmap_for_widget() if not self._source.isNull() else QPixmap()
+        if not scaled_pixmap.isNull():
             size = self.size()
-            scaled_pixmap = self._pixmap.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
             point = QPoint((size.width() - scaled_pixmap.width()) // 2, (size.height() - scaled_pixmap.height()) // 2)
             painter = QPainter(self)
             painter.drawPixmap(point, scaled_pixmap)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        # Update the rubber band geometries based on the new size
-        for i, (rect, score, class_name) in enumerate(self.orig_detection_rects):
-            if i < len(self.detection_bands):
-                widget_rect = self._map_rect_from_image_to_widget(rect)
-                self.detection_bands[i].setGeometry(widget_rect)
-        if self.last_crop_rect and self.crop_band.isVisible():
-            self.set_crop_box(self.last_crop_rect)
+        # Map the boxes to the new size
+        self._update_overlay()
 
     # TODO: the cropping band logic has issues with the confidence tooltips - probably caused by the event filter
     # def mousePressEvent(self, event):
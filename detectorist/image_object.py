@@ -1,11 +1,10 @@
 import os
-import cv2
 import shutil
 import numpy as np
-from PIL import Image as PILImage
 
 from .exif_wrapper import ExifWrapper
 from . import image_utils
+from .preprocessing import preprocess_into
 from .image_utils import IMG_EXTENSIONS
 
 class ImageObject:
@@ -17,10 +16,22 @@ class ImageObject:
     """
     SUPPORTED_IMG_EXTENSIONS = IMG_EXTENSIONS
 
-    def __init__(self, image_path: str):
+    def __init__(self, image_path: str, decode_size: tuple[int, int] = None, proxy: bool = False):
         """
         Initializes the ImageProcessor by loading an image from the given path.
         Supports standard image formats and Sony ARW raw files.
+
+        Args:
+            image_path: Path to the image file.
+            decode_size: Optional (width, height) the image data needs to cover, e.g. the model input or the screen size.
+                JPEG files are then decoded at a reduced resolution (DCT scaling), HEIF files use an embedded thumbnail
+                that is large enough, and RAW files use their embedded preview or a fast half-size processing (see
+                image_utils.load_raw_preview()). The reduced image data is at least this large (a half-size RAW
+                image may be smaller), its original size and coordinates are still available through shape and scale.
+            proxy: Keep only 8-bit image data, for a lower memory use. RAW files then use the fast decode of a
+                decode_size hint even without one (the half-size processing, at an eighth of the memory and a fraction
+                of the time of the full-quality data), HEIF files are decoded at 8 bits. The full-quality data is
+                decoded again when it is needed (see is_proxy and full_image_data()), shape stays the full resolution.
         """
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Error: Image file not found at '{image_path}'")
@@ -30,29 +41,92 @@ class ImageObject:
         self._is16bit = False
         self._file_extension = os.path.splitext(self.image_path)[1].lower()
         self._exif_handler = None # Initialize to None
+        self._shape = None
+        self._file_info = {}
+        self._decode_size = tuple(decode_size) if decode_size else None
+        self._is_proxy = False
+        self._decode_source = "full"
+        self._display_data = None
 
         # Load the image (depending on the file extension)
-        if self.file_extension == '.arw': # Load 16-bit RAW image data
+        if self.file_extension == '.arw' and (decode_size or proxy): # Load a fast 8-bit preview of the RAW image
+            self._image_data, (full_width, full_height), self._decode_source = image_utils.load_raw_preview(self.image_path, decode_size)
+            self._exif_handler = ExifWrapper(self.image_path)
+            self._shape = (full_height, full_width) + self._image_data.shape[2:]
+            # Without a decode size hint the half-size data stands in for the full-quality image
+            self._is_proxy = not decode_size
+        elif self.file_extension == '.arw': # Load 16-bit RAW image data
             self._image_data = image_utils.load_arw_image(self.image_path, output_bps=16)
             self._exif_handler = ExifWrapper(self.image_path)
+        elif self.file_extension in image_utils.HEIF_EXTENSIONS and not decode_size and not proxy:
+            # Full resolution HEIF images keep their bit depth and the settings to write crops (see image_utils.crop_heif_image())
+            self._image_data, self._file_info = image_utils.load_heif_image(self.image_path)
+            self._exif_handler = ExifWrapper(self.image_path)
         else: # All other 8 bit image formats are handled by Pillow
-            pil_image = PILImage.open(self.image_path)
+            pil_image = image_utils.open_pil_image(self.image_path)
             self._exif_handler = ExifWrapper(pil_image)
+            full_width, full_height = pil_image.size
+            if decode_size:
+                # Only JPEG and HEIF images support a reduced decode, draft() does nothing for other formats
+                pil_image.draft(None, decode_size)
             self._image_data = np.array(pil_image)
-
-        if self._image_data.dtype == np.uint16:
-            self._is16bit = True
+            self._shape = (full_height, full_width) + self._image_data.shape[2:]
+            self._file_info = dict(pil_image.info)
+            if self._shape == self._image_data.shape and self.file_extension not in image_utils.HEIF_EXTENSIONS:
+                self._decode_size = None  # Decoded in full quality anyway (HEIF files are decoded with their bit depth without a hint)
+            if self._shape[:2] != self._image_data.shape[:2]:
+                self._decode_source = "reduced"
+            # Pillow converts high bit depth HEIF images to 8 bits
+            self._is_proxy = proxy and pil_image.info.get('bit_depth', 8) > 8
 
         if self._image_data is None:
             raise IOError(f"Error: Could not read image from '{self.image_path}'")
 
+        if self._image_data.dtype == np.uint16 and proxy:
+            self._image_data = image_utils.convert_16bit_to_8bit(self._image_data)
+            self._is_proxy = True
+        if self._image_data.dtype == np.uint16:
+            self._is16bit = True
+        if self._shape is None:
+            self._shape = self._image_data.shape
+
         print(f"image loaded: {self.image_path}")
         print(f"  image_data dtype: {self._image_data.dtype}")
-        print(f"  image_data shape: {self._image_data.shape}")
+        print(f"  image_data shape: {self._image_data.shape}" + (f" (reduced from {self._shape})" if self.is_reduced else ""))
         # TODO: how do I find out infos about the color depth?
         # HIF have BitDepthChroma and BitDepthLuma in EXIF, ARW and JPG have BitsPerSample
         # but I ideally I don't want to rely on EXIF data for this
 
+    @classmethod
+    def from_array(cls, image_path: str, image_data: np.ndarray, shape: tuple = None, file_info: dict = None,
+                   decode_source: str = None, proxy: bool = False):
+        """
+        Creates an ImageObject for already decoded image data (e.g. decoded by another process) without reading the file.
+        The Exif handler is not available for such images.
+
+        Args:
+            image_path: Path to the image file.
+            image_data: The decoded image data.
+            shape: The full-resolution shape of the image, if the image data was decoded at a reduced resolution.
+            file_info: The file_info of the decoded image.
+            decode_source: How the image data was decoded (see decode_info), defaults to 'reduced' if shape is larger
+                than the image data, otherwise 'full'.
+            proxy: True if the image data is an 8-bit proxy (see is_proxy).
+        """
+        image = cls.__new__(cls)
+        image._image_path = image_path
+        image._image_data = image_data
+        image._is16bit = image_data.dtype == np.uint16
+        image._file_extension = os.path.splitext(image_path)[1].lower()
+        image._exif_handler = None
+        image._shape = tuple(shape) if shape is not None else image_data.shape
+        image._file_info = file_info or {}
+        image._decode_size = None
+        image._is_proxy = proxy
+        image._decode_source = decode_source or ("reduced" if image._shape[:2] != image_data.shape[:2] else "full")
+        image._display_data = None
+        return image
+
     @property
     def exif_wrapper(self) -> ExifWrapper:
         """Returns Exif handler object for this image."""
@@ -68,6 +142,97 @@ class ImageObject:
         """Returns the loaded image data as a NumPy array."""
         return self._image_data
 
+    @property
+    def file_info(self) -> dict:
+        """
+        Returns the format specific information of the decoded file that is needed to write crops in the same format,
+        e.g. Pillow's info (ICC profile) or the bit depth, chroma and color profile of a HEIF file.
+        """
+        return self._file_info
+
+    @property
+    def shape(self) -> tuple:
+        """
+        Returns the shape (height, width, channels) of the full-resolution image.
+        Detections and crop rectangles are in this coordinate system, even if the image data is reduced.
+        """
+        return self._shape
+
+    @property
+    def scale(self) -> tuple[float, float]:
+        """Returns the (x, y) factors from image data coordinates to full-resolution image coordinates."""
+        return self._shape[1] / self._image_data.shape[1], self._shape[0] / self._image_data.shape[0]
+
+    @property
+    def is_reduced(self) -> bool:
+        """Returns True if the image data was decoded at a reduced resolution."""
+        return self._image_data.shape[:2] != self._shape[:2]
+
+    @property
+    def decode_info(self) -> dict:
+        """
+        Returns how the image data was decoded: the source ('full', 'reduced' for a JPEG draft or a HEIF thumbnail,
+        'raw_preview' and 'raw_half_size' for the fast RAW decodes (see image_utils.load_raw_preview()), or
+        'crop:x,y,w,h' for an image returned by crop()), the [width, height] of the image data and its bit depth. Results computed from the image data (like the Detector's
+        raw proposals) depend on it, not only on the file: e.g. a RAW file's embedded preview is the camera's
+        rendering, with another tone curve than the full-quality processing.
+        """
+        height, width = self._image_data.shape[:2]
+        return {"source": self._decode_source, "size": [width, height], "bit_depth": self._image_data.dtype.itemsize * 8}
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory used by the image data in bytes, including the 8-bit display copy of 16-bit data (see
+        display_data), which is created when the image is shown.
+        """
+        display_nbytes = self._image_data.size if self._image_data.dtype == np.uint16 else 0
+        return self._image_data.nbytes + display_nbytes
+
+    @property
+    def display_data(self) -> np.ndarray:
+        """
+        Returns the 8-bit image data for showing the image. 16-bit data is converted once (see
+        image_utils.convert_16bit_to_8bit()) and the result is kept with the image, 8-bit data is returned as is.
+        """
+        if self._display_data is None:
+            if self._image_data.dtype == np.uint16:
+                self._display_data = image_utils.convert_16bit_to_8bit(self._image_data)
+            else:
+                self._display_data = self._image_data
+        return self._display_data
+
+    @property
+    def is_proxy(self) -> bool:
+        """
+        Returns True if the image data is an 8-bit proxy of a 16-bit image (see __init__), e.g. writing a crop then
+        decodes the file again.
+        """
+        return self._is_proxy
+
+    def covers(self, decode_size: tuple[int, int] | None, proxy: bool = False) -> bool:
+        """
+        Returns True if this image can be used where the image is requested with the decode size hint and proxy setting
+        (see __init__), i.e. it was decoded in full quality, or for a hint at least as large.
+        """
+        if self._is_proxy and not proxy:
+            return False
+        if self._decode_size is None:
+            return True
+        return decode_size is not None and self._decode_size[0] >= decode_size[0] and self._decode_size[1] >= decode_size[1]
+
+    def full_image_data(self) -> np.ndarray:
+        """
+        Returns the full-resolution image data. A reduced image or a proxy is decoded again in full quality (or taken
+        from the decoded image cache), the result is not kept, so it should only be requested when needed (e.g. to
+        write a crop).
+        """
+        from .image_cache import load_image
+
+        if not self.is_reduced and not self.is_proxy:
+            return self._image_data
+        return load_image(self._image_path, remember=False, proxy=False).image_data
+
     @property
     def is16bit(self) -> bool:
         """Returns True if the image is 16-bit."""
@@ -85,22 +250,18 @@ class ImageObject:
         - Converts to float32 and normalizes to [0, 1].
         - Transposes from HWC to CHW format.
         - Adds a batch dimension.
-        """
-        if self.is16bit:
-            data = image_utils.convert_16bit_to_8bit(self._image_data)
-        else:
-            data = self._image_data
 
-        resized_image = cv2.resize(data, (input_width, input_height))
-        model_input_image = resized_image.astype(np.float32)
-        model_input_image /= 255.0
-        model_input_image = model_input_image.transpose(2, 0, 1)
-        model_input_image = np.expand_dims(model_input_image, axis=0)
+        The Detector preprocesses into reused buffers instead (see preprocessing.InputBuffers).
+        """
+        model_input_image = np.empty((1, self._image_data.shape[2], input_height, input_width), dtype=np.float32)
+        preprocess_into(self._image_data, model_input_image[0])
         return model_input_image
 
 
     def draw_boxes(self, boxes: list) -> np.ndarray:
         """Draws bounding boxes on a copy of the loaded image."""
+        import cv2
+
         output_image = self._image_data.copy()
 
         if self.is16bit:
@@ -108,17 +269,26 @@ class ImageObject:
         else:
             color = (0, 255, 0)   # Green for 8-bit images
 
+        x_scale, y_scale = self.scale
         for box in boxes:
+            # The boxes are in full-resolution coordinates
             x, y, w, h = box
+            x, y, w, h = round(x / x_scale), round(y / y_scale), round(w / x_scale), round(h / y_scale)
             x2 = x + w
             y2 = y + h
             cv2.rectangle(output_image, (x, y), (x2, y2), color, 2)
         return output_image
 
-    def crop(self, rect: tuple[int, int, int, int]):
-        """Crops the image to the given rectangle tuple (x, y, w, h)."""
+    def crop(self, rect: tuple[int, int, int, int]) -> "ImageObject":
+        """
+        Returns a new ImageObject with the image cropped to the given rectangle tuple (x, y, w, h) in full-resolution
+        coordinates. The image itself is not changed, as it may be shared through the decoded image cache.
+        """
         x, y, w, h = rect
-        self._image_data = self._image_data[y:y+h, x:x+w]
+        cropped_image = ImageObject.from_array(self._image_path, self.full_image_data()[y:y+h, x:x+w].copy(), file_info=self._file_info,
+                                               decode_source=f"crop:{x},{y},{w},{h}")
+        cropped_image._exif_handler = self._exif_handler
+        return cropped_image
 
     def copy_image_file(self, target_dir_path):
         """Copies the original image file to the specified output directory preserving its file name."""
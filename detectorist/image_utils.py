@@ -1,12 +1,9 @@
 import os
-import cv2
-import rawpy
+import threading
 import numpy as np
 from PIL import Image as PILImage
-import pillow_heif
 
-# Ensure the HEIF Pillow plugin is registered
-pillow_heif.register_heif_opener()
+# cv2, rawpy and pillow_heif are imported on first use, so they don't slow down the start of the application
 
 # Files with these extensions will be treated as HEIF files (using pillow_heif)
 HEIF_EXTENSIONS = ('.heic', '.heics', '.heif', '.heifs', '.hif')
@@ -17,11 +14,37 @@ RAW_EXTENSIONS = ('.arw', '.nef', '.cwr', 'cr2', 'cr3', 'orf', 'pef' )
 # All supported image file extensions
 IMG_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp') + HEIF_EXTENSIONS + RAW_EXTENSIONS
 
+_heif_opener_lock = threading.Lock()
+_heif_opener_registered = False
+
+def register_heif_opener():
+    """
+    Imports pillow_heif and registers its Pillow plugin, on the first call only.
+    Must be called before a HEIF file is opened with Pillow (otherwise the native code may segfault).
+    """
+    global _heif_opener_registered
+    with _heif_opener_lock:
+        if not _heif_opener_registered:
+            import pillow_heif
+            pillow_heif.register_heif_opener()
+            _heif_opener_registered = True
+
+def open_pil_image(path: str) -> PILImage.Image:
+    """
+    Opens an image file with Pillow, registering the HEIF plugin first if it is a HEIF file.
+    """
+    if os.path.splitext(path)[1].lower() in HEIF_EXTENSIONS:
+        register_heif_opener()
+    return PILImage.open(path)
+
 def load_arw_image(path: str, output_bps=16) -> np.ndarray:
     """
     Opens a Sony ARW raw file, processes it, and returns it as 8 or 16-bit RGB numpy array.
     The bit depth of the output is determined by the output_bps parameter.
+    This is the slow full-quality processing for writing crops, see load_raw_preview() for viewing and detection.
     """
+    import rawpy
+
     print(f"Reading RAW file: {path}")
     with rawpy.imread(path) as raw:
         print("Loading and processing RAW image...")
@@ -43,6 +66,86 @@ def load_arw_image(path: str, output_bps=16) -> np.ndarray:
     # Returns the image as a 8 or 16-bit RGB numpy array
     return rgb_image_data
 
+def _raw_full_size(raw) -> tuple[int, int]:
+    """Returns the (width, height) of the image postprocessed by rawpy at full size, after the rotation of the file."""
+    width, height = raw.sizes.width, raw.sizes.height
+    if raw.sizes.flip in (5, 6):  # Rotated by 90 degrees
+        width, height = height, width
+    return width, height
+
+def _raw_thumbnail(raw, full_size: tuple[int, int], decode_size: tuple[int, int]) -> np.ndarray | None:
+    """
+    Returns the embedded preview of a RAW file as an RGB array with the orientation of the postprocessed image,
+    or None if there is none that covers decode_size and shows the same image area as the RAW data.
+    """
+    import io
+    import rawpy
+
+    try:
+        thumbnail = raw.extract_thumb()
+    except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+        return None
+
+    if thumbnail.format == rawpy.ThumbFormat.JPEG:
+        pil_image = PILImage.open(io.BytesIO(thumbnail.data))
+        # Rotated by 90 degrees, the decode size applies to the other dimensions of the stored preview
+        rotated = raw.sizes.flip in (5, 6)
+        pil_image.draft("RGB", decode_size[::-1] if rotated else decode_size)
+        image_data = np.array(pil_image.convert("RGB"))
+    else:
+        image_data = thumbnail.data
+    if image_data.ndim != 3 or image_data.shape[2] != 3:
+        return None
+
+    # The preview is stored unrotated, like the RAW data
+    if raw.sizes.flip == 3:
+        image_data = np.rot90(image_data, 2)
+    elif raw.sizes.flip == 5:
+        image_data = np.rot90(image_data, 1)
+    elif raw.sizes.flip == 6:
+        image_data = np.rot90(image_data, -1)
+
+    height, width = image_data.shape[:2]
+    if width < decode_size[0] or height < decode_size[1]:
+        return None
+    # Previews with a different aspect ratio (e.g. letterboxed or cropped to 16:9) don't map to the RAW coordinates
+    if abs(width / height - full_size[0] / full_size[1]) > 0.02 * full_size[0] / full_size[1]:
+        return None
+    return np.ascontiguousarray(image_data)
+
+def load_raw_preview(path: str, decode_size: tuple[int, int] | None) -> tuple[np.ndarray, tuple[int, int], str]:
+    """
+    Opens a RAW file quickly for viewing and detection, instead of the full-quality processing of load_arw_image().
+
+    Uses the embedded preview JPEG if it is at least decode_size (width, height) large. Otherwise (or if decode_size is
+    None, e.g. for the 8-bit proxy of a full-resolution request) the RAW data is postprocessed at half size, which
+    merges each 2x2 block of the color filter array into one pixel instead of demosaicing it.
+
+    Returns:
+        tuple: The 8-bit RGB image data, the (width, height) of the full-quality image of load_arw_image() that
+            the coordinates of the image data map to, and the source of the image data: 'raw_preview' for the embedded
+            preview (the camera's rendering) or 'raw_half_size' for the half-size processing.
+    """
+    import rawpy
+
+    with rawpy.imread(path) as raw:
+        full_size = _raw_full_size(raw)
+        image_data = _raw_thumbnail(raw, full_size, decode_size) if decode_size else None
+        if image_data is not None:
+            print(f"Using the embedded preview of RAW file: {path}")
+            return image_data, full_size, "raw_preview"
+
+        print(f"Reading RAW file at half size: {path}")
+        image_data = raw.postprocess(
+            half_size=True,
+            use_camera_wb=True,
+            no_auto_bright=True,
+            output_bps=8,
+            gamma=(2.222, 4.5),
+            bright=2.0,
+        )
+    return image_data, full_size, "raw_half_size"
+
 def convert_16bit_to_8bit(image_16bit: np.ndarray) -> np.ndarray:
     """
     Converts a 16-bit image (uint16) to an 8-bit image (uint8) by scaling.
@@ -63,7 +166,9 @@ def convert_16bit_to_8bit(image_16bit: np.ndarray) -> np.ndarray:
     # To convert from 16-bit to 8-bit, we right-shift the bits by 8.
     # This is equivalent to dividing by 256 and is a standard way to
     # convert 16-bit image data to 8-bit, preserving the most significant bits.
-    image_8bit = (image_16bit >> 8).astype(np.uint8)
+    # The shift writes straight into the 8-bit result, without a 16-bit (or float) temporary of the whole image.
+    image_8bit = np.empty(image_16bit.shape, dtype=np.uint8)
+    np.right_shift(image_16bit, 8, out=image_8bit, casting='unsafe')
     return image_8bit
 
 def save_16bit_image(image_16bit: np.ndarray, output_path: str):
@@ -75,6 +180,8 @@ def save_16bit_image(image_16bit: np.ndarray, output_path: str):
         image_16bit (np.ndarray): The 16-bit image data to save (dtype must be uint16).
         output_path (str): The path where the image will be saved.
     """
+    import cv2
+
     if image_16bit.dtype != np.uint16:
         raise TypeError(f"Input image must be of dtype uint16, but got {image_16bit.dtype}.")
 
@@ -138,34 +245,72 @@ def get_human_readable_exif_orientation(orientation):
     }
     return orientation_map.get(orientation, "Unknown")
 
-def crop_heif_image(input_path, output_path, rect, quality=80):
+def load_heif_image(path: str) -> tuple[np.ndarray, dict]:
+    """
+    Opens a HEIF file with pillow_heif, keeping its bit depth (high bit depth images are returned as 16-bit data).
+
+    Returns:
+        tuple: The RGB image data, and the settings needed to write the image again (see crop_heif_image()):
+            mode, bit_depth, chroma, nclx_profile, exif and xmp.
+    """
+    import pillow_heif
+
+    heif = pillow_heif.open_heif(path, convert_hdr_to_8bit=False)
+    heif_info = {
+        'mode': heif[0].mode,
+        'bit_depth': heif.info.get('bit_depth', 8),
+        'chroma': heif.info.get('chroma', '420'),
+        'nclx_profile': heif.info.get('nclx_profile'),
+        'exif': heif.info.get('exif'),
+        'xmp': heif.info.get('xmp'),
+    }
+    # pillow-heif appears to rotate the image data based on EXIF orientation automatically.
+    # See: https://pillow-heif.readthedocs.io/en/latest/workaround-orientation.html#q-so-is-there-a-decision
+    # Get a numpy array view of the (rotated) image data using the __array_interface__
+    return np.asarray(heif[0]), heif_info
+
+def _source_path(image_source) -> str:
+    """Returns the file path of an image source, which is either a path or an ImageObject."""
+    return image_source if isinstance(image_source, str) else image_source.image_path
+
+def _full_resolution_data(image_source) -> np.ndarray | None:
+    """Returns the decoded full-resolution data of an ImageObject, or None for a path, a reduced or a proxy ImageObject."""
+    if isinstance(image_source, str) or image_source.is_reduced or image_source.is_proxy:
+        return None
+    return image_source.image_data
+
+def crop_heif_image(image_source, output_path, rect, quality=80):
     """
     Crops a HIF image and saves it as a new HIF image. 
     The new image will re-use the exif, xmp, and nclx_profile of the original image to keep as much meta data as possible.
 
     Args:
-        input_path (str): Path to the input HIF file.
+        image_source (str or ImageObject): Path to the input HIF file, or the already decoded image. The file is only
+            decoded again if the image isn't decoded at full resolution by pillow_heif (see load_heif_image()).
         output_path (str): Path to save the cropped HIF file.
         rect (tuple): A tuple of (x, y, width, height) for the crop.
         quality (int): Quality for the output image (1-100), -1 for lossless, default is 80.
     """
-    heif = pillow_heif.open_heif(input_path, convert_hdr_to_8bit=False)
-    bit_depth = heif.info.get('bit_depth', 8)
-    chroma = heif.info.get('chroma', '420')
-    nclx_profile = heif.info.get('nclx_profile')
-    exif = heif.info.get('exif')
-    xmp = heif.info.get('xmp')
-
-    print(f"{input_path} Image\n\tmode: {heif[0].mode}, size: {heif[0].size}, stride: {heif[0].stride}, data length: {len(heif[0].data)}")
+    import pillow_heif
+
+    input_path = _source_path(image_source)
+    rotated_np_array = _full_resolution_data(image_source)
+    # Images decoded by Pillow (e.g. reduced for viewing) lose the bit depth, only pillow_heif's data can be reused
+    if rotated_np_array is not None and 'mode' in image_source.file_info:
+        heif_info = image_source.file_info
+    else:
+        rotated_np_array, heif_info = load_heif_image(input_path)
+    bit_depth = heif_info['bit_depth']
+    chroma = heif_info['chroma']
+    nclx_profile = heif_info['nclx_profile']
+    exif = heif_info['exif']
+    xmp = heif_info['xmp']
+
+    print(f"{input_path} Image\n\tmode: {heif_info['mode']}, shape: {rotated_np_array.shape}")
     orientation = get_exif_orientation(exif)
     orientation_text = get_human_readable_exif_orientation(orientation)
     print(f"  EXIF orientation: {orientation} ({orientation_text})")
 
-    # pillow-heif appears to rotate the image data based on EXIF orientation automatically.
-    # See: https://pillow-heif.readthedocs.io/en/latest/workaround-orientation.html#q-so-is-there-a-decision
-    # Get a numpy array view of the (rotated) image data using the __array_interface__
-    rotated_np_array = np.asarray(heif[0])
-
     # Crop the array using numpy slicing
     # The cropping performed on the rotated_np_array before we reverse the pixel data arrangement to the original value so that the crop rectangle matches the users intend.
     x, y, w, h = rect
@@ -196,7 +341,7 @@ def crop_heif_image(input_path, output_path, rect, quality=80):
         unrotated_np = cropped_np_array
 
     # Create a new HeifImage from the cropped numpy array using pillow_heif.from_bytes()
-    mode = heif[0].mode
+    mode = heif_info['mode']
     size = (unrotated_np.shape[1], unrotated_np.shape[0])
     data = unrotated_np.tobytes()
 
@@ -217,12 +362,13 @@ def crop_heif_image(input_path, output_path, rect, quality=80):
     new_heif_image.save(output_path, format="HEIF", quality=quality, bit_depth=bit_depth, chroma=chroma, nclx_profile=nclx_profile, exif=updated_exif, xmp=xmp)
     #print(f"Cropped image to {w}x{h} at ({x},{y}) and saved to {output_path}")
 
-def crop_raw_image(input_path, output_path, rect, output_bps=16):
+def crop_raw_image(image_source, output_path, rect, output_bps=16):
     """
     Crops a RAW image and saves it as a lossless 16 bit PNG or TIFF image. 
 
     Args:
-        input_path (str): Path to the input RAW file.
+        image_source (str or ImageObject): Path to the input RAW file, or the already decoded image. The file is only
+            processed again if the image isn't decoded in full quality (see load_arw_image()).
         output_path (str): Path to save the cropped file (file extension will be replaced).
         rect (tuple): A tuple of (x, y, width, height) for the crop.
         output_bps (int): 16 or 8 bit output, default is 16.
@@ -231,7 +377,9 @@ def crop_raw_image(input_path, output_path, rect, output_bps=16):
     if file_extension.lower() not in ('.png', '.tiff'):
         raise ValueError(f"Output file extension must be .png or .tiff for saving 16-bit images, but got: {file_extension}")
 
-    np_array = load_arw_image(input_path, output_bps=16)
+    np_array = _full_resolution_data(image_source)
+    if np_array is None or np_array.dtype != np.uint16:
+        np_array = load_arw_image(_source_path(image_source), output_bps=16)
 
     # Crop the array using numpy slicing
     x, y, w, h = rect
@@ -244,30 +392,42 @@ def crop_raw_image(input_path, output_path, rect, output_bps=16):
     # Save the cropped image as a 16-bit PNG or TIFF file
     save_16bit_image(cropped_np_array, output_path)
 
-def crop_PIL_image(input_path, output_path, rect):
+def crop_PIL_image(image_source, output_path, rect):
     """
     Crops an image using PIL and saves the cropped image.
 
     Args:
-        input_path (str): Path to the input image file.
+        image_source (str or ImageObject): Path to the input image file, or the already decoded image. The file is
+            only decoded again if the image isn't decoded at full resolution, or isn't an RGB or RGBA image.
         output_path (str): Path to save the cropped image file.
         rect (tuple): A tuple of (x, y, width, height) for the crop.
     """
-    pil_image = PILImage.open(input_path)
     x, y, w, h = rect
-    cropped_image = pil_image.crop((x, y, x + w, y + h))
+    image_data = _full_resolution_data(image_source)
+    # Opening the file only reads its header, the pixel data is decoded by crop() if it can't be reused
+    pil_image = open_pil_image(_source_path(image_source))
+    # Only RGB(A) files map back to the same image mode, e.g. palette or CMYK images are cropped from the file
+    if image_data is not None and image_data.dtype == np.uint8 and image_data.shape[2:] == (len(pil_image.mode),) \
+            and pil_image.mode in ('RGB', 'RGBA'):
+        cropped_image = PILImage.fromarray(np.ascontiguousarray(image_data[y:y+h, x:x+w]))
+        # Like Image.crop(), keep the info (e.g. the ICC profile) of the original image
+        cropped_image.info = dict(image_source.file_info)
+    else:
+        cropped_image = pil_image.crop((x, y, x + w, y + h))
     cropped_image.save(output_path)
 
-def crop_image_file(input_path: str, output_dir: str, rect: tuple[int, int, int, int]):
+def crop_image_file(image_source, output_dir: str, rect: tuple[int, int, int, int]):
     """
     Crops an image file and saves it to the specified output directory.
     The cropped image will retain the original file name, but for RAW files, the extension will be replaced with .png.
     
     Args:
-        input_path (str): Path to the input image file.
+        image_source (str or ImageObject): Path to the input image file, or the already decoded image, which avoids
+            decoding the file again if it is decoded at full resolution.
         output_dir (str): Directory to save the cropped image file.
         rect (tuple): A tuple of (x, y, width, height) for the crop.
     """
+    input_path = _source_path(image_source)
     file_extension = os.path.splitext(input_path)[1].lower()
     # check if the input_path has a file_extension
     if not file_extension:
@@ -277,13 +437,13 @@ def crop_image_file(input_path: str, output_dir: str, rect: tuple[int, int, int,
 
     if file_extension in HEIF_EXTENSIONS:
         print(f"Cropping HEIF image file: {input_path}")
-        crop_heif_image(input_path, output_path, rect)
+        crop_heif_image(image_source, output_path, rect)
     elif file_extension in RAW_EXTENSIONS:
         print(f"Cropping RAW image file: {input_path}")
         # replace output file extension with .png
         output_path = os.path.splitext(output_path)[0] + '.png'
-        crop_raw_image(input_path, output_path, rect)
+        crop_raw_image(image_source, output_path, rect)
     else:
         print(f"Cropping image file: {input_path}")
         # for all other (8bit) formats use PIL
-        crop_PIL_image(input_path, output_path, rect)
\ No newline at end of file
+        crop_PIL_image(image_source, output_path, rect)
\ No newline at end of file
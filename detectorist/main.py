@@ -1,3 +1,6 @@
+import time
+_start_time = time.perf_counter() # Before the (slow) imports, to measure the startup time
+
 import sys
 import os
 
@@ -6,7 +9,7 @@ from detectorist.model_viewer import ModelViewer
 
 def main():
     app = QApplication(sys.argv)
-    window = ModelViewer()
+    window = ModelViewer(start_time=_start_time)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,212 @@
+"""
+Pre-compiled ORT-format models.
+
+Loading an .onnx model makes onnxruntime parse and optimize the graph from scratch. The optimized graph can be
+saved in onnxruntime's own ORT format, which loads considerably faster. A compiled model is stored together with a
+fingerprint of its source model and the onnxruntime version, and is only used while the fingerprint still matches.
+
+Compiled models are looked up next to the source model first (e.g. shipped in the application bundle) and then in the
+user cache directory. To compile all models of the models directory:
+
+    detectorist-compile-models            # into the user cache directory
+    detectorist-compile-models --alongside  # next to the models, e.g. before building the bundle
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+import threading
+
+from .session_profile import SessionProfile
+from .utils import get_cache_path, get_model_path, hash_file
+
+COMPILED_MODELS_DIR_NAME = "compiled_models"
+
+# Optimization levels above 'extended' may add hardware specific graph transformations, which would make the compiled
+# model unusable on other machines. They are applied again at runtime when the compiled model is loaded.
+_PORTABLE_OPTIMIZATION_LEVELS = ("disable", "basic", "extended")
+
+_background_lock = threading.Lock()
+_background_compiles = set()  # The real paths of the models compiled (or being compiled) by compile_model_in_background()
+
+
+def _cache_compiled_model_path(model_path: str) -> str:
+    """Returns the path of a model's compiled version in the user cache directory."""
+    model_path = os.path.realpath(model_path)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    # Models with the same file name in different directories get their own compiled versions
+    path_hash = hashlib.sha1(model_path.encode("utf-8")).hexdigest()[:8]
+    compiled_dir = os.path.join(get_cache_path(), COMPILED_MODELS_DIR_NAME)
+    return os.path.join(compiled_dir, f"{stem}-{path_hash}.ort")
+
+
+def _alongside_compiled_model_path(model_path: str) -> str:
+    """Returns the path of a model's compiled version next to the model file."""
+    return os.path.splitext(model_path)[0] + ".ort"
+
+
+def _fingerprint_path(compiled_path: str) -> str:
+    return compiled_path + ".json"
+
+
+def _source_fingerprint(model_path: str, content_hash: str = None) -> dict:
+    """Returns the fingerprint of a source model, without hashing its content unless content_hash is given."""
+    import onnxruntime as ort
+
+    stat = os.stat(model_path)
+    fingerprint = {
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "onnxruntime_version": ort.__version__,
+    }
+    if content_hash:
+        fingerprint["source_sha256"] = content_hash
+    return fingerprint
+
+
+def _is_valid(compiled_path: str, model_path: str) -> bool:
+    """
+    Checks if a compiled model still matches its source model and the installed onnxruntime.
+    A changed size or mtime alone doesn't invalidate it (e.g. the bundle extraction resets mtimes),
+    in that case the content hash decides.
+    """
+    import onnxruntime as ort
+
+    try:
+        with open(_fingerprint_path(compiled_path), "r", encoding="utf-8") as f:
+            fingerprint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    if not os.path.isfile(compiled_path) or fingerprint.get("onnxruntime_version") != ort.__version__:
+        return False
+
+    current = _source_fingerprint(model_path)
+    if fingerprint.get("source_size") != current["source_size"]:
+        return False
+    if fingerprint.get("source_mtime_ns") == current["source_mtime_ns"]:
+        return True
+    return fingerprint.get("source_sha256") == hash_file(model_path)
+
+
+def find_compiled_model(model_path: str) -> str | None:
+    """
+    Returns the path of a valid compiled version of a model, or None if there is none.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+    """
+    for compiled_path in (_alongside_compiled_model_path(model_path), _cache_compiled_model_path(model_path)):
+        if _is_valid(compiled_path, model_path):
+            return compiled_path
+    return None
+
+
+def compile_model(model_path: str, profile: SessionProfile = None, alongside: bool = False) -> str:
+    """
+    Compiles an ONNX model to an optimized ORT-format model and records the fingerprint of the source model.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+        profile (SessionProfile, optional): The session settings. The graph optimization level is capped at 'extended'.
+        alongside (bool): Save the compiled model next to the source model instead of the user cache directory.
+
+    Returns:
+        str: The path of the compiled model.
+    """
+    import onnxruntime as ort
+
+    profile = profile or SessionProfile()
+    graph_optimization = profile.graph_optimization if profile.graph_optimization in _PORTABLE_OPTIMIZATION_LEVELS else "extended"
+    compile_profile = SessionProfile(profile.intra_op_threads, profile.inter_op_threads, profile.execution_mode, graph_optimization)
+
+    compiled_path = _alongside_compiled_model_path(model_path) if alongside else _cache_compiled_model_path(model_path)
+    os.makedirs(os.path.dirname(compiled_path) or ".", exist_ok=True)
+
+    # Write to unique temporary files first, other threads or processes may compile the same model at the same time
+    temp_path = _temp_file(compiled_path, ".tmp.ort")
+    try:
+        session_options = compile_profile.to_session_options()
+        session_options.optimized_model_filepath = temp_path
+        session_options.add_session_config_entry("session.save_model_format", "ORT")
+        ort.InferenceSession(model_path, sess_options=session_options)
+        os.replace(temp_path, compiled_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    fingerprint = _source_fingerprint(model_path, hash_file(model_path))
+    fingerprint["graph_optimization"] = graph_optimization
+    temp_path = _temp_file(compiled_path, ".tmp.json")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(fingerprint, f, indent=2)
+        os.replace(temp_path, _fingerprint_path(compiled_path))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return compiled_path
+
+
+def _temp_file(compiled_path: str, suffix: str) -> str:
+    """Creates an empty temporary file with a unique name next to the compiled model and returns its path."""
+    prefix = os.path.splitext(os.path.basename(compiled_path))[0] + "."
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(compiled_path) or ".", prefix=prefix, suffix=suffix, delete=False) as f:
+        return f.name
+
+
+def compile_model_in_background(model_path: str, profile: SessionProfile = None) -> bool:
+    """
+    Compiles a model (see compile_model()) on a background thread, so the next load is faster. A model is compiled at
+    most once per process, even if several Detectors of it are created. The thread is not a daemon thread, so exiting
+    the application waits for the compilation instead of leaving it unfinished.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+        profile (SessionProfile, optional): The session settings (see compile_model()).
+
+    Returns:
+        bool: True if a compilation was started, False if the model was compiled (or is being compiled) already.
+    """
+    key = os.path.realpath(model_path)
+    with _background_lock:
+        if key in _background_compiles:
+            return False
+        _background_compiles.add(key)
+
+    def run():
+        try:
+            print(f"Compiled model: {compile_model(model_path, profile)}")
+        except Exception as e:
+            print(f"Warning: could not compile model '{model_path}': {e}")
+
+    threading.Thread(target=run, name="model-compiler").start()
+    return True
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="detectorist-compile-models",
+                                     description="Compile the ONNX models to optimized ORT-format models for faster loading.")
+    parser.add_argument("models_dir", nargs="?", default=None, help="Directory with the ONNX models (default: the models directory)")
+    parser.add_argument("--alongside", action="store_true", help="Save the compiled models next to the ONNX models instead of the user cache directory")
+    parser.add_argument("-f", "--force", action="store_true", help="Compile even if a valid compiled model exists")
+    args = parser.parse_args(argv)
+
+    models_dir = args.models_dir or get_model_path()
+    model_files = sorted(f for f in os.listdir(models_dir) if f.endswith(".onnx"))
+    if not model_files:
+        print(f"No ONNX models found in {models_dir}")
+        return 1
+
+    for model_file in model_files:
+        model_path = os.path.join(models_dir, model_file)
+        if not args.force and find_compiled_model(model_path):
+            print(f"Up to date: {model_file}")
+            continue
+        print(f"Compiled {model_file} -> {compile_model(model_path, alongside=args.alongside)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Reads the metadata of an ONNX model (class names, input and output shapes) without loading the model.
+
+An .onnx file is a serialized ModelProto protobuf message. Instead of depending on the onnx package or creating an
+onnxruntime session, the few needed fields are read directly from the memory-mapped file. The weights, which make up
+almost all of the file, are skipped without being read.
+"""
+import os
+import mmap
+import threading
+
+from .detector import Detector
+
+# Field numbers in onnx.proto
+_MODEL_GRAPH = 7
+_MODEL_METADATA_PROPS = 14
+_GRAPH_INPUT = 11
+_GRAPH_OUTPUT = 12
+_GRAPH_INITIALIZER = 5
+_STRING_ENTRY_KEY = 1
+_STRING_ENTRY_VALUE = 2
+_VALUE_INFO_NAME = 1
+_VALUE_INFO_TYPE = 2
+_TYPE_TENSOR_TYPE = 1
+_TENSOR_TYPE_SHAPE = 2
+_SHAPE_DIM = 1
+_DIM_VALUE = 1
+_DIM_PARAM = 2
+_TENSOR_NAME = 8
+
+# Protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+_FIXED32 = 5
+
+
+def _read_varint(buffer, position: int) -> tuple[int, int]:
+    """Returns the varint at position and the position after it."""
+    result = 0
+    shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def _fields(buffer, start: int, end: int):
+    """
+    Iterates over the fields of a protobuf message in buffer[start:end].
+
+    Yields:
+        (field_number, wire_type, value): The value is an int for varints and fixed-size fields,
+            and a (start, end) range for length-delimited fields (sub-messages, strings and bytes).
+    """
+    position = start
+    while position < end:
+        key, position = _read_varint(buffer, position)
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type == _VARINT:
+            value, position = _read_varint(buffer, position)
+        elif wire_type == _FIXED64:
+            value = int.from_bytes(buffer[position:position + 8], "little")
+            position += 8
+        elif wire_type == _LENGTH_DELIMITED:
+            length, position = _read_varint(buffer, position)
+            value = (position, position + length)
+            position += length
+        elif wire_type == _FIXED32:
+            value = int.from_bytes(buffer[position:position + 4], "little")
+            position += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field_number, wire_type, value
+
+
+def _string(buffer, value_range: tuple[int, int]) -> str:
+    return bytes(buffer[value_range[0]:value_range[1]]).decode("utf-8")
+
+
+def _read_value_info(buffer, start: int, end: int) -> tuple[str, list]:
+    """Returns the name and the shape of a ValueInfoProto. Unknown dimensions are their names or None."""
+    name = None
+    shape = []
+    for field, _, value in _fields(buffer, start, end):
+        if field == _VALUE_INFO_NAME:
+            name = _string(buffer, value)
+        elif field == _VALUE_INFO_TYPE:
+            for type_field, _, tensor_type in _fields(buffer, *value):
+                if type_field != _TYPE_TENSOR_TYPE:
+                    continue
+                for tensor_field, _, tensor_shape in _fields(buffer, *tensor_type):
+                    if tensor_field != _TENSOR_TYPE_SHAPE:
+                        continue
+                    for shape_field, _, dim in _fields(buffer, *tensor_shape):
+                        if shape_field != _SHAPE_DIM:
+                            continue
+                        size = None
+                        for dim_field, _, dim_value in _fields(buffer, *dim):
+                            if dim_field == _DIM_VALUE:
+                                size = dim_value
+                            elif dim_field == _DIM_PARAM:
+                                size = _string(buffer, dim_value)
+                        shape.append(size)
+    return name, shape
+
+
+class ModelMetadata:
+    """
+    Metadata of an ONNX model.
+
+    Attributes:
+        model_path (str): Path to the ONNX model file.
+        class_names (dict): The class names by class id, from the 'names' metadata entry.
+        metadata (dict): All custom metadata entries of the model.
+        input_shape (list): The shape of the (image) input, e.g. [1, 3, 640, 640]. Dynamic dimensions are strings.
+        output_shape (list): The shape of the first output.
+    """
+
+    def __init__(self, model_path: str, metadata: dict, input_shape: list, output_shape: list):
+        self.model_path = model_path
+        self.metadata = metadata
+        self.class_names = Detector._label_class_names_to_dict(metadata.get("names", ""))
+        self.input_shape = input_shape
+        self.output_shape = output_shape
+
+    @property
+    def input_size(self) -> tuple | None:
+        """Returns the (width, height) of the model input, or None if unknown."""
+        if len(self.input_shape) != 4:
+            return None
+        return self.input_shape[3], self.input_shape[2]
+
+    def summary(self) -> str:
+        """Returns a short description, e.g. for a tooltip."""
+        input_size = self.input_size
+        size_text = f"{input_size[0]}×{input_size[1]}" if input_size else "unknown"
+        classes = ", ".join(self.class_names.values()) or "unknown"
+        return f"Input size: {size_text}\nClasses: {classes}"
+
+    def __repr__(self):
+        return f"ModelMetadata({os.path.basename(self.model_path)}, input_shape={self.input_shape}, classes={len(self.class_names)})"
+
+
+def _parse_model(buffer) -> tuple[dict, list, list]:
+    metadata = {}
+    inputs = []
+    outputs = []
+    initializer_names = set()
+    for field, wire_type, value in _fields(buffer, 0, len(buffer)):
+        if field == _MODEL_METADATA_PROPS and wire_type == _LENGTH_DELIMITED:
+            entry = {entry_field: _string(buffer, entry_value) for entry_field, _, entry_value in _fields(buffer, *value)
+                     if entry_field in (_STRING_ENTRY_KEY, _STRING_ENTRY_VALUE)}
+            metadata[entry.get(_STRING_ENTRY_KEY, "")] = entry.get(_STRING_ENTRY_VALUE, "")
+        elif field == _MODEL_GRAPH and wire_type == _LENGTH_DELIMITED:
+            for graph_field, _, graph_value in _fields(buffer, *value):
+                if graph_field == _GRAPH_INPUT:
+                    inputs.append(_read_value_info(buffer, *graph_value))
+                elif graph_field == _GRAPH_OUTPUT:
+                    outputs.append(_read_value_info(buffer, *graph_value))
+                elif graph_field == _GRAPH_INITIALIZER:
+                    # Only the name of a weight tensor is read, older models also list the weights as inputs
+                    for tensor_field, _, tensor_value in _fields(buffer, *graph_value):
+                        if tensor_field == _TENSOR_NAME:
+                            initializer_names.add(_string(buffer, tensor_value))
+    inputs = [shape for name, shape in inputs if name not in initializer_names]
+    return metadata, inputs[0] if inputs else [], outputs[0][1] if outputs else []
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def read_model_metadata(model_path: str) -> ModelMetadata:
+    """
+    Reads the metadata of an ONNX model file without loading the model. Results are cached while the file is unchanged.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+
+    Returns:
+        ModelMetadata: The metadata of the model.
+
+    Raises:
+        IOError: If the file can't be read or is not a valid ONNX model.
+    """
+    try:
+        stat = os.stat(model_path)
+        key = (os.path.realpath(model_path), stat.st_mtime_ns, stat.st_size)
+        with _cache_lock:
+            if key in _cache:
+                return _cache[key]
+
+        with open(model_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            metadata, input_shape, output_shape = _parse_model(buffer)
+    except (OSError, ValueError, IndexError, UnicodeDecodeError) as e:
+        raise IOError(f"Error reading ONNX model metadata from '{model_path}': {e}") from e
+
+    model_metadata = ModelMetadata(model_path, metadata, input_shape, output_shape)
+    with _cache_lock:
+        _cache[key] = model_metadata
+    return model_metadata
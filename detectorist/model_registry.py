@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .detector import Detector
+from .model_metadata import ModelMetadata, read_model_metadata
+
+
+class ModelRegistry:
+    """
+    Keeps recently used models loaded, so switching between models doesn't reload them.
+
+    Up to max_models Detectors (each with its own onnxruntime session) are kept in least-recently-used order, as long as
+    their estimated memory use stays within the memory budget. The most recently used model is always kept. Models can
+    be loaded on a background thread with load_async(), and their metadata is available without loading them at all.
+    """
+
+    DEFAULT_MAX_MODELS = 3
+    DEFAULT_MEMORY_BUDGET_MB = 1024
+    # A loaded session needs about the size of its weights, plus the optimized copies and the buffers
+    MEMORY_PER_MODEL_BYTE = 2
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS, memory_budget_mb: int = DEFAULT_MEMORY_BUDGET_MB, warm_up: bool = False,
+                 **detector_args):
+        """
+        Args:
+            max_models: The maximum number of loaded models.
+            memory_budget_mb: The maximum estimated memory use of the loaded models in MB.
+            warm_up: Run a warm-up inference after loading a model (see Detector.warm_up()).
+            detector_args: Keyword arguments for every Detector, e.g. the store.
+        """
+        self.max_models = max(1, max_models)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.warm_up = warm_up
+        self.detector_args = detector_args
+        self._detectors = OrderedDict()  # Model path -> Detector, least recently used first
+        self._memory = {}  # Model path -> estimated memory use of the loaded model
+        self._loading = {}  # Model path -> Future of a running load
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+
+    @staticmethod
+    def _key(model_path: str) -> str:
+        return os.path.realpath(model_path)
+
+    def metadata(self, model_path: str) -> ModelMetadata:
+        """Returns the metadata (class names, input shape) of a model without loading it (see read_model_metadata())."""
+        return read_model_metadata(model_path)
+
+    def estimated_memory(self, model_path: str) -> int:
+        """Returns the estimated memory use of a loaded model in bytes."""
+        return os.path.getsize(model_path) * self.MEMORY_PER_MODEL_BYTE
+
+    def is_loaded(self, model_path: str) -> bool:
+        with self._lock:
+            return self._key(model_path) in self._detectors
+
+    def loaded_models(self) -> list[str]:
+        """Returns the paths of the loaded models, least recently used first."""
+        with self._lock:
+            return [detector.model_path for detector in self._detectors.values()]
+
+    def get(self, model_path: str) -> Detector:
+        """
+        Returns the Detector of a model, loading it on the calling thread if it isn't loaded yet.
+
+        Raises:
+            IOError: If the model cannot be loaded.
+        """
+        return self.load_async(model_path).result()
+
+    def load_async(self, model_path: str) -> Future:
+        """
+        Returns a Future of the Detector of a model. A model that isn't loaded yet is loaded on a background thread,
+        a loaded model's Future is already done. Loading the same model twice at the same time only loads it once.
+        """
+        key = self._key(model_path)
+        with self._lock:
+            detector = self._detectors.get(key)
+            if detector is not None:
+                self._detectors.move_to_end(key)
+                future = Future()
+                future.set_result(detector)
+                return future
+            future = self._loading.get(key)
+            if future is None:
+                future = self._loading[key] = self._executor.submit(self._load, key, model_path)
+            return future
+
+    def _load(self, key: str, model_path: str) -> Detector:
+        try:
+            detector = Detector(model_path, **self.detector_args)
+            warm_up_seconds = detector.warm_up() if self.warm_up else 0.0
+            print(f"Loaded model: {model_path} (load {detector.load_seconds * 1000:.0f} ms, warm-up {warm_up_seconds * 1000:.0f} ms)")
+            memory = self.estimated_memory(model_path)
+        except BaseException:
+            with self._lock:
+                self._loading.pop(key, None)
+            raise
+        with self._lock:
+            self._loading.pop(key, None)
+            self._detectors[key] = detector
+            self._detectors.move_to_end(key)
+            self._memory[key] = memory
+            self._evict()
+        return detector
+
+    def _evict(self):
+        """Unloads the least recently used models until the loaded models fit the limits (the lock must be held)."""
+        while len(self._detectors) > 1:
+            if len(self._detectors) <= self.max_models and sum(self._memory.values()) <= self.memory_budget:
+                break
+            key, detector = self._detectors.popitem(last=False)
+            del self._memory[key]
+            print(f"Unloaded model: {detector.model_path}")
+
+    def clear(self):
+        """Unloads all models. Detectors still in use elsewhere (e.g. by a running batch) stay usable."""
+        with self._lock:
+            self._detectors.clear()
+            self._memory.clear()
+
+    def shutdown(self):
+        """Stops the background loader, without waiting for a running load."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,133 +1,67 @@
 import os
 import sys
 import time
+import threading
 import subprocess
 
-import pillow_heif
-
 from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QProgressDialog, QDialog
 from PySide6.QtGui import QPixmap
-from PySide6.QtCore import QDir, Qt, QStringListModel, QRect, QTimer
+from PySide6.QtCore import QDir, Qt, QStringListModel, QRect, QTimer, QObject, Signal
 
 from detectorist._version import __version__
 from detectorist.model_viewer_gui import Ui_ModelViewerUI
 from detectorist.about_dialog import Ui_AboutDialog
 
-from .detector import Detector
+from .batch import BatchPipeline, CropJob, SortJob, calculate_crop_rect, create_output_dir, list_image_files
+from .cascade import CascadeDetector
+from .detection_store import DetectionStore
 from .image_object import ImageObject
 from .image_label import ImageLabel
+from .model_registry import ModelRegistry
+from .prefetcher import ImagePrefetcher
+from .tiling import Tiling
 from .utils import get_model_path
-from . import image_utils
+from . import image_cache, image_utils
 
-class ModelViewer(QMainWindow):
-    
+class ModelSignals(QObject):
+    """Signals of the model registry's background loading, delivered to the GUI thread."""
+    loaded = Signal(str, object)  # Model path, Future of the Detector
 
-    @staticmethod
-    def _calculate_crop_rect(detections: list, image_shape: tuple, crop_mode: str, padding_percentage: float, aspect_ratio: tuple[int, int]) -> tuple[int, int, int, int] | None:
-        """
-        Calculates a crop rectangle based on detections and parameters.
-        
-        Args:
-            detections: A list of detections, where each detection is a tuple ((x, y, w, h), score, class_id).
-            image_shape: The shape of the image (height, width, channels).
-            crop_mode: 'top_confidence' or 'largest_area'.
-            padding_percentage: Padding to add around the bounding box, as a float (e.g., 0.1 for 10%).
-            aspect_ratio: A tuple (width, height) for the target aspect ratio.
-
-        Returns:
-            A tuple (x, y, w, h) for the crop rectangle, or None if no rectangle could be calculated.
-        """
-        if not detections:
-            return None
 
-        if crop_mode == 'top_confidence':
-            top_detection = max(detections, key=lambda d: d[1])
-            x, y, w, h = top_detection[0]
-        elif crop_mode == 'largest_area':
-            # The detection boxes are tuples of (x, y, w, h)
-            left = min(d[0][0] for d in detections)
-            top = min(d[0][1] for d in detections)
-            right = max(d[0][0] + d[0][2] for d in detections)
-            bottom = max(d[0][1] + d[0][3] for d in detections)
-            x, y, w, h = left, top, right - left, bottom - top
-        else:
-            return None
+class BatchSignals(QObject):
+    """Signals to report the progress of a BatchPipeline (running on worker threads) to the GUI thread."""
+    progress = Signal(int, int, str)  # done, total, image path
+    finished = Signal(bool, str)  # completed, error message
 
-        # Add padding
-        padding_x = int(w * padding_percentage)
-        padding_y = int(h * padding_percentage)
-        
-        x -= padding_x
-        y -= padding_y
-        w += 2 * padding_x
-        h += 2 * padding_y
 
-        # Adjust for aspect ratio
-        if h <= 0 or aspect_ratio[1] <= 0:
-            return None # Avoid division by zero
+class ModelViewer(QMainWindow):
 
-        ratio_w, ratio_h = aspect_ratio
-        rect_w, rect_h = w, h
-        
-        current_ratio = rect_w / rect_h
-        target_ratio = ratio_w / ratio_h
-
-        if current_ratio > target_ratio:
-            # Too wide, adjust height
-            new_h = int(rect_w / target_ratio)
-            diff_h = new_h - rect_h
-            y -= diff_h // 2
-            h = new_h
-        else:
-            # Too tall, adjust width
-            new_w = int(rect_h * target_ratio)
-            diff_w = new_w - rect_w
-            x -= diff_w // 2
-            w = new_w
-
-        # Ensure the crop rectangle is within the image boundaries
-        image_height, image_width, _ = image_shape
-
-        # If the crop rectangle is larger than the image, scale it down
-        scale = 1.0
-        if w > image_width:
-            scale = image_width / w
-        if h > image_height:
-            scale = min(scale, image_height / h)
-
-        if scale < 1.0:
-            w = int(w * scale)
-            h = int(h * scale)
-
-        # If the crop rectangle is outside the image, move it
-        if x < 0:
-            x = 0
-        if y < 0:
-            y = 0
-        if x + w > image_width:
-            x = image_width - w
-        if y + h > image_height:
-            y = image_height - h
-
-        return (x, y, w, h)
-
-    def __init__(self):
+    def __init__(self, start_time=None):
+        """
+        Args:
+            start_time (float, optional): The time.perf_counter() value of the application start, for logging the
+                time to window and the time to the first detection.
+        """
         super().__init__()
+        self.start_time = start_time or time.perf_counter()
+        self.window_shown = False
+        self.first_detection_done = False
 
         self.current_image_path = None
         self.current_folder_path = None
         self.last_confidence = None
         self.last_nms = None
-        
-        # Ensure opener is registered (otherwise the native code will segfault)
-        pillow_heif.register_heif_opener()
+        self.batch_pipeline = None # The BatchPipeline of a running crop or sort action
+        self.prefetcher = ImagePrefetcher() # Decodes and detects the neighbouring images in the background
+        self.loading_first_pass = False # True while the first pass model of a crop or sort action is loading
+
 
         # Set up the UI
         self.ui = Ui_ModelViewerUI()
         self.ui.setupUi(self)
         self.setWindowTitle(f"Detectorist {__version__}")
 
-        # Debounce timer for detection
+        # Debounce timer for detection (only used while the model output for the current image is not cached yet)
         self.detection_timer = QTimer(self)
         self.detection_timer.setSingleShot(True)
         self.detection_timer.setInterval(500)  # 500ms delay
@@ -169,6 +103,8 @@ class ModelViewer(QMainWindow):
         self.ui.nmsSlider.sliderReleased.connect(self.detect_objects)
         self.ui.confidenceSpinBox.editingFinished.connect(self.detect_objects)
         self.ui.nmsSpinBox.editingFinished.connect(self.detect_objects)
+        self.ui.tiledDetectionCheckBox.toggled.connect(self.on_tiled_detection_toggled)
+        self.ui.actionLowMemoryMode.toggled.connect(self.on_low_memory_mode_toggled)
 
 
         # Connect crop controls
@@ -177,6 +113,18 @@ class ModelViewer(QMainWindow):
         self.ui.cropRatioComboBox.currentIndexChanged.connect(self.update_crop_band)
         self.ui.paddingSlider.valueChanged.connect(self.update_crop_band)
 
+        # Persistent store of the detections, so re-opened folders don't need to run the model again
+        try:
+            self.detection_store = DetectionStore()
+        except Exception as e:
+            print(f"Warning: detection store not available: {e}")
+            self.detection_store = None
+
+        # Loaded models are kept, so switching back and forth between models doesn't reload them
+        self.model_registry = ModelRegistry(warm_up=True, store=self.detection_store)
+        self.model_signals = ModelSignals(self)
+        self.model_signals.loaded.connect(self._on_model_loaded)
+
         self.models_dir=get_model_path()
         if not os.path.exists(self.models_dir):
             print(f"Error: models directory does not exist at {self.models_dir}")
@@ -187,10 +135,15 @@ class ModelViewer(QMainWindow):
         self.onnx_models = [f for f in os.listdir(self.models_dir) if f.endswith(".onnx")]
         print(f"Found ONNX models: {self.onnx_models}")
         self.ui.modelSelectComboBox.addItems(self.onnx_models)
+        self.ui.firstPassComboBox.addItems(["Off"] + self.onnx_models)
+        self._set_model_tooltips()
         self.ui.modelSelectComboBox.currentIndexChanged.connect(self.on_model_selected)
 
-        # Load AI model
-        self.on_model_selected(0)
+        # Load AI model (in the background, the window is shown meanwhile)
+        self.detector = None
+        # The registry's Detectors are shared (with the prefetcher and batch threads), so the tiling is passed per call
+        self.tiling = Tiling() if self.ui.tiledDetectionCheckBox.isChecked() else None
+        self._load_model(0)
 
 
     def _update_detection_info(self, objects="-", confidence="-", time="-"):
@@ -204,7 +157,13 @@ class ModelViewer(QMainWindow):
 
 
     def request_detection(self):
-        self.detection_timer.start()
+        # With the raw model output cached only the post-processing is re-run, which is fast
+        # enough to follow the sliders live. Otherwise debounce the (expensive) full detection.
+        if self.ui.imageLabel.image and self.detector and self.detector.has_cached_output(self.ui.imageLabel.image, self.tiling):
+            self.detection_timer.stop()
+            self.detect_objects()
+        else:
+            self.detection_timer.start()
 
 
     def open_folder(self, folder_path=None):
@@ -216,13 +175,13 @@ class ModelViewer(QMainWindow):
             self.model.setStringList([])
             self.current_image_path = None
             self.ui.imageLabel.clear()
+            self.prefetcher.clear()
 
             self.ui.imageLabel.setText("Loading Images...")
             QApplication.processEvents()  # Update the UI to show the message
 
             # Filter the selected directory for supported files
-            image_files = sorted([f for f in os.listdir(folder_path)
-                           if f.lower().endswith(ImageObject.SUPPORTED_IMG_EXTENSIONS)])
+            image_files = list_image_files(folder_path)
 
             if image_files:
                 self.model.setStringList(image_files)
@@ -242,13 +201,16 @@ class ModelViewer(QMainWindow):
             self.current_image_path = os.path.join(self.current_folder_path, file_name)
             self.ui.statusBar.showMessage(file_name)
 
-            if self.ui.imageLabel.replace_image(self.current_image_path):
+            decode_size = self._decode_size()
+            image = self.prefetcher.take(self.current_image_path, decode_size)
+            if self.ui.imageLabel.replace_image(self.current_image_path, decode_size, image):
+                self._prefetch_neighbours(index.row(), decode_size)
                 self.last_confidence = None  # Reset for new image
                 self.last_nms = None  # Reset for new image
                 self._update_detection_info() # Reset for new detection
 
                 # Add image info to the self.ui.imageInfoLabel
-                height, width, _ = self.ui.imageLabel.image.image_data.shape
+                height, width, _ = self.ui.imageLabel.image.shape
                 #color_depth = "16-bit" if self.ui.imageLabel.image.is16bit else "8-bit" #TODO: rework color depth logic HIF have BitDepthChroma and BitDepthLuma in EXIF, ARW and JPG have BitsPerSample
                 file_type = self.ui.imageLabel.image.file_extension.upper()[1:]
                 #self.ui.imageInfoLabel.setText(f"Resolution\t: {width}x{height}\nColor depth\t: {color_depth}\nFile type \t: {file_type}")
@@ -274,14 +236,119 @@ class ModelViewer(QMainWindow):
                 # This will ensure the image appears, and then the detection kicks off right away
                 QTimer.singleShot(0, self.detect_objects)
 
+    def _prefetch_neighbours(self, row, decode_size):
+        """Prefetches the images around the shown one. Their detection is skipped while a batch uses the detector."""
+        image_paths = [os.path.join(self.current_folder_path, file_name) for file_name in self.model.stringList()]
+        detector = self.detector if self.batch_pipeline is None else None
+        self.prefetcher.update(image_paths, row, decode_size, detector, self.tiling)
+
+    def _decode_size(self):
+        """
+        Returns the decode size hint for the shown images (see ImageObject): large enough to fill the screen and for
+        the detector's input. Tiled detection needs the full resolution.
+        """
+        if self.tiling:
+            return None
+        screen = self.screen()
+        pixel_ratio = screen.devicePixelRatio()
+        width = round(screen.availableSize().width() * pixel_ratio)
+        height = round(screen.availableSize().height() * pixel_ratio)
+        detector_size = self.detector.decode_size() if self.detector else None
+        if detector_size:
+            width, height = max(width, detector_size[0]), max(height, detector_size[1])
+        return width, height
+
+    def _set_model_tooltips(self):
+        """Shows the input size and classes of the models in the model selection, read without loading the models."""
+        for index, model_name in enumerate(self.onnx_models):
+            try:
+                metadata = self.model_registry.metadata(os.path.join(self.models_dir, model_name))
+            except IOError as e:
+                print(f"Warning: {e}")
+                continue
+            self.ui.modelSelectComboBox.setItemData(index, metadata.summary(), Qt.ToolTipRole)
+            self.ui.firstPassComboBox.setItemData(index + 1, metadata.summary(), Qt.ToolTipRole)
+
     def on_model_selected(self, index):
-        model_name = self.ui.modelSelectComboBox.itemText(index)
-        model_path = os.path.join(self.models_dir, model_name)
+        self._load_model(index)
+
+    def _load_model(self, index):
+        """
+        Activates the model at the index of the model selection. A model that isn't loaded yet is loaded (and warmed up)
+        on a background thread. Meanwhile the previous model, if any, keeps detecting, but the actions are disabled.
+        """
+        model_path = os.path.join(self.models_dir, self.ui.modelSelectComboBox.itemText(index))
+        future = self.model_registry.load_async(model_path)
+        if future.done():
+            self._on_model_loaded(model_path, future)
+        else:
+            self._set_model_loading(True)
+            self.ui.statusBar.showMessage(f"Loading model {os.path.basename(model_path)}...")
+            future.add_done_callback(lambda future: self.model_signals.loaded.emit(model_path, future))
+
+    def _set_model_loading(self, loading):
+        """Enables or disables the actions that need the selected model, while it is loading."""
+        for action in (self.ui.detectObjectAction, self.ui.actionCropSaveImage, self.ui.actionCropSaveAllImages,
+                       self.ui.actionSort_images_by_object_class):
+            action.setEnabled(not loading)
+        if loading and self.detector is None and not self.current_image_path:
+            self.ui.imageLabel.setText("Loading model...\nDrop a folder with images")
+        elif not loading and self.detector is not None and not self.current_image_path:
+            self.ui.imageLabel.setText("Drop a folder with images")
+
+    def _on_model_loaded(self, model_path, future):
+        selected_path = os.path.join(self.models_dir, self.ui.modelSelectComboBox.currentText())
+        if model_path != selected_path:
+            return  # Another model was selected meanwhile
         try:
-            self.detector = Detector(model_path)
-            print(f"Loaded model: {model_path}")
+            detector = future.result()
         except IOError as e:
+            self.ui.statusBar.clearMessage()
             self.ui.imageLabel.setText(f"Error loading model: {e}")
+            return
+
+        self.detector = detector
+        self._set_model_loading(False)
+        self.ui.statusBar.showMessage(f"Model {os.path.basename(model_path)} ready", 3000)
+
+        # Detect the current image with the new model
+        self.last_confidence = None
+        self.last_nms = None
+        if self.current_image_path:
+            self.request_detection()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.window_shown:
+            self.window_shown = True
+            # Logged from the event loop, i.e. once the window has been painted
+            QTimer.singleShot(0, lambda: print(f"Time to window: {(time.perf_counter() - self.start_time) * 1000:.0f} ms"))
+
+    def on_tiled_detection_toggled(self, checked):
+        self.tiling = Tiling() if checked else None
+        if not self.detector:
+            return
+        # The tiles are cut from the full-resolution image
+        image = self.ui.imageLabel.image
+        if checked and image is not None and image.is_reduced:
+            self.ui.imageLabel.replace_image(self.current_image_path)
+        if self.current_image_path:
+            # The neighbours are detected with the new tiling (and decoded at full resolution for it)
+            self._prefetch_neighbours(self.ui.imageListView.currentIndex().row(), self._decode_size())
+        # Force a new detection with the same thresholds
+        self.last_confidence = None
+        self.last_nms = None
+        self.request_detection()
+
+    def on_low_memory_mode_toggled(self, checked):
+        image_cache.set_proxy_mode(checked)
+        # Free the 16-bit data of the shown image right away
+        image = self.ui.imageLabel.image
+        if checked and image is not None and image.is16bit:
+            self.ui.imageLabel.replace_image(self.current_image_path, self._decode_size())
+            self.last_confidence = None
+            self.last_nms = None
+            self.request_detection()
 
     def show_about_dialog(self):
         about_dialog = QDialog(self)
@@ -315,6 +382,7 @@ class ModelViewer(QMainWindow):
         self.model.setStringList([])
         self.current_image_path = None
         self.ui.imageLabel.clear()
+        self.prefetcher.clear()
         image_files = sorted([f for f in os.listdir(folder_path)
                                if f.lower().endswith(ImageObject.SUPPORTED_FORMATS)])
         self.model.setStringList(image_files)
@@ -328,7 +396,7 @@ class ModelViewer(QMainWindow):
             self.ui.imageLabel.setText(f"Error: {os.path.basename(file_path)} not found in folder.")
 
     def detect_objects(self):
-        if not self.ui.imageLabel.image:
+        if not self.ui.imageLabel.image or not self.detector:
             return
 
         confidence = self.ui.confidenceSlider.value() / 100.0
@@ -342,7 +410,7 @@ class ModelViewer(QMainWindow):
 
         try:
             start_time = time.perf_counter()
-            results = self.detector.detect(self.ui.imageLabel.image, confidence_threshold=confidence, nms_threshold=nms)
+            results = self.detector.detect(self.ui.imageLabel.image, confidence_threshold=confidence, nms_threshold=nms, tiling=self.tiling)
             end_time = time.perf_counter()            
             detection_time_ms = (end_time - start_time) * 1000
 
@@ -355,6 +423,11 @@ class ModelViewer(QMainWindow):
             self.ui.imageLabel.set_detection_boxes(results)
             self.update_crop_band()
 
+            if not self.first_detection_done:
+                self.first_detection_done = True
+                print(f"Time to first detection: {(time.perf_counter() - self.start_time) * 1000:.0f} ms "
+                      f"(detection {detection_time_ms:.0f} ms)")
+
             # Cache the new values
             self.last_confidence = confidence
             self.last_nms = nms
@@ -379,30 +452,26 @@ class ModelViewer(QMainWindow):
         return crop_mode, padding_percentage, aspect_ratio
 
     def update_crop_band(self):
-        if not self.ui.imageLabel.image or not self.ui.imageLabel.orig_detection_rects:
-            self.ui.imageLabel.crop_band.hide()
+        if not self.ui.imageLabel.image or not self.ui.imageLabel.detections:
+            self.ui.imageLabel.hide_crop_box()
             self.ui.actionCropSaveImage.setEnabled(False)
             return
 
-        # The detections in imageLabel are (QRect, score, class_id)
-        # convert them to ((x,y,w,h), score, class_id) for calculate_crop_rect
-        detections = [
-            ((d[0].x(), d[0].y(), d[0].width(), d[0].height()), d[1], d[2])
-            for d in self.ui.imageLabel.orig_detection_rects
-        ]
+        # The detections in imageLabel are ((x, y, w, h), score, class_name), as calculate_crop_rect expects them
+        detections = self.ui.imageLabel.detections
 
         crop_mode, padding_percentage, aspect_ratio = self._get_current_crop_settings()
 
         if not crop_mode:
-            self.ui.imageLabel.crop_band.hide()
+            self.ui.imageLabel.hide_crop_box()
             self.ui.actionCropSaveImage.setEnabled(False)
             return
 
-        image_shape = self.ui.imageLabel.image.image_data.shape
-        crop_tuple = ModelViewer._calculate_crop_rect(detections, image_shape, crop_mode, padding_percentage, aspect_ratio)
+        image_shape = self.ui.imageLabel.image.shape
+        crop_tuple = calculate_crop_rect(detections, image_shape, crop_mode, padding_percentage, aspect_ratio)
 
         if not crop_tuple or crop_tuple[2] <= 0 or crop_tuple[3] <= 0:
-            self.ui.imageLabel.crop_band.hide()
+            self.ui.imageLabel.hide_crop_box()
             self.ui.actionCropSaveImage.setEnabled(False)
             return
 
@@ -413,27 +482,12 @@ class ModelViewer(QMainWindow):
 
     def _create_output_dir(self):
         """
-        Create the output directory for the images, encoding the date and model name.
+        Create the output directory for the images, encoding the confidence and model name.
         Returns the paths to the output directory.
         """
-
-        #timestamp = time.strftime("%Y%m%d")
         confidence = self.ui.confidenceSlider.value()
         model_name = os.path.splitext(self.ui.modelSelectComboBox.currentText())[0]
-        output_dir = os.path.join(self.current_folder_path, f"output_conf{confidence}_{model_name}")
-        os.makedirs(output_dir, exist_ok=True)
-        return output_dir
-
-    def _create_crop_dirs(self, output_dir):
-        """
-        Creates the output directories for the cropped and non-cropped images inside the given directory
-        Returns the paths to the cropped and not-cropped directories.
-        """
-        cropped_dir = os.path.join(output_dir, "cropped")
-        not_cropped_dir = os.path.join(output_dir, "not-cropped")
-        os.makedirs(cropped_dir, exist_ok=True)
-        os.makedirs(not_cropped_dir, exist_ok=True)
-        return cropped_dir, not_cropped_dir
+        return create_output_dir(self.current_folder_path, confidence, model_name)
 
     def _open_native_file_manager(self, path):
         """Opens a folder in the native (OS specicic) file manager."""
@@ -454,18 +508,20 @@ class ModelViewer(QMainWindow):
         crop_tuple = (rect.x(), rect.y(), rect.width(), rect.height())
 
         output_dir = self._create_output_dir()
-        cropped_dir, _ = self._create_crop_dirs(output_dir)
-        image_utils.crop_image_file(self.current_image_path, cropped_dir, crop_tuple)
+        cropped_dir, _ = CropJob.create_crop_dirs(output_dir)
+        image_utils.crop_image_file(self.ui.imageLabel.image, cropped_dir, crop_tuple)
         self._open_native_file_manager(output_dir)
 
-    def _process_all_images(self, process_name: str, setup_callback: callable, process_callback: callable):
+    def _process_all_images(self, process_name: str, create_job: callable):
         """
-        Helper method that encapsulates the loop that goes through all the images.
-        It covers the progress dialog, image loading, and object detection.
-        This helper accepts a setup_callback for any pre-processing steps (like preparing directories) 
-        and a process_callback to execute the specific action (cropping or sorting) for each image.
+        Helper method that runs the detection and a per-image action over all images of the current folder.
+        A first pass model selected for the cascade is taken from the model registry (loaded in the background if
+        needed), then _start_batch() shows the progress dialog and starts a BatchPipeline (image loading, object
+        detection and the action) on a background thread, so the GUI stays responsive.
+        This helper accepts a create_job callback that is called with the output directory and returns the
+        per-image action (like a CropJob or SortJob), or None to abort.
         """
-        if not self.current_folder_path:
+        if not self.current_folder_path or self.batch_pipeline or self.loading_first_pass or not self.detector:
             return
 
         image_files = self.model.stringList()
@@ -475,99 +531,125 @@ class ModelViewer(QMainWindow):
         try:
             output_dir = self._create_output_dir()
 
-            state = setup_callback(output_dir)
-            if state is None:
+            job = create_job(output_dir)
+            if job is None:
+                return
+        except Exception as e:
+            print(f"Error during {process_name}: {e}")
+            self.ui.statusBar.showMessage(f"Error during {process_name}: {e}", 5000)
+            return
+
+        if self.ui.firstPassComboBox.currentIndex() <= 0:
+            self._start_batch(process_name, job, output_dir, self.detector)
+            return
+
+        # The cascade's first pass model comes from the registry, loaded in the background if needed
+        first_pass_path = os.path.join(self.models_dir, self.ui.firstPassComboBox.currentText())
+        future = self.model_registry.load_async(first_pass_path)
+        detector = self.detector
+
+        def on_first_pass_loaded(model_path, future):
+            self.loading_first_pass = False
+            try:
+                first_pass_detector = future.result()
+            except IOError as e:
+                self.ui.statusBar.showMessage(f"Error loading first pass model: {e}", 5000)
                 return
+            self._start_batch(process_name, job, output_dir, CascadeDetector(first_pass_detector, detector))
 
-            total_files = len(image_files)
-            progress_dialog = QProgressDialog(f"{process_name}...", "Cancel", 0, total_files, self)
-            progress_dialog.setWindowModality(Qt.WindowModal)
-            progress_dialog.setAutoClose(True)
-
-            confidence = self.ui.confidenceSlider.value() / 100.0
-            nms = self.ui.nmsSlider.value() / 100.0
-            
-            cancelled = False
-            for i, file_name in enumerate(image_files):
-                progress_dialog.setValue(i)
-                progress_dialog.setLabelText(f"Processing {i+1}/{total_files}: {file_name}")
-                QApplication.processEvents()
-
-                if progress_dialog.wasCanceled():
-                    cancelled = True
-                    break
-
-                image_path = os.path.join(self.current_folder_path, file_name)
-                image = ImageObject(image_path)
-                results = self.detector.detect(image, confidence_threshold=confidence, nms_threshold=nms)
-                
-                process_callback(image, results, output_dir, **state)
-            
+        if future.done():
+            on_first_pass_loaded(first_pass_path, future)
+        else:
+            self.loading_first_pass = True
+            self.ui.statusBar.showMessage(f"Loading first pass model {os.path.basename(first_pass_path)}...")
+            signals = ModelSignals(self)
+            signals.loaded.connect(on_first_pass_loaded)
+            signals.loaded.connect(signals.deleteLater)  # Used for this one load only
+            future.add_done_callback(lambda future: signals.loaded.emit(first_pass_path, future))
+
+    def _start_batch(self, process_name: str, job: callable, output_dir: str, detector):
+        """
+        Shows the progress dialog and runs a BatchPipeline with the detector (a Detector or a CascadeDetector) and the
+        per-image job over all images of the current folder, on a background thread.
+        """
+        image_files = self.model.stringList()
+        total_files = len(image_files)
+        progress_dialog = QProgressDialog(f"{process_name}...", "Cancel", 0, total_files, self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setAutoClose(True)
+
+        # The pipeline reports from its worker threads, the signals deliver that to the GUI thread
+        signals = BatchSignals(self)
+        pipeline = BatchPipeline(
+            detector,
+            [os.path.join(self.current_folder_path, file_name) for file_name in image_files],
+            job,
+            confidence_threshold=self.ui.confidenceSlider.value() / 100.0,
+            nms_threshold=self.ui.nmsSlider.value() / 100.0,
+            batch_size=self.ui.batchSizeSpinBox.value(),
+            on_progress=signals.progress.emit,
+            tiling=self.tiling
+        )
+        self.batch_pipeline = pipeline
+
+        def on_progress(done, total, image_path):
+            progress_dialog.setValue(done)
+            progress_dialog.setLabelText(f"Processing {done}/{total}: {os.path.basename(image_path)}")
+
+        def on_finished(completed, error):
+            self.batch_pipeline = None
             progress_dialog.setValue(total_files) # Close it anyway
-            if not cancelled:
-                self.ui.statusBar.showMessage(f"Finished {process_name.lower()}.", 5000)
+            if error:
+                print(f"Error during {process_name}: {error}")
+                self.ui.statusBar.showMessage(f"Error during {process_name}: {error}", 5000)
+            elif completed:
+                message = f"Finished {process_name.lower()}."
+                if isinstance(detector, CascadeDetector):
+                    print(detector.stats.summary())
+                    message += f" {detector.stats.summary()}"
+                self.ui.statusBar.showMessage(message, 10000)
                 self._open_native_file_manager(output_dir)
             else:
                 self.ui.statusBar.showMessage(f"{process_name} cancelled.", 5000)
 
-        except Exception as e:
-            print(f"Error during {process_name}: {e}")
-            self.ui.statusBar.showMessage(f"Error during {process_name}: {e}", 5000)
+        def run():
+            try:
+                completed = pipeline.run()
+                signals.finished.emit(completed, "")
+            except Exception as e:
+                signals.finished.emit(False, str(e))
+
+        signals.progress.connect(on_progress)
+        signals.finished.connect(on_finished)
+        # The progress is reported before the pipeline finishes, so both objects can go with the last signal
+        signals.finished.connect(signals.deleteLater)
+        signals.finished.connect(progress_dialog.deleteLater)
+        progress_dialog.canceled.connect(pipeline.cancel)
+        progress_dialog.setValue(0)
+        threading.Thread(target=run, daemon=True).start()
 
     def crop_save_all_images(self):
         """Crops and saves all images in the current folder based on detections and crop settings."""
-        def setup(output_dir):
+        def create_job(output_dir):
             crop_mode, padding_percentage, aspect_ratio = self._get_current_crop_settings()
             if not crop_mode:
                 self.ui.statusBar.showMessage("No crop mode selected.", 5000)
                 return None
-            
-            cropped_dir, not_cropped_dir = self._create_crop_dirs(output_dir)
-            return {
-                "crop_mode": crop_mode,
-                "padding_percentage": padding_percentage,
-                "aspect_ratio": aspect_ratio,
-                "cropped_dir": cropped_dir,
-                "not_cropped_dir": not_cropped_dir
-            }
-
-        def processor(image, results, output_dir, **state):
-            if not results:
-                image.copy_image_file(state["not_cropped_dir"])
-                return
-
-            image_shape = image.image_data.shape
-            crop_tuple = ModelViewer._calculate_crop_rect(results, image_shape, state["crop_mode"], state["padding_percentage"], state["aspect_ratio"])
-
-            if not crop_tuple or crop_tuple[2] <= 0 or crop_tuple[3] <= 0:
-                print(f"Warning {os.path.basename(image.image_path)}: invalid crop rectangle, crop_tuple: {crop_tuple}")
-                image.copy_image_file(state["not_cropped_dir"])
-                return
-
-            image_utils.crop_image_file(image.image_path, state["cropped_dir"], crop_tuple)
+            return CropJob(output_dir, crop_mode, padding_percentage, aspect_ratio)
 
-        self._process_all_images("Cropping images", setup, processor)
+        self._process_all_images("Cropping images", create_job)
         
     def sort_images_by_class_into_folders(self):
         """Sorts images into folders based on the detected object class name."""
-        def setup(output_dir):
-            return {} # Return empty dict for state
-
-        def processor(image, results, output_dir, **state):
-            if results:
-                top_detection = max(results, key=lambda d: d[1])
-                class_name = top_detection[2]
-                class_dir = os.path.join(output_dir, class_name)
-                os.makedirs(class_dir, exist_ok=True)
-                image.copy_image_file(class_dir)
-            else:
-                no_detection_dir = os.path.join(output_dir, "no-detection")
-                os.makedirs(no_detection_dir, exist_ok=True)
-                image.copy_image_file(no_detection_dir)
-
-        self._process_all_images("Sorting images", setup, processor)
+        self._process_all_images("Sorting images", SortJob)
 
     def closeEvent(self, event):
         # Clean up resources, if any
         print("Closing application...")
+        if self.batch_pipeline:
+            self.batch_pipeline.cancel()
+        self.prefetcher.shutdown()
+        self.ui.imageLabel.shutdown()
+        self.model_registry.shutdown()
+        print(image_cache.summary())
         super().closeEvent(event)
\ No newline at end of file
@@ -16,12 +16,12 @@ from PySide6.QtGui import (QAction, QBrush, QColor, QConicalGradient,
     QIcon, QImage, QKeySequence, QLinearGradient,
     QPainter, QPalette, QPixmap, QRadialGradient,
     QTransform)
-from PySide6.QtWidgets import (QApplication, QButtonGroup, QComboBox, QGridLayout,
-    QGroupBox, QHBoxLayout, QLabel, QListView,
-    QMainWindow, QMenu, QMenuBar, QRadioButton,
-    QScrollArea, QSizePolicy, QSlider, QSpacerItem,
-    QSpinBox, QSplitter, QStatusBar, QVBoxLayout,
-    QWidget)
+from PySide6.QtWidgets import (QApplication, QButtonGroup, QCheckBox, QComboBox,
+    QGridLayout, QGroupBox, QHBoxLayout, QLabel,
+    QListView, QMainWindow, QMenu, QMenuBar,
+    QRadioButton, QScrollArea, QSizePolicy, QSlider,
+    QSpacerItem, QSpinBox, QSplitter, QStatusBar,
+    QVBoxLayout, QWidget)
 
 class Ui_ModelViewerUI(object):
     def setupUi(self, ModelViewerUI):
@@ -45,6 +45,9 @@ class Ui_ModelViewerUI(object):
         self.actionSort_images_by_object_class = QAction(ModelViewerUI)
         self.actionSort_images_by_object_class.setObjectName(u"actionSort_images_by_object_class")
         self.actionSort_images_by_object_class.setEnabled(False)
+        self.actionLowMemoryMode = QAction(ModelViewerUI)
+        self.actionLowMemoryMode.setObjectName(u"actionLowMemoryMode")
+        self.actionLowMemoryMode.setCheckable(True)
         self.centralWidget = QWidget(ModelViewerUI)
         self.centralWidget.setObjectName(u"centralWidget")
         self.mainLayout = QHBoxLayout(self.centralWidget)
@@ -145,6 +148,34 @@ class Ui_ModelViewerUI(object):
 
         self.gridLayout_2.addWidget(self.nmsSpinBox, 2, 2, 1, 1)
 
+        self.batchSizeLabel = QLabel(self.modelGroupBox)
+        self.batchSizeLabel.setObjectName(u"batchSizeLabel")
+
+        self.gridLayout_2.addWidget(self.batchSizeLabel, 3, 0, 1, 1)
+
+        self.batchSizeSpinBox = QSpinBox(self.modelGroupBox)
+        self.batchSizeSpinBox.setObjectName(u"batchSizeSpinBox")
+        self.batchSizeSpinBox.setMinimum(1)
+        self.batchSizeSpinBox.setMaximum(64)
+        self.batchSizeSpinBox.setValue(8)
+
+        self.gridLayout_2.addWidget(self.batchSizeSpinBox, 3, 2, 1, 1)
+
+        self.tiledDetectionCheckBox = QCheckBox(self.modelGroupBox)
+        self.tiledDetectionCheckBox.setObjectName(u"tiledDetectionCheckBox")
+
+        self.gridLayout_2.addWidget(self.tiledDetectionCheckBox, 4, 0, 1, 3)
+
+        self.firstPassLabel = QLabel(self.modelGroupBox)
+        self.firstPassLabel.setObjectName(u"firstPassLabel")
+
+        self.gridLayout_2.addWidget(self.firstPassLabel, 5, 0, 1, 1)
+
+        self.firstPassComboBox = QComboBox(self.modelGroupBox)
+        self.firstPassComboBox.setObjectName(u"firstPassComboBox")
+
+        self.gridLayout_2.addWidget(self.firstPassComboBox, 5, 1, 1, 2)
+
 
         self.verticalLayout.addWidget(self.modelGroupBox)
 
@@ -283,6 +314,8 @@ class Ui_ModelViewerUI(object):
         self.menuTools.addSeparator()
         self.menuTools.addAction(self.actionCropSaveImage)
         self.menuTools.addAction(self.actionCropSaveAllImages)
+        self.menuTools.addSeparator()
+        self.menuTools.addAction(self.actionLowMemoryMode)
         self.menuHelp.addAction(self.actionAbout)
 
         self.retranslateUi(ModelViewerUI)
@@ -320,6 +353,10 @@ class Ui_ModelViewerUI(object):
 #if QT_CONFIG(shortcut)
         self.actionSort_images_by_object_class.setShortcut(QCoreApplication.translate("ModelViewerUI", u"Ctrl+Shift+S", None))
 #endif // QT_CONFIG(shortcut)
+        self.actionLowMemoryMode.setText(QCoreApplication.translate("ModelViewerUI", u"Low memory mode", None))
+#if QT_CONFIG(tooltip)
+        self.actionLowMemoryMode.setToolTip(QCoreApplication.translate("ModelViewerUI", u"Keep only 8-bit copies of the images in memory. 16-bit RAW and HEIF images are decoded again to write crops.", None))
+#endif // QT_CONFIG(tooltip)
         self.imageLabel.setStyleSheet(QCoreApplication.translate("ModelViewerUI", u"background-color: gray;", None))
         self.imageLabel.setText(QCoreApplication.translate("ModelViewerUI", u"Open Folder...", None))
         self.modelGroupBox.setTitle(QCoreApplication.translate("ModelViewerUI", u"Model", None))
@@ -336,6 +373,24 @@ class Ui_ModelViewerUI(object):
         self.nmsLabel.setText(QCoreApplication.translate("ModelViewerUI", u"NMS", None))
 #if QT_CONFIG(tooltip)
         self.nmsSlider.setToolTip(QCoreApplication.translate("ModelViewerUI", u"The Non-Maximum Suppression threshold for the bounding boxes", None))
+#endif // QT_CONFIG(tooltip)
+#if QT_CONFIG(tooltip)
+        self.batchSizeLabel.setToolTip(QCoreApplication.translate("ModelViewerUI", u"The number of images detected together when processing all images of a folder", None))
+#endif // QT_CONFIG(tooltip)
+        self.batchSizeLabel.setText(QCoreApplication.translate("ModelViewerUI", u"Batch size", None))
+#if QT_CONFIG(tooltip)
+        self.batchSizeSpinBox.setToolTip(QCoreApplication.translate("ModelViewerUI", u"The number of images detected together when processing all images of a folder", None))
+#endif // QT_CONFIG(tooltip)
+#if QT_CONFIG(tooltip)
+        self.tiledDetectionCheckBox.setToolTip(QCoreApplication.translate("ModelViewerUI", u"Detect high-resolution images in overlapping tiles, which finds smaller objects but takes longer", None))
+#endif // QT_CONFIG(tooltip)
+        self.tiledDetectionCheckBox.setText(QCoreApplication.translate("ModelViewerUI", u"Tiled detection (small objects)", None))
+#if QT_CONFIG(tooltip)
+        self.firstPassLabel.setToolTip(QCoreApplication.translate("ModelViewerUI", u"Processing all images of a folder: detect with this faster model first, and with the selected model only the images it is uncertain about", None))
+#endif // QT_CONFIG(tooltip)
+        self.firstPassLabel.setText(QCoreApplication.translate("ModelViewerUI", u"First pass", None))
+#if QT_CONFIG(tooltip)
+        self.firstPassComboBox.setToolTip(QCoreApplication.translate("ModelViewerUI", u"Processing all images of a folder: detect with this faster model first, and with the selected model only the images it is uncertain about", None))
 #endif // QT_CONFIG(tooltip)
         self.detectionInfoGroupBox.setTitle(QCoreApplication.translate("ModelViewerUI", u"Detection", None))
         self.detectionInfoLabel.setText(QCoreApplication.translate("ModelViewerUI", u"Objects			: -\n"
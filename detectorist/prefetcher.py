@@ -0,0 +1,152 @@
+import threading
+from concurrent.futures import Future
+
+from . import image_cache
+from .image_object import ImageObject
+from .tiling import Tiling
+
+
+class ImagePrefetcher:
+    """
+    Decodes (and optionally detects) the neighbours of the shown image in the background, so stepping through a folder
+    doesn't wait for the decoding.
+
+    After each selection, update() schedules the next and previous radius images, the ones in the scroll direction
+    first. Work that is not started yet is re-prioritized or dropped on every update(), so jumping around never queues
+    up stale images. Images already being decoded are finished. The decoded images are kept in the decoded image cache
+    (see image_cache), take() waits for an image that is being decoded right now.
+    """
+
+    DEFAULT_RADIUS = 2
+    DEFAULT_WORKERS = 2
+
+    def __init__(self, radius: int = DEFAULT_RADIUS, workers: int = DEFAULT_WORKERS):
+        """
+        Args:
+            radius: The number of images prefetched on each side of the shown image.
+            workers: The number of decode threads.
+        """
+        self.radius = max(0, radius)
+        self._futures = {}  # (image path, decode size) -> Future of the ImageObject, while pending or being decoded
+        self._pending = []  # The keys of the futures not started yet, in the order they are started
+        self._detector = None
+        self._tiling = None
+        self._last_index = None
+        self._direction = 1
+        self._shutdown = False
+        self._condition = threading.Condition()
+        self._threads = [threading.Thread(target=self._worker, name=f"image-prefetch-{i}", daemon=True) for i in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def update(self, image_paths: list[str], index: int, decode_size: tuple[int, int] | None, detector=None, tiling: Tiling = None):
+        """
+        Prefetches the neighbours of the image at index.
+
+        Args:
+            image_paths: The paths of all images of the folder, in browsing order.
+            index: The index of the shown image.
+            decode_size: The decode size hint the images are shown with (see ImageObject).
+            detector: The Detector (or None) whose raw output is computed for the prefetched images as well, so their
+                detection only needs the post-processing once they are shown. Showing an image whose detection is
+                still running waits for it (see Detector.infer()).
+            tiling: The tiling the images are detected with (see Detector.infer()).
+        """
+        if self._last_index is not None and index != self._last_index:
+            self._direction = 1 if index > self._last_index else -1
+        self._last_index = index
+
+        # The scroll direction first, then the other side
+        offsets = [self._direction * step for step in range(1, self.radius + 1)]
+        offsets += [-offset for offset in offsets]
+        wanted = [(image_paths[index + offset], decode_size) for offset in offsets if 0 <= index + offset < len(image_paths)]
+        # Images that are decoded (and detected) already don't need any work
+        def needs_work(key):
+            image = image_cache.peek_image(*key)
+            return image is None or (detector is not None and not detector.has_cached_output(image, tiling))
+        wanted = [key for key in wanted if needs_work(key)]
+
+        with self._condition:
+            self._detector = detector
+            self._tiling = tiling
+            for key in list(self._futures):
+                if key not in wanted and self._futures[key].cancel():
+                    del self._futures[key]
+            self._pending = []
+            for key in wanted:
+                future = self._futures.get(key)
+                if future is None:
+                    future = self._futures[key] = Future()
+                if not future.running() and not future.done():
+                    self._pending.append(key)
+            self._condition.notify_all()
+
+    def take(self, image_path: str, decode_size: tuple[int, int] | None) -> ImageObject | None:
+        """
+        Returns the image if it is being prefetched, waiting for its decoding. Returns None if it isn't being prefetched
+        (or its decoding failed), the caller then loads it itself (from the decoded image cache if it is prefetched).
+        """
+        key = (image_path, decode_size)
+        with self._condition:
+            future = self._futures.get(key)
+            if future is None:
+                return None
+            if future.cancel():
+                # Not started yet, decoding it on the calling thread is as fast
+                del self._futures[key]
+                if key in self._pending:
+                    self._pending.remove(key)
+                return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def clear(self):
+        """Drops all prefetched images and pending work, e.g. when another folder is opened."""
+        with self._condition:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            self._pending = []
+            self._last_index = None
+
+    def shutdown(self):
+        """Stops the decode threads, without waiting for a running decode."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        self.clear()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._shutdown:
+                    self._condition.wait()
+                if self._shutdown:
+                    return
+                key = self._pending.pop(0)
+                future = self._futures.get(key)
+                detector = self._detector
+                tiling = self._tiling
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue
+
+            image_path, decode_size = key
+            try:
+                image = image_cache.load_image(image_path, decode_size)
+                # Converting 16-bit data for the display here keeps it off the GUI thread
+                image.display_data
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                # The image is handed out before its detection, showing it doesn't wait for the model
+                future.set_result(image)
+                if detector is not None and not detector.has_cached_output(image, tiling):
+                    try:
+                        detector.infer(image, tiling)
+                    except Exception as e:
+                        print(f"Warning: prefetch detection of '{image_path}' failed: {e}")
+            with self._condition:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
@@ -0,0 +1,156 @@
+import os
+import json
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+# cv2 and onnxruntime are imported on first use, so importing the module doesn't load them
+if TYPE_CHECKING:
+    import onnxruntime as ort
+
+# 'stretch' resizes the image to the model input size, 'letterbox' keeps the aspect ratio and pads the rest
+PREPROCESSING_MODES = ("stretch", "letterbox")
+
+# Gray value of the letterbox padding, as used when training YOLO models
+LETTERBOX_COLOR = 114
+
+
+def load_model_settings(model_path: str) -> dict:
+    """
+    Returns the settings of a model from the optional JSON file next to it (e.g. fish.json for fish.onnx),
+    or an empty dict if there is none. Example: {"preprocessing": "letterbox"}
+    """
+    try:
+        with open(os.path.splitext(model_path)[0] + ".json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def preprocess_into(image_data: np.ndarray, out: np.ndarray, resized: np.ndarray = None, letterbox: bool = False) -> tuple[float, float, int, int]:
+    """
+    Resizes an HWC image and writes it normalized to [0, 1] into a CHW float32 array.
+
+    16-bit images are resized before their precision is reduced, so no full-size 8-bit copy is made.
+
+    Args:
+        image_data: The image data (uint8 or uint16) of shape (height, width, channels).
+        out: The destination float32 array of shape (channels, input_height, input_width), e.g. one image of a batch buffer.
+        resized: Optional scratch array of shape (input_height, input_width, channels) and the image's dtype for the
+            stretched image. A temporary array is used if not given.
+        letterbox: Keep the aspect ratio, scaling the image to fit and centering it on a gray background.
+
+    Returns:
+        tuple: (x_scale, y_scale, pad_x, pad_y) mapping model input coordinates back to image coordinates:
+            x_image = (x_input - pad_x) * x_scale, y_image = (y_input - pad_y) * y_scale
+    """
+    import cv2
+
+    _, input_height, input_width = out.shape
+    image_height, image_width = image_data.shape[:2]
+    scale = 1.0 / 65535 if image_data.dtype == np.uint16 else 1.0 / 255
+
+    if not letterbox:
+        resized = cv2.resize(image_data, (input_width, input_height), dst=resized)
+        # Normalizing and transposing from HWC to CHW in a single pass
+        np.multiply(resized.transpose(2, 0, 1), np.float32(scale), out=out)
+        return image_width / input_width, image_height / input_height, 0, 0
+
+    ratio = min(input_width / image_width, input_height / image_height)
+    resized_width = min(input_width, max(1, round(image_width * ratio)))
+    resized_height = min(input_height, max(1, round(image_height * ratio)))
+    pad_x = (input_width - resized_width) // 2
+    pad_y = (input_height - resized_height) // 2
+
+    resized = cv2.resize(image_data, (resized_width, resized_height))
+    out.fill(LETTERBOX_COLOR / 255)
+    np.multiply(resized.transpose(2, 0, 1), np.float32(scale),
+                out=out[:, pad_y:pad_y + resized_height, pad_x:pad_x + resized_width])
+    return image_width / resized_width, image_height / resized_height, pad_x, pad_y
+
+
+class InputBuffers:
+    """
+    Preprocessing engine of a Detector, writing the images straight into reusable model input buffers.
+
+    Each thread gets its own contiguous NCHW float32 input buffer (and resize scratch arrays), so that steady-state
+    inference doesn't allocate any full-size arrays per image. With IOBinding, the input buffer and a preallocated
+    output buffer are bound to the onnxruntime session, so onnxruntime neither copies the input nor allocates the output.
+    The outputs returned by run() are only valid until the next run() of the same thread.
+    """
+
+    def __init__(self, session: "ort.InferenceSession", input_width: int, input_height: int, fixed_batch_size: int = None,
+                 io_binding: bool = True, letterbox: bool = False):
+        """
+        Args:
+            session: The onnxruntime session the buffers are used for.
+            input_width: The model's input width.
+            input_height: The model's input height.
+            fixed_batch_size: The batch size of a model with a fixed batch dimension, or None for a dynamic one.
+            io_binding: Bind the input and output buffers with onnxruntime IOBinding.
+            letterbox: Letterbox the images instead of stretching them to the input size (see preprocess_into()).
+        """
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.input_width = input_width
+        self.input_height = input_height
+        self.fixed_batch_size = fixed_batch_size
+        self.io_binding = io_binding
+        self.letterbox = letterbox
+
+        self.output_names = [output.name for output in session.get_outputs()]
+        output_shape = session.get_outputs()[0].shape
+        # The output can only be preallocated if all of its dimensions except the batch size are known
+        self._output_shape = tuple(output_shape[1:]) if all(isinstance(dim, int) for dim in output_shape[1:]) else None
+        self._local = threading.local()
+
+    def _buffers(self, batch_size: int):
+        """Returns this thread's buffers, (re-)allocating them if they're smaller than the batch size."""
+        local = self._local
+        if getattr(local, "capacity", 0) < batch_size:
+            local.capacity = batch_size
+            local.input = np.empty((batch_size, 3, self.input_height, self.input_width), dtype=np.float32)
+            local.output = np.empty((batch_size,) + self._output_shape, dtype=np.float32) if self._output_shape else None
+            local.resized = {}
+            local.binding = self.session.io_binding() if self.io_binding else None
+        return local
+
+    def run(self, images: list[np.ndarray]) -> tuple[np.ndarray, list[tuple]]:
+        """
+        Preprocesses images into the input buffer and runs the model on them.
+
+        Args:
+            images: The image data (HWC) of at most the fixed batch size for fixed-batch models.
+
+        Returns:
+            tuple: The first model output for the images, of shape (len(images), ...), which is a view on a reused
+                buffer, and the coordinate mapping of each image (see preprocess_into()).
+        """
+        # A fixed-batch model always needs a full batch. The unused slots keep stale data, their outputs are ignored.
+        batch_size = self.fixed_batch_size or len(images)
+        local = self._buffers(batch_size)
+        transforms = []
+        for i, image_data in enumerate(images):
+            key = (image_data.dtype.str, image_data.shape[2])
+            resized = local.resized.get(key)
+            if resized is None:
+                resized = local.resized[key] = np.empty((self.input_height, self.input_width, image_data.shape[2]), dtype=image_data.dtype)
+            transforms.append(preprocess_into(image_data, local.input[i], resized, self.letterbox))
+
+        # Leading slices of the C-contiguous buffers are contiguous as well
+        input_batch = local.input[:batch_size]
+        if local.binding is None:
+            return self.session.run(self.output_names[:1], {self.input_name: input_batch})[0][:len(images)], transforms
+
+        binding = local.binding
+        binding.bind_input(self.input_name, "cpu", 0, np.float32, input_batch.shape, input_batch.ctypes.data)
+        if local.output is not None:
+            output_batch = local.output[:batch_size]
+            binding.bind_output(self.output_names[0], "cpu", 0, np.float32, output_batch.shape, output_batch.ctypes.data)
+        else:
+            binding.bind_output(self.output_names[0], "cpu")
+        self.session.run_with_iobinding(binding)
+        if local.output is None:
+            output_batch = binding.copy_outputs_to_cpu()[0]
+        return output_batch[:len(images)], transforms
@@ -0,0 +1,323 @@
+import os
+import queue
+import signal
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+from .detector import Detector
+from .detection_store import DetectionStore
+from .image_object import ImageObject
+from .model_metadata import read_model_metadata
+from .tiling import Tiling
+
+# Marks the end of the image paths for the decode processes
+_END_OF_STAGE = None
+
+
+def _init_worker():
+    """
+    Prepares a worker process: keeps OpenCV from starting its own thread pool (the processes are the parallelism), and
+    ignores Ctrl-C, which the terminal sends to all processes. The main process stops the workers and frees their
+    shared memory instead (see ProcessBatchPipeline.run()).
+    """
+    import cv2
+    cv2.setNumThreads(1)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _untrack_shared_memory(shm: shared_memory.SharedMemory):
+    """
+    Stops this process's resource tracker from unlinking a shared memory block when the process exits, because
+    another process takes over the block. Only POSIX shared memory is tracked, under the name with a leading slash.
+    """
+    if os.name == "posix":
+        resource_tracker.unregister("/" + shm.name, "shared_memory")
+
+
+def _decode_worker(path_queue, decoded_queue, result_queue, stop_event, decode_size, proxy):
+    """
+    Decode process: loads images (at a reduced resolution if decode_size allows, as 8-bit proxies if proxy is set,
+    see ImageObject) and hands the pixel data to the inference processes via shared memory. Only a small descriptor
+    (path, shared memory name, shape, dtype, full-resolution shape, file info, decode source and proxy flag) is sent
+    through the queue.
+    """
+    _init_worker()
+    while not stop_event.is_set():
+        image_path = path_queue.get()
+        if image_path is _END_OF_STAGE:
+            return
+        shm = None
+        try:
+            image = ImageObject(image_path, decode_size, proxy)
+            image_data = image.image_data
+            shm = shared_memory.SharedMemory(create=True, size=max(image_data.nbytes, 1))
+            np.ndarray(image_data.shape, dtype=image_data.dtype, buffer=shm.buf)[...] = image_data
+            # The inference process (or the main process, see ProcessBatchPipeline._drain()) unlinks the block,
+            # so this process must not track (and later unlink) it
+            _untrack_shared_memory(shm)
+            shm.close()
+        except Exception as e:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            result_queue.put(("error", image_path, f"{type(e).__name__}: {e}"))
+            return
+
+        while True:
+            try:
+                decoded_queue.put((image_path, shm.name, image_data.shape, image_data.dtype.str, image.shape, image.file_info,
+                                  image.decode_info["source"], image.is_proxy), timeout=0.1)
+                break
+            except queue.Full:
+                if stop_event.is_set():
+                    _unlink_shared_memory(shm.name)
+                    return
+
+
+def _unlink_shared_memory(name: str):
+    """Frees a shared memory block that is no longer needed."""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _inference_worker(model_path, store_path, num_threads, preprocessing, tiling, vectorized_nms, job, confidence_threshold, nms_threshold,
+                      batch_size, decoded_queue, result_queue, stop_event):
+    """
+    Inference process: owns its own Detector (and onnxruntime session), detects batches of images handed over via
+    shared memory and runs the per-image job on them. Runs until the stop event is set.
+    """
+    _init_worker()
+    store = DetectionStore(store_path) if store_path else None
+    # Compiling the model is left to the GUI or detectorist-compile-models, every worker would compile it otherwise
+    detector = Detector(model_path, vectorized_nms=vectorized_nms, store=store, num_threads=num_threads, compile_in_background=False,
+                        preprocessing=preprocessing, tiling=tiling)
+
+    while not stop_event.is_set():
+        # Block for the first image of a batch, then take whatever else is already decoded
+        try:
+            item = decoded_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        items = [item]
+        while len(items) < batch_size:
+            try:
+                items.append(decoded_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        blocks = []
+        try:
+            for _, shm_name, *_ in items:
+                blocks.append(shared_memory.SharedMemory(name=shm_name))
+            _detect_and_process(detector, job, items, blocks, confidence_threshold, nms_threshold, batch_size, result_queue)
+        except Exception as e:
+            result_queue.put(("error", items[0][0], f"{type(e).__name__}: {e}"))
+            return
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+
+def _detect_and_process(detector, job, items, blocks, confidence_threshold, nms_threshold, batch_size, result_queue):
+    """
+    Detects and processes a batch of images backed by shared memory blocks.
+    The array views on the blocks only live in this function, so the blocks can be closed when it returns.
+    """
+    images = [ImageObject.from_array(image_path, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf), full_shape, file_info, decode_source, proxy)
+              for (image_path, _, shape, dtype, full_shape, file_info, decode_source, proxy), shm in zip(items, blocks)]
+    batch_results = detector.detect_batch(images, confidence_threshold=confidence_threshold,
+                                          nms_threshold=nms_threshold, batch_size=batch_size)
+    for image, results in zip(images, batch_results):
+        job(image, results)
+        result_queue.put(("done", image.image_path, None))
+
+
+class ProcessBatchPipeline:
+    """
+    Multi-process variant of BatchPipeline for machines with many cores.
+
+    Decode processes load the images and pass the decoded pixel buffers to the inference processes through
+    multiprocessing.shared_memory instead of pickling them. Every inference process owns its own Detector
+    (and onnxruntime session), detects the images in batches and runs the per-image job.
+    The onnxruntime threads per inference process are limited, so that all processes together don't
+    oversubscribe the CPU cores.
+
+    The job and the detector settings must be picklable, as they are sent to the worker processes.
+    run() must be called from the main module guarded by `if __name__ == '__main__':` on platforms that spawn processes.
+    """
+
+    def __init__(self, model_path: str, image_paths: list[str], process_callback: callable,
+                 confidence_threshold: float = 0.5, nms_threshold: float = 0.45, batch_size: int = Detector.DEFAULT_BATCH_SIZE,
+                 decode_processes: int = None, inference_processes: int = 2, threads_per_process: int = None,
+                 store_path: str = None, preprocessing: str = None, tiling: Tiling = None, vectorized_nms: bool = False,
+                 low_memory: bool = False, on_progress: callable = None):
+        """
+        Args:
+            model_path: Path to the ONNX model file, loaded by each inference process.
+            image_paths: The paths of the images to process.
+            process_callback: Called as process_callback(image, results) for every image, in an inference process.
+            confidence_threshold: The confidence threshold for filtering detections.
+            nms_threshold: The Non-Maximum Suppression threshold.
+            batch_size: The maximum number of images passed to the detector at once.
+            decode_processes: The number of decode processes (defaults to the CPU cores not used for inference).
+            inference_processes: The number of inference processes.
+            threads_per_process: The onnxruntime threads per inference process (defaults to an equal share of the cores).
+            store_path: Path of a DetectionStore file shared by the inference processes, or None to not use a store.
+            preprocessing: The Detector's preprocessing mode ('stretch' or 'letterbox'), None for the model's setting.
+            tiling: The Detector's tiled detection settings, None to detect the images as a whole.
+            vectorized_nms: Use the Detector's NumPy (class-aware) NMS instead of OpenCV's.
+            low_memory: Decode only 8-bit proxies of 16-bit images (see ImageObject), the crops are then written
+                from the image files.
+            on_progress: Optional callback on_progress(done, total, image_path), called after each processed image.
+        """
+        cpu_count = os.cpu_count() or 2
+        self.model_path = model_path
+        self.image_paths = list(image_paths)
+        self.process_callback = process_callback
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        self.batch_size = max(1, batch_size)
+        self.inference_processes = max(1, inference_processes)
+        self.threads_per_process = threads_per_process or max(1, cpu_count // (2 * self.inference_processes))
+        self.decode_processes = decode_processes or max(1, cpu_count - self.inference_processes * self.threads_per_process)
+        self.store_path = store_path
+        self.preprocessing = preprocessing
+        self.tiling = tiling
+        self.vectorized_nms = vectorized_nms
+        self.low_memory = low_memory
+        self.on_progress = on_progress
+
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._cancelled = False
+        self._done = 0
+
+    @property
+    def cancelled(self) -> bool:
+        """Returns True if the pipeline was cancelled."""
+        return self._cancelled
+
+    @property
+    def processed_count(self) -> int:
+        """Returns the number of images processed so far."""
+        return self._done
+
+    def cancel(self):
+        """Requests the pipeline to stop. Images already being processed are finished, no new ones are started."""
+        self._cancelled = True
+        self._stop_event.set()
+
+    def _decode_size(self) -> tuple[int, int] | None:
+        """
+        Returns the decode size hint for the decode processes (see Detector.decode_size()), read from the model file
+        without loading the model. None (full resolution) for tiled detection, models without a fixed input size and jobs
+        that need the full resolution image (see CropJob.full_resolution).
+        """
+        if self.tiling or getattr(self.process_callback, "full_resolution", False):
+            return None
+        try:
+            input_size = read_model_metadata(self.model_path).input_size
+        except IOError:
+            return None
+        if input_size is None or not all(isinstance(size, int) for size in input_size):
+            return None
+        return input_size
+
+    def run(self) -> bool:
+        """
+        Processes all images and blocks until done.
+
+        Returns:
+            bool: True if all images were processed, False if the pipeline was cancelled.
+
+        Raises:
+            RuntimeError: If a worker process failed (the remaining work is cancelled).
+        """
+        path_queue = self._context.Queue()
+        # A bounded queue limits the number of decoded images held in shared memory
+        decoded_queue = self._context.Queue(maxsize=self.batch_size * self.inference_processes * 2)
+        result_queue = self._context.Queue()
+
+        for path in self.image_paths:
+            path_queue.put(path)
+        for _ in range(self.decode_processes):
+            path_queue.put(_END_OF_STAGE)
+
+        decode_size = self._decode_size()
+        decoders = [self._context.Process(target=_decode_worker, args=(path_queue, decoded_queue, result_queue, self._stop_event, decode_size,
+                                                                       self.low_memory), daemon=True)
+                    for _ in range(self.decode_processes)]
+        inference_workers = [self._context.Process(
+            target=_inference_worker,
+            args=(self.model_path, self.store_path, self.threads_per_process, self.preprocessing, self.tiling, self.vectorized_nms, self.process_callback, self.confidence_threshold,
+                  self.nms_threshold, self.batch_size, decoded_queue, result_queue, self._stop_event), daemon=True)
+            for _ in range(self.inference_processes)]
+        workers = decoders + inference_workers
+        error = None
+        # Every exit (including a KeyboardInterrupt) stops the workers and frees the shared memory of unprocessed images
+        try:
+            for process in workers:
+                process.start()
+
+            while self._done < len(self.image_paths) and not self.cancelled:
+                try:
+                    status, image_path, message = result_queue.get(timeout=0.1)
+                except queue.Empty:
+                    # The inference processes only exit after the stop event, otherwise their images would be lost
+                    if not all(process.is_alive() for process in inference_workers):
+                        error = error or "An inference process exited unexpectedly"
+                        self.cancel()
+                    # A decode process exits normally after its last path, a crash (e.g. in libraw) loses its image
+                    crashed = [process for process in decoders if process.exitcode not in (0, None)]
+                    if crashed:
+                        error = error or f"A decode process exited unexpectedly (exit code {crashed[0].exitcode})"
+                        self.cancel()
+                    continue
+
+                if status == "error":
+                    error = f"{os.path.basename(image_path)}: {message}"
+                    self.cancel()
+                else:
+                    self._done += 1
+                    if self.on_progress:
+                        self.on_progress(self._done, len(self.image_paths), image_path)
+        finally:
+            self._stop_workers(workers, decoded_queue, result_queue)
+
+        if error:
+            raise RuntimeError(error)
+        return not self.cancelled
+
+    def _stop_workers(self, workers: list, decoded_queue, result_queue):
+        """
+        Stops the worker processes and waits for them. The queues are drained meanwhile, because a process can't exit
+        while data it put into a queue is still waiting in the pipe, and the shared memory of the decoded images that
+        won't be processed anymore is unlinked.
+        """
+        self._stop_event.set()
+        workers = [process for process in workers if process.pid is not None]
+        while workers:
+            self._drain(decoded_queue, result_queue)
+            for process in workers:
+                process.join(timeout=0.05)
+            workers = [process for process in workers if process.is_alive()]
+        self._drain(decoded_queue, result_queue)
+
+    @staticmethod
+    def _drain(decoded_queue, result_queue):
+        """Empties the queues, freeing the shared memory of decoded images that won't be processed anymore."""
+        for source_queue in (decoded_queue, result_queue):
+            while True:
+                try:
+                    item = source_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if source_queue is decoded_queue:
+                    _unlink_shared_memory(item[1])
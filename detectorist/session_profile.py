@@ -0,0 +1,242 @@
+"""
+onnxruntime session tuning profiles.
+
+A SessionProfile bundles the onnxruntime SessionOptions that matter for the inference speed. The autotuner
+benchmarks candidate profiles on a model with a synthetic input and persists the fastest one per model and
+machine, which the Detector then picks up automatically:
+
+    detectorist-autotune models/fish-detect.onnx
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+# onnxruntime is imported on first use, so importing the profiles doesn't load it
+if TYPE_CHECKING:
+    import onnxruntime as ort
+
+from .utils import get_cache_path, get_model_path, hash_file
+
+
+class SessionProfile:
+    """
+    Tuning profile for an onnxruntime InferenceSession.
+
+    Attributes:
+        intra_op_threads (int): Threads used to parallelize a single operator (0 = onnxruntime default, all cores).
+        inter_op_threads (int): Threads used to run independent operators in parallel mode (0 = onnxruntime default).
+        execution_mode (str): 'sequential' or 'parallel' execution of the graph's operators.
+        graph_optimization (str): Graph optimization level, one of 'disable', 'basic', 'extended' or 'all'.
+        optimized_model_path (str): If set, onnxruntime saves the optimized graph to this path when loading the model.
+    """
+
+    # Names of the onnxruntime ExecutionMode and GraphOptimizationLevel values
+    EXECUTION_MODES = {
+        "sequential": "ORT_SEQUENTIAL",
+        "parallel": "ORT_PARALLEL",
+    }
+
+    GRAPH_OPTIMIZATION_LEVELS = {
+        "disable": "ORT_DISABLE_ALL",
+        "basic": "ORT_ENABLE_BASIC",
+        "extended": "ORT_ENABLE_EXTENDED",
+        "all": "ORT_ENABLE_ALL",
+    }
+
+    def __init__(self, intra_op_threads: int = 0, inter_op_threads: int = 0, execution_mode: str = "sequential",
+                 graph_optimization: str = "all", optimized_model_path: str = None):
+        if execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{execution_mode}', expected one of {list(self.EXECUTION_MODES)}")
+        if graph_optimization not in self.GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown graph optimization level '{graph_optimization}', expected one of {list(self.GRAPH_OPTIMIZATION_LEVELS)}")
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.execution_mode = execution_mode
+        self.graph_optimization = graph_optimization
+        self.optimized_model_path = optimized_model_path
+
+    def to_session_options(self) -> "ort.SessionOptions":
+        """Returns the onnxruntime SessionOptions for this profile."""
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = self.intra_op_threads
+        session_options.inter_op_num_threads = self.inter_op_threads
+        session_options.execution_mode = getattr(ort.ExecutionMode, self.EXECUTION_MODES[self.execution_mode])
+        session_options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, self.GRAPH_OPTIMIZATION_LEVELS[self.graph_optimization])
+        if self.optimized_model_path:
+            session_options.optimized_model_filepath = self.optimized_model_path
+        return session_options
+
+    def to_dict(self) -> dict:
+        return {
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "execution_mode": self.execution_mode,
+            "graph_optimization": self.graph_optimization,
+            "optimized_model_path": self.optimized_model_path,
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        return cls(**values)
+
+    def __repr__(self):
+        return (f"SessionProfile(intra_op_threads={self.intra_op_threads}, inter_op_threads={self.inter_op_threads}, "
+                f"execution_mode='{self.execution_mode}', graph_optimization='{self.graph_optimization}')")
+
+
+PROFILES_FILE_NAME = "session_profiles.json"
+
+
+def _profile_key(model_path: str) -> str:
+    """
+    Returns the key a tuned profile is stored under: the model file (identified by its size and content hash, like the
+    fingerprint of a compiled model, because the bundle extraction resets mtimes) plus the machine (host, CPU and core
+    count) and the onnxruntime version.
+    """
+    import onnxruntime as ort
+
+    model_id = f"{os.path.getsize(model_path)}:{hash_file(model_path)}"
+    machine_id = f"{platform.node()}:{platform.machine()}:{os.cpu_count()}:ort-{ort.__version__}"
+    return f"{model_id}|{machine_id}"
+
+
+def _read_profiles(profiles_path: str) -> dict:
+    try:
+        with open(profiles_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def load_profile(model_path: str, profiles_path: str = None) -> SessionProfile | None:
+    """
+    Returns the persisted tuned profile of a model on this machine, or None if the model hasn't been tuned yet.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+        profiles_path (str, optional): Path of the profiles file. Defaults to a file in the user cache directory.
+    """
+    profiles = _read_profiles(profiles_path or get_cache_path(PROFILES_FILE_NAME))
+    # Without any tuned profiles the model doesn't need to be hashed
+    values = profiles.get(_profile_key(model_path)) if profiles else None
+    return SessionProfile.from_dict(values) if values else None
+
+
+def save_profile(model_path: str, profile: SessionProfile, profiles_path: str = None):
+    """
+    Persists the tuned profile of a model on this machine.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+        profile (SessionProfile): The profile to save.
+        profiles_path (str, optional): Path of the profiles file. Defaults to a file in the user cache directory.
+    """
+    profiles_path = profiles_path or get_cache_path(PROFILES_FILE_NAME)
+    profiles = _read_profiles(profiles_path)
+    profiles[_profile_key(model_path)] = profile.to_dict()
+    with open(profiles_path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+
+
+def candidate_profiles() -> list[SessionProfile]:
+    """Returns the profiles the autotuner tries: thread counts, execution modes and optimization levels."""
+    cpu_count = os.cpu_count() or 1
+    thread_counts = sorted({1, max(1, cpu_count // 4), max(1, cpu_count // 2), cpu_count})
+    candidates = []
+    for graph_optimization in ("basic", "extended", "all"):
+        for intra_op_threads in thread_counts:
+            candidates.append(SessionProfile(intra_op_threads, 0, "sequential", graph_optimization))
+            candidates.append(SessionProfile(intra_op_threads, 2, "parallel", graph_optimization))
+    return candidates
+
+
+def benchmark_profile(model_path: str, profile: SessionProfile, runs: int = 10, warmup_runs: int = 2) -> float:
+    """
+    Measures the median inference time of a model with a profile on a synthetic input.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+        profile (SessionProfile): The profile to benchmark.
+        runs (int): Number of timed inference runs.
+        warmup_runs (int): Number of untimed runs first (onnxruntime initializes lazily).
+
+    Returns:
+        float: The median inference time in milliseconds.
+    """
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(model_path, sess_options=profile.to_session_options())
+    model_input = session.get_inputs()[0]
+    # Dynamic dimensions (strings or None) are benchmarked with a batch of one
+    shape = [dim if isinstance(dim, int) else 1 for dim in model_input.shape]
+    input_tensor = np.random.default_rng(0).random(shape, dtype=np.float32)
+
+    for _ in range(warmup_runs):
+        session.run(None, {model_input.name: input_tensor})
+    timings = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        session.run(None, {model_input.name: input_tensor})
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return float(np.median(timings))
+
+
+def autotune(model_path: str, candidates: list[SessionProfile] = None, runs: int = 10, on_result: callable = None) -> list[tuple[SessionProfile, float]]:
+    """
+    Benchmarks candidate profiles on a model.
+
+    Args:
+        model_path (str): Path to the ONNX model file.
+        candidates (list, optional): The profiles to try. Defaults to candidate_profiles().
+        runs (int): Number of timed inference runs per profile.
+        on_result (callable, optional): Called as on_result(profile, milliseconds) after each benchmark.
+
+    Returns:
+        list: (profile, milliseconds) tuples, fastest first.
+    """
+    results = []
+    for profile in candidates or candidate_profiles():
+        milliseconds = benchmark_profile(model_path, profile, runs=runs)
+        results.append((profile, milliseconds))
+        if on_result:
+            on_result(profile, milliseconds)
+    return sorted(results, key=lambda result: result[1])
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="detectorist-autotune",
+                                     description="Benchmark onnxruntime session settings for a model and save the fastest profile for this machine.")
+    parser.add_argument("model", help="Path of the ONNX model, or its file name in the models directory")
+    parser.add_argument("-r", "--runs", type=int, default=10, help="Timed inference runs per candidate (default: 10)")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the results, don't save the fastest profile")
+    args = parser.parse_args(argv)
+
+    model_path = args.model if os.path.isfile(args.model) else os.path.join(get_model_path(), args.model)
+    if not os.path.isfile(model_path):
+        print(f"Model not found: {model_path}")
+        return 1
+
+    baseline = benchmark_profile(model_path, SessionProfile(), runs=args.runs)
+    print(f"Default settings: {baseline:.2f} ms")
+
+    results = autotune(model_path, runs=args.runs, on_result=lambda profile, ms: print(f"{ms:8.2f} ms  {profile}"))
+    best_profile, best_ms = results[0]
+    print(f"Fastest: {best_ms:.2f} ms ({baseline / best_ms:.2f}x the default) with {best_profile}")
+
+    if not args.dry_run:
+        save_profile(model_path, best_profile)
+        print(f"Saved profile to {get_cache_path(PROFILES_FILE_NAME)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,7 @@
+import threading
+from collections import OrderedDict
+
+
 class CaseInsensitiveKey(object):
     """
     A wrapper class for creating case-insensitive keys for dictionary-like operations.
@@ -111,3 +115,176 @@ class CaseInsensitiveDict(dict):
         """
         key = CaseInsensitiveKey(key)
         return super(CaseInsensitiveDict, self).get(key, default)
+
+
+class LRUCache(object):
+    """
+    A small thread-safe least-recently-used cache.
+
+    Entries are evicted in least-recently-used order once more than max_entries are stored, or once the summed size
+    of the entries (as returned by size_of, e.g. the bytes of an array) is above max_bytes. An entry larger than
+    max_bytes on its own is not stored. Reading an entry with get() marks it as recently used.
+
+    Attributes:
+        max_entries (int): The maximum number of entries kept in the cache, or None for no limit.
+        max_bytes (int): The maximum summed size of the entries, or None for no limit.
+        hits (int): The number of get() calls that found their entry.
+        misses (int): The number of get() calls that didn't find their entry.
+        evictions (int): The number of entries evicted to make room for newer ones.
+    """
+    def __init__(self, max_entries: int = None, max_bytes: int = None, size_of: callable = None):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int, optional): The maximum number of entries kept in the cache.
+            max_bytes (int, optional): The maximum summed size of the entries.
+            size_of (callable, optional): Returns the size of a value in bytes, needed for max_bytes.
+        """
+        if max_bytes is not None and size_of is None:
+            raise ValueError("A cache with a max_bytes limit needs a size_of function")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Retrieve an entry and mark it as recently used.
+
+        Args:
+            key: The key to retrieve.
+            default: The value to return if the key is not cached (defaults to None).
+
+        Returns:
+            The cached value, or the default value if not found.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def peek(self, key, default=None):
+        """
+        Retrieve an entry without marking it as recently used or counting a hit or miss.
+
+        Args:
+            key: The key to retrieve.
+            default: The value to return if the key is not cached (defaults to None).
+
+        Returns:
+            The cached value, or the default value if not found.
+        """
+        with self._lock:
+            return self._entries.get(key, default)
+
+    def put(self, key, value):
+        """
+        Store an entry, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key: The key to store.
+            value: The value to associate with the key.
+        """
+        size = self.size_of(value) if self.size_of else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._nbytes += size
+            self._evict()
+
+    def pop(self, key, default=None):
+        """
+        Remove an entry.
+
+        Args:
+            key: The key to remove.
+            default: The value to return if the key is not cached (defaults to None).
+
+        Returns:
+            The removed value, or the default value if not found.
+        """
+        with self._lock:
+            value = self._entries.get(key, default)
+            self._remove(key)
+            return value
+
+    def _remove(self, key):
+        """Removes an entry if it exists (the lock must be held)."""
+        if key in self._entries:
+            del self._entries[key]
+            self._nbytes -= self._sizes.pop(key)
+
+    def _evict(self):
+        """Evicts the least recently used entries until the cache fits its limits (the lock must be held)."""
+        while self._entries and ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                                 (self.max_bytes is not None and self._nbytes > self.max_bytes)):
+            key, _ = self._entries.popitem(last=False)
+            self._nbytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def resize(self, max_entries: int = None, max_bytes: int = None):
+        """
+        Change the limits of the cache, evicting entries if it doesn't fit the new limits.
+
+        Args:
+            max_entries (int, optional): The new maximum number of entries, or None for no limit.
+            max_bytes (int, optional): The new maximum summed size of the entries, or None for no limit.
+        """
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the summed size of the cached entries.
+
+        Returns:
+            int: The size in bytes (0 without a size_of function).
+        """
+        with self._lock:
+            return self._nbytes
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+
+    def __contains__(self, key):
+        """
+        Check if a key is cached without marking it as recently used.
+
+        Args:
+            key: The key to check.
+
+        Returns:
+            bool: True if the key is cached, False otherwise.
+        """
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        """
+        Return the number of cached entries.
+
+        Returns:
+            int: The number of entries in the cache.
+        """
+        with self._lock:
+            return len(self._entries)
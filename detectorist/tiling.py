@@ -0,0 +1,85 @@
+import math
+
+
+class Tiling:
+    """
+    Settings of the tiled (sliced) detection mode for high-resolution images with small objects.
+
+    Instead of squashing the whole image into a single model input, the image is cut into overlapping tiles which are
+    detected as one batch, together with the whole image for objects larger than a tile. The tiles have the aspect
+    ratio of the model input. If an image would need more than max_tiles tiles, the tiles are enlarged evenly.
+
+    Attributes:
+        tile_size (int): The width of a tile in image pixels, None for the model's input width (full resolution).
+        overlap (float): The minimal overlap of neighbouring tiles, as a fraction of the tile size.
+        max_tiles (int): The maximum number of tiles per image.
+        include_full_image (bool): Detect the whole image as well, for objects that don't fit into a tile.
+    """
+
+    def __init__(self, tile_size: int = None, overlap: float = 0.2, max_tiles: int = 16, include_full_image: bool = True):
+        if not 0 <= overlap < 1:
+            raise ValueError(f"Invalid tile overlap {overlap}, expected a value in [0, 1)")
+        if max_tiles < 1:
+            raise ValueError(f"Invalid maximum tile count {max_tiles}, expected at least 1")
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_tiles = max_tiles
+        self.include_full_image = include_full_image
+
+    def to_dict(self) -> dict:
+        return {
+            "tile_size": self.tile_size,
+            "overlap": self.overlap,
+            "max_tiles": self.max_tiles,
+            "include_full_image": self.include_full_image,
+        }
+
+    def __repr__(self):
+        return (f"Tiling(tile_size={self.tile_size}, overlap={self.overlap}, max_tiles={self.max_tiles}, "
+                f"include_full_image={self.include_full_image})")
+
+    @staticmethod
+    def _tile_count(length: int, tile_length: float, overlap: float) -> int:
+        """Returns the number of tiles needed to cover a length with tiles overlapping by at least overlap."""
+        if tile_length >= length:
+            return 1
+        stride = tile_length * (1 - overlap)
+        return math.ceil((length - tile_length) / stride) + 1
+
+    @staticmethod
+    def _tile_starts(length: int, tile_length: int, count: int) -> list[int]:
+        """Spreads the tiles evenly over a length, the first and last tile touch the ends."""
+        if count == 1:
+            return [0]
+        return [round(i * (length - tile_length) / (count - 1)) for i in range(count)]
+
+    def tile_rects(self, image_width: int, image_height: int, input_width: int, input_height: int) -> list[tuple[int, int, int, int]]:
+        """
+        Returns the tiles of an image.
+
+        Args:
+            image_width: The width of the image.
+            image_height: The height of the image.
+            input_width: The model's input width.
+            input_height: The model's input height.
+
+        Returns:
+            list: The (x, y, width, height) rectangles of the tiles, row by row. An image that is not larger than a
+                tile is a single tile.
+        """
+        tile_width = self.tile_size or input_width
+        tile_height = tile_width * input_height / input_width
+
+        columns = self._tile_count(image_width, tile_width, self.overlap)
+        rows = self._tile_count(image_height, tile_height, self.overlap)
+        while columns * rows > self.max_tiles:
+            tile_width *= 1.1
+            tile_height *= 1.1
+            columns = self._tile_count(image_width, tile_width, self.overlap)
+            rows = self._tile_count(image_height, tile_height, self.overlap)
+
+        tile_width = min(image_width, round(tile_width))
+        tile_height = min(image_height, round(tile_height))
+        return [(x, y, tile_width, tile_height)
+                for y in self._tile_starts(image_height, tile_height, rows)
+                for x in self._tile_starts(image_width, tile_width, columns)]
@@ -1,5 +1,6 @@
 import os
 import sys
+import hashlib
 
 
 # Determine the path based on compilation mode
@@ -31,3 +32,30 @@ def get_base_path():
         base_path = os.path.abspath(".")
 
     return base_path
+
+
+def get_cache_path(file_name: str = None) -> str:
+    """
+    Get the path to the per-user cache directory of the application (created if it doesn't exist).
+
+    Args:
+        file_name (str, optional): A file name inside the cache directory. Defaults to None.
+
+    Returns:
+        str: The absolute path to the cache directory, or to the file inside it if file_name is given.
+    """
+    if sys.platform == 'win32': # Windows
+        base_dir = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'Detectorist', 'Cache')
+    elif sys.platform == 'darwin': # macOS
+        base_dir = os.path.join(os.path.expanduser('~'), 'Library', 'Caches', 'Detectorist')
+    else: # Linux
+        base_dir = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')), 'detectorist')
+
+    os.makedirs(base_dir, exist_ok=True)
+    return os.path.join(base_dir, file_name) if file_name else base_dir
+
+
+def hash_file(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
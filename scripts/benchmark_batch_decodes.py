@@ -0,0 +1,128 @@
+"""
+Counts how often a crop batch decodes each image file, and how long the batch takes.
+
+The batch runs twice over the same images with a fresh output directory:
+- "decode once": the CropJob, which gets the image decoded at full resolution and writes the crop from it.
+- "decode per step": the previous behaviour, detecting on a reduced image and decoding the file again for the crop.
+
+A decode is a call of one of the image loaders (Pillow, pillow_heif or rawpy, see image_utils) that reads the pixels
+of a file. Reading only the EXIF data is not counted.
+
+    python scripts/benchmark_batch_decodes.py ~/dives/2025-06 -m models/fish.onnx
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+import io
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detectorist import image_utils
+from detectorist.batch import BatchPipeline, CropJob, list_image_files
+from detectorist.detector import Detector
+from detectorist.image_object import ImageObject
+
+_decodes = Counter()
+_lock = threading.Lock()
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def _decoding(path: str):
+    """Counts a decode of the file, unless it happens inside another counted decode (e.g. ImageObject using a loader)."""
+    depth = getattr(_local, "depth", 0)
+    if depth == 0:
+        with _lock:
+            _decodes[os.path.abspath(path)] += 1
+    _local.depth = depth + 1
+    try:
+        yield
+    finally:
+        _local.depth = depth
+
+
+def _counted(loader):
+    def counted_loader(path, *args, **kwargs):
+        with _decoding(path):
+            return loader(path, *args, **kwargs)
+    return counted_loader
+
+
+def install_counters():
+    """Counts the decodes of ImageObject and of the image loaders of image_utils used by the crop writers."""
+    for name in ("load_arw_image", "load_raw_preview", "load_heif_image", "open_pil_image"):
+        setattr(image_utils, name, _counted(getattr(image_utils, name)))
+    image_init = ImageObject.__init__
+
+    def counted_init(image, image_path, *args, **kwargs):
+        with _decoding(image_path):
+            image_init(image, image_path, *args, **kwargs)
+    ImageObject.__init__ = counted_init
+
+
+class DecodePerStepCropJob(CropJob):
+    """The crop job before decode-once: detection may use a reduced image and the crop decodes the file again."""
+
+    full_resolution = False
+
+    def __call__(self, image: ImageObject, results: list):
+        image_path = image.image_path
+        original_crop_image_file = image_utils.crop_image_file
+        image_utils.crop_image_file = lambda _, output_dir, rect: original_crop_image_file(image_path, output_dir, rect)
+        try:
+            super().__call__(image, results)
+        finally:
+            image_utils.crop_image_file = original_crop_image_file
+
+
+def run_batch(model_path, paths, job_class, confidence_threshold):
+    """Runs a crop batch into a temporary directory and returns the decodes per file and the duration in seconds."""
+    _decodes.clear()
+    # A new detector (without a detection store) for each run, so no run reuses the detections of another
+    detector = Detector(model_path)
+    with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+        job = job_class(output_dir, "top_confidence", 0.1, (1, 1))
+        pipeline = BatchPipeline(detector, paths, job, confidence_threshold=confidence_threshold, write_workers=1)
+        start_time = time.perf_counter()
+        pipeline.run()
+        seconds = time.perf_counter() - start_time
+    return dict(_decodes), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Counts the image decodes per file of a crop batch.")
+    parser.add_argument("paths", nargs="+", help="A folder of images, or image files.")
+    parser.add_argument("-m", "--model", required=True, help="The ONNX model used for detection.")
+    parser.add_argument("--confidence", type=float, default=0.25, help="The confidence threshold (default: 0.25).")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, file_name) for file_name in list_image_files(path))
+        else:
+            paths.append(path)
+    if not paths:
+        sys.exit("No images found.")
+    paths = [os.path.abspath(path) for path in paths]
+
+    install_counters()
+    modes = {"decode once": CropJob, "decode per step": DecodePerStepCropJob}
+    results = {mode: run_batch(args.model, paths, job_class, args.confidence) for mode, job_class in modes.items()}
+
+    print(f"{'image':30} " + " ".join(f"{mode:>16}" for mode in modes))
+    for path in paths:
+        print(f"{os.path.basename(path)[:30]:30} " + " ".join(f"{decodes.get(path, 0):16}" for decodes, _ in results.values()))
+    for mode, (decodes, seconds) in results.items():
+        total = sum(decodes.values())
+        print(f"{mode:16} {total} decodes ({total / len(paths):.2f} per file), {seconds * 1000:.0f} ms "
+              f"({seconds * 1000 / len(paths):.1f} ms/image)")
+
+
+if __name__ == "__main__":
+    main()
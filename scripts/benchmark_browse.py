@@ -0,0 +1,144 @@
+"""
+Simulates stepping through a folder in the viewer, with and without the ImagePrefetcher, and reports how long each
+step waits for the image to be decoded.
+
+Each step shows the next image (taken from the prefetcher or the decoded image cache if possible), then waits
+--dwell ms like a user looking at it. With --passes 2 the folder is browsed forward and back again, which shows the
+effect of the decoded image cache's budget (--cache-mb). Each mode runs in a fresh process, so its peak memory
+(max RSS, measured on Linux and macOS) is not inflated by the other mode.
+
+With --low-memory the folder is also browsed (with prefetching) in the low-memory proxy mode (see
+image_cache.set_proxy_mode()), for comparing the peak memory of both modes. --full-resolution decodes the images in
+full size like the tiled detection does, where the 16-bit data of RAW and HEIF files makes the most difference.
+
+    python scripts/benchmark_browse.py ~/dives/2025-06 --dwell 300
+    python scripts/benchmark_browse.py ~/dives/2025-06 -m models/fish.onnx --passes 2 --cache-mb 256
+    python scripts/benchmark_browse.py ~/dives/raw --full-resolution --low-memory
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detectorist.batch import list_image_files
+from detectorist.image_cache import DEFAULT_BUDGET_MB as DEFAULT_CACHE_MB
+
+
+def max_rss_mb():
+    """Returns the peak resident memory of this process in MB, or None where it can't be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_worker(paths, prefetch, proxy, decode_size, dwell_seconds, model_path, passes, cache_mb):
+    """Browses the images in this process and prints the wait per step as JSON."""
+    import contextlib
+    import io
+
+    from detectorist import image_cache
+    from detectorist.detector import Detector
+    from detectorist.prefetcher import ImagePrefetcher
+
+    image_cache.set_budget_mb(cache_mb)
+    image_cache.set_proxy_mode(proxy)
+    # Forward, then backward, ...
+    steps = []
+    for browse_pass in range(passes):
+        indices = list(range(len(paths)))
+        steps += indices if browse_pass % 2 == 0 else indices[-2::-1]
+
+    baseline_mb = max_rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        detector = Detector(model_path) if model_path else None
+        prefetcher = ImagePrefetcher() if prefetch else None
+        waits = []
+        for index in steps:
+            start_time = time.perf_counter()
+            image = prefetcher.take(paths[index], decode_size) if prefetcher else None
+            if image is None:
+                image = image_cache.load_image(paths[index], decode_size)
+            if detector:
+                detector.detect(image)
+            waits.append(time.perf_counter() - start_time)
+            if prefetcher:
+                prefetcher.update(paths, index, decode_size, detector)
+            time.sleep(dwell_seconds)
+        if prefetcher:
+            prefetcher.shutdown()
+    peak_mb = max_rss_mb()
+    print(json.dumps({"waits": waits, "peak_mb": None if peak_mb is None else peak_mb - baseline_mb, "cache": image_cache.summary()}))
+
+
+def measure(paths, prefetch, proxy, args):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--dwell", str(args.dwell),
+               "--size", str(args.size[0]), str(args.size[1]), "--passes", str(args.passes), "--cache-mb", str(args.cache_mb)]
+    if prefetch:
+        command.append("--prefetch")
+    if proxy:
+        command.append("--proxy")
+    if args.full_resolution:
+        command.append("--full-resolution")
+    if args.model:
+        command += ["--model", args.model]
+    result = subprocess.run(command + paths, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares browsing a folder with and without prefetching.")
+    parser.add_argument("paths", nargs="+", help="A folder of images, or image files.")
+    parser.add_argument("--dwell", type=float, default=300, help="Time spent looking at each image in ms (default: 300).")
+    parser.add_argument("--size", type=int, nargs=2, default=(1920, 1080), metavar=("WIDTH", "HEIGHT"),
+                        help="The decode size hint of the viewer (default: 1920 1080).")
+    parser.add_argument("-m", "--model", default=None, help="Detect every shown image with this ONNX model.")
+    parser.add_argument("--passes", type=int, default=1, help="Number of passes over the folder, alternating the direction (default: 1).")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                        help=f"Memory budget of the decoded image cache in MB (default: {DEFAULT_CACHE_MB}).")
+    parser.add_argument("--full-resolution", action="store_true", help="Decode the images in full size, ignoring --size.")
+    parser.add_argument("--low-memory", action="store_true", help="Also browse the folder in the low-memory proxy mode.")
+    parser.add_argument("--prefetch", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--proxy", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        decode_size = None if args.full_resolution else tuple(args.size)
+        run_worker(args.paths, args.prefetch, args.proxy, decode_size, args.dwell / 1000, args.model, max(1, args.passes), args.cache_mb)
+        return
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, file_name) for file_name in list_image_files(path))
+        else:
+            paths.append(path)
+    if not paths:
+        sys.exit("No images found.")
+
+    print(f"{len(paths)} images, {args.dwell:.0f} ms per image" + (f", detected with {os.path.basename(args.model)}" if args.model else ""))
+    modes = [("no prefetch", False, False), ("prefetch", True, False)]
+    if args.low_memory:
+        modes.append(("low memory", True, True))
+    for mode, prefetch, proxy in modes:
+        measurement = measure(paths, prefetch, proxy, args)
+        # The first image is never prefetched
+        waits = sorted(wait * 1000 for wait in measurement["waits"][1:]) or [measurement["waits"][0] * 1000]
+        p95 = waits[min(len(waits) - 1, round(0.95 * (len(waits) - 1)))]
+        peak = f"{measurement['peak_mb']:.0f} MB" if measurement["peak_mb"] is not None else "n/a"
+        print(f"{mode:12} wait per step: median {statistics.median(waits):7.1f} ms, p95 {p95:7.1f} ms, "
+              f"max {waits[-1]:7.1f} ms, peak memory +{peak}")
+        print(f"{'':12} {measurement['cache']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares full-resolution and reduced-resolution decoding of the images in a folder (see ImageObject's decode_size).
+
+Each mode runs in a fresh process, so its peak memory (max RSS, measured on Linux and macOS) is not inflated by the
+other mode. The decode time is the median over --runs decodes per image.
+
+    python scripts/benchmark_decode.py ~/dives/2025-06 --size 1920 1080
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detectorist.batch import list_image_files
+
+
+def max_rss_mb():
+    """Returns the peak resident memory of this process in MB, or None where it can't be measured."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_worker(paths, decode_size, runs):
+    """Decodes the images in this process and prints the results as JSON."""
+    import contextlib
+    import io
+
+    from detectorist.image_object import ImageObject
+
+    baseline_mb = max_rss_mb()
+    results = []
+    for path in paths:
+        times = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                image = ImageObject(path, decode_size)
+            times.append(time.perf_counter() - start_time)
+            shape = image.image_data.shape
+            del image
+        results.append({"path": path, "seconds": statistics.median(times), "shape": shape})
+    peak_mb = max_rss_mb()
+    print(json.dumps({"results": results, "peak_mb": None if peak_mb is None else peak_mb - baseline_mb}))
+
+
+def measure(paths, decode_size, runs):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--runs", str(runs)]
+    if decode_size:
+        command += ["--size", str(decode_size[0]), str(decode_size[1])]
+    result = subprocess.run(command + paths, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares full and reduced resolution image decoding.")
+    parser.add_argument("paths", nargs="+", help="A folder of images, or image files.")
+    parser.add_argument("--size", type=int, nargs=2, default=None, metavar=("WIDTH", "HEIGHT"),
+                        help="The decode size hint of the reduced mode (default: 1920 1080).")
+    parser.add_argument("--runs", type=int, default=3, help="Number of decodes per image (default: 3).")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.paths, args.size, args.runs)
+        return
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(os.path.join(path, file_name) for file_name in list_image_files(path))
+        else:
+            paths.append(path)
+    if not paths:
+        sys.exit("No images found.")
+
+    modes = {"full": measure(paths, None, args.runs), "reduced": measure(paths, tuple(args.size or (1920, 1080)), args.runs)}
+
+    print(f"{'image':30} {'full ms':>9} {'reduced ms':>11}  reduced size")
+    for full, reduced in zip(modes["full"]["results"], modes["reduced"]["results"]):
+        height, width = reduced["shape"][:2]
+        print(f"{os.path.basename(full['path'])[:30]:30} {full['seconds'] * 1000:9.1f} {reduced['seconds'] * 1000:11.1f}  "
+              f"{width}x{height} of {full['shape'][1]}x{full['shape'][0]}")
+    for mode, measurement in modes.items():
+        seconds = sum(result["seconds"] for result in measurement["results"])
+        peak = f"{measurement['peak_mb']:.0f} MB" if measurement["peak_mb"] is not None else "n/a"
+        print(f"{mode:8} total {seconds * 1000:8.1f} ms, {seconds * 1000 / len(paths):7.1f} ms/image, peak memory +{peak}")
+
+
+if __name__ == "__main__":
+    main()
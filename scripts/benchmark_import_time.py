@@ -0,0 +1,99 @@
+"""
+Measures the import time of the application entry point with `python -X importtime`, as a startup regression check.
+
+Prints the cumulative import time of the module (median of several fresh interpreters) and the slowest imported
+modules. Fails (exit code 1) if a dependency that should only be imported on first use (onnxruntime, cv2, rawpy,
+pillow_heif, exifread) is imported at startup, or if the import takes longer than --max-ms.
+
+    python scripts/benchmark_import_time.py
+    python scripts/benchmark_import_time.py --module detectorist.cli --max-ms 800
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Dependencies that are imported lazily, on first use
+LAZY_MODULES = ("onnxruntime", "cv2", "rawpy", "pillow_heif", "exifread")
+
+# import time: self [us] | cumulative | imported package
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    """
+    Imports the module in a fresh interpreter.
+
+    Returns:
+        list: The (name, self_us, cumulative_us, depth) of the imported modules, in the order of the report
+            (imported modules before their importer).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr}")
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def imported_by(modules, module):
+    """Returns the entries of the modules imported while importing module (including itself)."""
+    end = next(i for i, entry in enumerate(modules) if entry[0] == module)
+    start = end
+    while start > 0 and modules[start - 1][3] > modules[end][3]:
+        start -= 1
+    return modules[start:end + 1]
+
+
+def package_times(modules) -> list[tuple[float, str]]:
+    """Returns the summed self import time in ms of each top-level package, slowest first."""
+    times = {}
+    for name, self_us, _, _ in modules:
+        package = name.split(".")[0]
+        times[package] = times.get(package, 0) + self_us / 1000
+    return sorted(((ms, package) for package, ms in times.items()), reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the import time of the application entry point.")
+    parser.add_argument("--module", default="detectorist.main", help="The module to import (default: detectorist.main).")
+    parser.add_argument("--runs", type=int, default=5, help="Number of measured imports (default: 5).")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest packages to list (default: 15).")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time is above this.")
+    args = parser.parse_args()
+
+    # The first import compiles the bytecode, which is not part of a normal start
+    measure(args.module)
+    runs = [imported_by(measure(args.module), args.module) for _ in range(max(1, args.runs))]
+    totals = [run[-1][2] / 1000 for run in runs]
+    median_ms = statistics.median(totals)
+
+    print(f"Import time of {args.module}: {median_ms:.0f} ms (median of {len(totals)} runs, "
+          f"min {min(totals):.0f} ms, max {max(totals):.0f} ms)")
+    last_run = runs[-1]
+    print("\nSlowest packages (ms, summed over their modules):")
+    for ms, package in package_times(last_run)[:args.top]:
+        print(f"  {ms:8.1f}  {package}")
+
+    failed = False
+    eager = sorted({name.split(".")[0] for name, _, _, _ in last_run} & set(LAZY_MODULES))
+    if eager:
+        print(f"\nFAIL: imported at startup, but should be imported on first use: {', '.join(eager)}")
+        failed = True
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"\nFAIL: import time {median_ms:.0f} ms is above the limit of {args.max_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
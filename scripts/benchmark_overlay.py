@@ -0,0 +1,138 @@
+"""
+Measures how long the ImageLabel takes to show a set of detection boxes, and to repaint them after a resize.
+
+Two modes show the same random boxes on the same image:
+- "overlay": the ImageLabel, which paints all boxes in one paintEvent of its DetectionOverlay.
+- "widget per box": the previous behaviour, one QRubberBand child widget per box, which are deleted and created again
+  whenever the boxes change and moved one by one when the label is resized.
+
+Each update sets the boxes (like a change of the confidence threshold) and repaints the label, each resize step
+resizes it and repaints. Runs without a display with QT_QPA_PLATFORM=offscreen.
+
+    python scripts/benchmark_overlay.py ~/dives/2025-06/DSC01234.JPG --boxes 100 1000 5000
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import contextlib
+import io
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QBrush, QColor, QPainter, QPen
+from PySide6.QtWidgets import QApplication, QLabel, QRubberBand
+
+from detectorist.image_label import ImageLabel
+from detectorist.image_object import ImageObject
+
+
+class BoxBand(QRubberBand):
+    """A detection box widget of the previous ImageLabel."""
+
+    def __init__(self, parent, border_color, fill_color):
+        super().__init__(QRubberBand.Shape.Rectangle, parent)
+        self.border_color = border_color
+        self.fill_color = fill_color
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setBrush(QBrush(self.fill_color))
+        pen = QPen(self.border_color)
+        pen.setWidth(1)
+        painter.setPen(pen)
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+
+
+class WidgetPerBoxLabel(ImageLabel):
+    """The ImageLabel before the DetectionOverlay: one child widget per detection box."""
+
+    def __init__(self, app_instance, parent=None):
+        self.bands = []
+        super().__init__(app_instance, parent)
+
+    def _update_overlay(self):
+        for band in self.bands:
+            band.hide()
+            band.setParent(None)
+            band.deleteLater()
+        self.bands = []
+        for (x, y, w, h), score, _ in self.detections:
+            alpha = int(10 + (score * (255 - 10)))
+            band = BoxBand(self, QColor(0, 255, 0, alpha), QColor(0, 255, 0, int(score * 20)))
+            band.setGeometry(self._map_rect_from_image_to_widget(QRect(x, y, w, h)))
+            band.show()
+            self.bands.append(band)
+
+    def resizeEvent(self, event):
+        QLabel.resizeEvent(self, event)
+        for band, ((x, y, w, h), _, _) in zip(self.bands, self.detections):
+            band.setGeometry(self._map_rect_from_image_to_widget(QRect(x, y, w, h)))
+
+
+def random_detections(count, image_shape, rng):
+    """Returns count random detections of fish sized boxes."""
+    height, width = image_shape[:2]
+    sizes = rng.integers(max(4, width // 100), max(8, width // 10), size=(count, 2))
+    positions = rng.integers(0, (width, height), size=(count, 2))
+    scores = rng.random(count)
+    return [([int(x), int(y), int(w), int(h)], float(score), "fish")
+            for (x, y), (w, h), score in zip(positions, sizes, scores)]
+
+
+def timed(app, action):
+    start_time = time.perf_counter()
+    action()
+    app.processEvents()
+    return (time.perf_counter() - start_time) * 1000
+
+
+def measure(app, label_class, image, detections, updates, resize_steps):
+    label = label_class(None)
+    label.resize(1200, 800)
+    label.show()
+    label.replace_image(image.image_path, image=image)
+    app.processEvents()
+
+    def update():
+        label.set_detection_boxes(detections)
+        label.repaint()
+    update_times = [timed(app, update) for _ in range(updates)]
+
+    def resize_step(width):
+        label.resize(width, width * 2 // 3)
+        label.repaint()
+    resize_times = [timed(app, lambda width=width: resize_step(width)) for width in resize_steps]
+    label.shutdown()
+    label.close()
+    app.processEvents()
+    return statistics.median(update_times), statistics.median(resize_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures showing many detection boxes in the ImageLabel.")
+    parser.add_argument("image", help="The image file shown.")
+    parser.add_argument("--boxes", type=int, nargs="+", default=[100, 1000, 5000], help="The numbers of boxes (default: 100 1000 5000).")
+    parser.add_argument("--updates", type=int, default=5, help="Updates of the boxes per measurement (default: 5).")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with contextlib.redirect_stdout(io.StringIO()):
+        image = ImageObject(args.image)
+    rng = np.random.default_rng(0)
+    resize_steps = list(range(1200, 900, -30))
+    print(f"{os.path.basename(args.image)}: {image.shape[1]}x{image.shape[0]}")
+
+    for count in args.boxes:
+        detections = random_detections(count, image.shape, rng)
+        for mode, label_class in (("widget per box", WidgetPerBoxLabel), ("overlay", ImageLabel)):
+            update_ms, resize_ms = measure(app, label_class, image, detections, args.updates, resize_steps)
+            print(f"{count:5} boxes, {mode:14}: update {update_ms:8.1f} ms, resize step {resize_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
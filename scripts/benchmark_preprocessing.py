@@ -0,0 +1,137 @@
+"""
+Compares the 'stretch' and 'letterbox' preprocessing modes of the Detector in accuracy and latency.
+
+Accuracy is measured against YOLO-format label files (one "class cx cy w h" line per object, normalized to the
+image size), looked up next to each image (img.jpg -> img.txt), in a parallel 'labels' directory of an 'images'
+directory, or in the --labels directory. Without labels, only the latency and the number of detections are reported.
+
+    python scripts/benchmark_preprocessing.py models/fish.onnx ~/dives/validation --confidence 0.5
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detectorist.batch import list_image_files
+from detectorist.detector import Detector
+from detectorist.image_object import ImageObject
+from detectorist.preprocessing import PREPROCESSING_MODES
+
+
+def find_label_file(image_path, labels_dir=None):
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    candidates = [os.path.splitext(image_path)[0] + ".txt"]
+    image_dir = os.path.dirname(os.path.abspath(image_path))
+    if os.path.basename(image_dir) == "images":
+        candidates.append(os.path.join(os.path.dirname(image_dir), "labels", stem + ".txt"))
+    if labels_dir:
+        candidates.insert(0, os.path.join(labels_dir, stem + ".txt"))
+    return next((path for path in candidates if os.path.isfile(path)), None)
+
+
+def load_labels(label_path, image_shape, class_names):
+    """Returns the ground truth boxes as (class_name, [x, y, w, h]) in image pixels."""
+    height, width = image_shape[:2]
+    labels = []
+    with open(label_path, "r", encoding="utf-8") as f:
+        for line in f:
+            values = line.split()
+            if len(values) < 5:
+                continue
+            class_id = int(values[0])
+            cx, cy, w, h = (float(v) for v in values[1:5])
+            box = [(cx - w / 2) * width, (cy - h / 2) * height, w * width, h * height]
+            labels.append((class_names.get(class_id, f"Class {class_id}"), box))
+    return labels
+
+
+def iou(box_a, box_b):
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = inter_w * inter_h
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def match(detections, labels, iou_threshold):
+    """Greedily matches the detections (highest score first) to labels of the same class. Returns (tp, fp, fn)."""
+    unmatched = list(labels)
+    true_positives = 0
+    for box, _, class_name in sorted(detections, key=lambda detection: -detection[1]):
+        best_index, best_iou = None, iou_threshold
+        for i, (label_class, label_box) in enumerate(unmatched):
+            overlap = iou(box, label_box)
+            if label_class == class_name and overlap >= best_iou:
+                best_index, best_iou = i, overlap
+        if best_index is not None:
+            unmatched.pop(best_index)
+            true_positives += 1
+    return true_positives, len(detections) - true_positives, len(unmatched)
+
+
+def benchmark(model_path, images, mode, args):
+    detector = Detector(model_path, preprocessing=mode)
+    for image in images[:2]:
+        detector._run_model(image)  # Warm-up
+
+    timings = []
+    totals = np.zeros(3, dtype=int)
+    num_detections = 0
+    labelled = 0
+    for image in images:
+        start_time = time.perf_counter()
+        # Runs the model directly, bypassing the output caches
+        detections = detector.postprocess(detector._run_model(image), args.confidence, args.nms)
+        timings.append((time.perf_counter() - start_time) * 1000)
+        num_detections += len(detections)
+
+        label_path = find_label_file(image.image_path, args.labels)
+        if label_path:
+            labelled += 1
+            totals += match(detections, load_labels(label_path, image.image_data.shape, detector.class_names), args.iou)
+
+    result = {"mode": mode, "input": f"{detector.input_width}x{detector.input_height}",
+              "median_ms": float(np.median(timings)), "mean_ms": float(np.mean(timings)),
+              "detections": num_detections, "labelled": labelled}
+    if labelled:
+        tp, fp, fn = totals
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        result.update(precision=precision, recall=recall,
+                      f1=2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stretch and letterbox preprocessing in accuracy and latency.")
+    parser.add_argument("model", help="Path of the ONNX model")
+    parser.add_argument("folder", help="Folder with the validation images")
+    parser.add_argument("--labels", default=None, help="Folder with the YOLO label files (default: next to the images)")
+    parser.add_argument("-c", "--confidence", type=float, default=0.5, help="Confidence threshold (default: 0.5)")
+    parser.add_argument("-n", "--nms", type=float, default=0.45, help="NMS threshold (default: 0.45)")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for a detection to match a label (default: 0.5)")
+    args = parser.parse_args()
+
+    images = [ImageObject(os.path.join(args.folder, file_name)) for file_name in list_image_files(args.folder)]
+    if not images:
+        print(f"No supported images found in folder: {args.folder}")
+        return 1
+
+    print(f"{'mode':<10} {'input':>9} {'median ms':>10} {'mean ms':>8} {'detections':>11} {'precision':>10} {'recall':>7} {'F1':>6}")
+    for mode in PREPROCESSING_MODES:
+        result = benchmark(args.model, images, mode, args)
+        accuracy = (f"{result['precision']:>10.3f} {result['recall']:>7.3f} {result['f1']:>6.3f}"
+                    if result["labelled"] else f"{'-':>10} {'-':>7} {'-':>6}")
+        print(f"{result['mode']:<10} {result['input']:>9} {result['median_ms']:>10.2f} {result['mean_ms']:>8.2f} "
+              f"{result['detections']:>11} {accuracy}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Measures how long the ImageLabel takes to repaint while its window is resized, and when it is repainted without a
+size change (e.g. for a tooltip or a band update).
+
+Two modes paint the same image:
+- "cached": the ImageLabel, which caches the scaled image per widget size and scales from the nearest mip level while
+  resizing, with the final smooth rescale on a background thread.
+- "rescale per paint": the previous behaviour, scaling the full image smoothly on every repaint.
+
+The image is decoded in full size (like the tiled detection mode shows it), the resize steps grow and shrink the
+widget by --step pixels between --min-width and --max-width. Runs without a display with QT_QPA_PLATFORM=offscreen.
+
+    python scripts/benchmark_resize.py ~/dives/2025-06/DSC01234.ARW
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import contextlib
+import io
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PySide6.QtCore import Qt, QPoint
+from PySide6.QtGui import QPainter, QPixmap
+from PySide6.QtWidgets import QApplication
+
+from detectorist.image_label import ImageLabel
+from detectorist.image_object import ImageObject
+
+
+class RescalePerPaintLabel(ImageLabel):
+    """The ImageLabel before the scaled image cache: a full pixmap, smoothly scaled on every repaint."""
+
+    def __init__(self, app_instance, parent=None):
+        self._full_pixmap = QPixmap()
+        super().__init__(app_instance, parent)
+
+    def _set_source_data(self, rgb_image):
+        super()._set_source_data(rgb_image)
+        self._full_pixmap = QPixmap.fromImage(self._source)
+
+    def paintEvent(self, event):
+        if not self._full_pixmap.isNull():
+            size = self.size()
+            scaled_pixmap = self._full_pixmap.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            point = QPoint((size.width() - scaled_pixmap.width()) // 2, (size.height() - scaled_pixmap.height()) // 2)
+            painter = QPainter(self)
+            painter.drawPixmap(point, scaled_pixmap)
+
+
+def wait_for_final_rescale(app, label, timeout_seconds=10.0):
+    """Processes events until the label shows the final (smoothly scaled) image, and returns the time it took."""
+    start_time = time.perf_counter()
+    while not label._scaled_final and time.perf_counter() - start_time < timeout_seconds:
+        app.processEvents()
+        time.sleep(0.001)
+    return time.perf_counter() - start_time
+
+
+def timed_repaint(label):
+    start_time = time.perf_counter()
+    label.repaint()
+    return (time.perf_counter() - start_time) * 1000
+
+
+def measure(app, label_class, image, widths, repaints):
+    label = label_class(None)
+    label.resize(widths[0], widths[0] * 2 // 3)
+    label.show()
+    app.processEvents()
+    start_time = time.perf_counter()
+    label.replace_image(image.image_path, image=image)
+    label.repaint()
+    first_paint = (time.perf_counter() - start_time) * 1000
+    if label_class is ImageLabel:
+        wait_for_final_rescale(app, label)
+
+    resize_steps = []
+    for width in widths:
+        label.resize(width, width * 2 // 3)
+        app.processEvents()
+        resize_steps.append(timed_repaint(label))
+    # The time from the last resize step until the final image is shown
+    settle = wait_for_final_rescale(app, label) * 1000 if label_class is ImageLabel else 0.0
+    same_size = [timed_repaint(label) for _ in range(repaints)]
+    label.shutdown()
+    label.close()
+    return first_paint, resize_steps, same_size, settle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the repaint time of the ImageLabel while resizing.")
+    parser.add_argument("image", help="The image file shown.")
+    parser.add_argument("--min-width", type=int, default=800, help="The smallest widget width (default: 800).")
+    parser.add_argument("--max-width", type=int, default=1600, help="The largest widget width (default: 1600).")
+    parser.add_argument("--step", type=int, default=16, help="The width change per resize step in pixels (default: 16).")
+    parser.add_argument("--repaints", type=int, default=20, help="Repaints without a size change (default: 20).")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with contextlib.redirect_stdout(io.StringIO()):
+        image = ImageObject(args.image)
+    grow = list(range(args.min_width, args.max_width + 1, args.step))
+    widths = grow + grow[-2::-1]
+    print(f"{os.path.basename(args.image)}: {image.shape[1]}x{image.shape[0]}, {len(widths)} resize steps")
+
+    for mode, label_class in (("rescale per paint", RescalePerPaintLabel), ("cached", ImageLabel)):
+        first_paint, resize_steps, same_size, settle = measure(app, label_class, image, widths, args.repaints)
+        resize_steps.sort()
+        p95 = resize_steps[min(len(resize_steps) - 1, round(0.95 * (len(resize_steps) - 1)))]
+        print(f"{mode:18} first paint {first_paint:6.1f} ms, resize step: median {statistics.median(resize_steps):6.1f} ms, "
+              f"p95 {p95:6.1f} ms, repaint without resize: median {statistics.median(same_size):6.1f} ms"
+              + (f", final image {settle:.0f} ms after resizing" if label_class is ImageLabel else ""))
+
+
+if __name__ == "__main__":
+    main()
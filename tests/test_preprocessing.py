@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from detectorist.preprocessing import preprocess_into
+
+
+@pytest.mark.parametrize("letterbox", [False, True])
+def test_16bit_white_is_one(letterbox):
+    image_data = np.full((48, 64, 3), 65535, dtype=np.uint16)
+    out = np.zeros((3, 32, 32), dtype=np.float32)
+    x_scale, y_scale, pad_x, pad_y = preprocess_into(image_data, out, letterbox=letterbox)
+    image_area = out[:, pad_y:out.shape[1] - pad_y, pad_x:out.shape[2] - pad_x]
+    assert image_area.max() == 1.0
+    assert image_area.min() == 1.0
+
+
+def test_16bit_matches_8bit_conversion():
+    rng = np.random.default_rng(0)
+    image_data = rng.integers(0, 65536, size=(32, 32, 3), dtype=np.uint16)
+    out = np.zeros((3, 32, 32), dtype=np.float32)
+    preprocess_into(image_data, out)
+    # Within one 8-bit step of the previous conversion, (value >> 8) / 255
+    expected = (image_data >> 8).transpose(2, 0, 1) / 255
+    assert np.abs(out - expected).max() <= 1 / 255
+    assert 0.0 <= out.min() and out.max() <= 1.0
+
+
+def test_8bit_white_is_one():
+    image_data = np.full((32, 32, 3), 255, dtype=np.uint8)
+    out = np.zeros((3, 32, 32), dtype=np.float32)
+    preprocess_into(image_data, out)
+    assert out.max() == 1.0 and out.min() == 1.0